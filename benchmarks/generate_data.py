@@ -0,0 +1,145 @@
+# benchmarks/generate_data.py
+#
+# Deterministic synthetic sales files in the same pipe-delimited format as
+# data/sales_data.txt, from 10^4 up to 10^8 rows (streamed, never held in memory).
+#
+#   python -m benchmarks.generate_data --rows 1000000 --output benchmarks/data/sales_1m.txt
+
+import argparse
+import bisect
+import os
+import random
+from datetime import date, timedelta
+
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+PRODUCT_WORDS = [
+    "Laptop", "Mouse", "Keyboard", "Monitor", "Headphones", "USB Cable",
+    "Webcam", "Charger", "Speaker", "Tablet", "Printer", "Router"
+]
+BASE_REGIONS = ["North", "South", "East", "West", "Central", "North-East", "South-West"]
+
+
+def _zipf_sampler(rng, n, skew):
+    """
+    Returns a function drawing indices 0..n-1 with P(i) ∝ 1 / (i+1)^skew.
+    skew=0 is uniform.
+    """
+    if skew <= 0:
+        return lambda: rng.randrange(n)
+
+    cumulative = []
+    total = 0.0
+    for i in range(n):
+        total += 1.0 / (i + 1) ** skew
+        cumulative.append(total)
+    return lambda: bisect.bisect_left(cumulative, rng.random() * total)
+
+
+def _dirty(rng, fields):
+    # One of the defects the real exports contain
+    kind = rng.randrange(7)
+    if kind == 0:
+        fields[4] = "0"                          # zero quantity
+    elif kind == 1:
+        fields[5] = "-" + fields[5]              # negative price
+    elif kind == 2:
+        fields[0] = "X" + fields[0][1:]          # bad TransactionID
+    elif kind == 3:
+        fields[6] = ""                           # missing CustomerID
+    elif kind == 4:
+        fields[2] = fields[2][1:]                # ProductID without P
+    elif kind == 5:
+        fields.pop()                             # missing column
+    else:
+        fields[4] = "abc"                        # unparsable quantity
+    return fields
+
+
+def generate_sales_file(output, rows, seed=42, regions=4, products=250, customers=5000,
+                        days=365, dirty_rate=0.05, comma_rate=0.1, skew=1.0,
+                        blank_rate=0.001, start_date=date(2024, 1, 1)):
+    """
+    Writes `rows` data lines (plus header) to `output`. Same seed and
+    parameters always give byte-identical files.
+
+    - regions / products / customers: cardinality of each column
+    - skew: Zipf exponent for product and customer popularity (0 = uniform)
+    - dirty_rate: share of rows with a validation defect
+    - comma_rate: share of rows with thousands separators in numbers / commas in names
+    """
+    rng = random.Random(seed)
+    region_names = [
+        BASE_REGIONS[i] if i < len(BASE_REGIONS) else f"Region{i}" for i in range(regions)
+    ]
+    product_names = [
+        f"{PRODUCT_WORDS[i % len(PRODUCT_WORDS)]} {i // len(PRODUCT_WORDS) + 1}" for i in range(products)
+    ]
+    product_prices = [rng.choice([99, 173, 523, 1916, 2826, 15000, 45000]) for _ in range(products)]
+    dates = [(start_date + timedelta(days=d)).isoformat() for d in range(days)]
+
+    pick_product = _zipf_sampler(rng, products, skew)
+    pick_customer = _zipf_sampler(rng, customers, skew)
+
+    folder = os.path.dirname(output)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    with open(output, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write(HEADER + "\n")
+        for i in range(rows):
+            p = pick_product()
+            qty = rng.randint(1, 20)
+            price = product_prices[p]
+            name = product_names[p]
+
+            price_str = str(price)
+            if rng.random() < comma_rate:
+                price_str = f"{price:,}"
+                name = name.replace(" ", ", ", 1)
+
+            fields = [
+                f"T{i + 1:06d}",
+                dates[rng.randrange(days)],
+                f"P{101 + p}",
+                name,
+                str(qty),
+                price_str,
+                f"C{pick_customer() + 1:05d}",
+                region_names[rng.randrange(regions)],
+            ]
+            if rng.random() < dirty_rate:
+                fields = _dirty(rng, fields)
+
+            if rng.random() < blank_rate:
+                f.write("\n")
+            f.write("|".join(fields) + "\n")
+
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic sales_data.txt")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--output", default="benchmarks/data/sales_data.txt")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--regions", type=int, default=4)
+    parser.add_argument("--products", type=int, default=250)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--dirty-rate", type=float, default=0.05)
+    parser.add_argument("--comma-rate", type=float, default=0.1)
+    parser.add_argument("--skew", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    generate_sales_file(
+        args.output, args.rows, seed=args.seed, regions=args.regions, products=args.products,
+        customers=args.customers, days=args.days, dirty_rate=args.dirty_rate,
+        comma_rate=args.comma_rate, skew=args.skew
+    )
+    print(f"[SUCCESS] Wrote {args.rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
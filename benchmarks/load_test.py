@@ -0,0 +1,145 @@
+# benchmarks/load_test.py
+#
+# Load test for the query service (main.py --serve): replays a dashboard's
+# query mix and compares cold (cache miss) with warm (cache hit) latency,
+# and both with what one question costs without the service (parse the
+# file and aggregate from scratch).
+#
+#   python -m benchmarks.load_test --rows 200000                 # in-process service on synthetic data
+#   python -m benchmarks.load_test --url http://127.0.0.1:8765   # an already running service
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+sys.path.append(".")
+
+from benchmarks.generate_data import generate_sales_file
+
+
+DATA_DIR = "benchmarks/data"
+
+DASHBOARD = [
+    ("total_revenue", {}),
+    ("region_wise_sales", {}),
+    ("top_selling_products", {"n": 10}),
+    ("customer_analysis", {"top_n": 10}),
+    ("daily_sales_trend", {}),
+    ("peak_sales_day", {}),
+    ("low_performing_products", {}),
+    ("region_wise_sales", {"min_amount": 500, "max_amount": 20000}),
+    ("top_selling_products", {"region": "North"}),
+    ("daily_sales_trend", {"region": "South"}),
+    ("customer_analysis", {"region": "East", "top_n": 5}),
+    ("report", {}),
+]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _summary(latencies):
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def _get(base_url, endpoint, params):
+    url = f"{base_url}/{endpoint}"
+    if params:
+        url += "?" + urlencode(params)
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+        cache = response.headers.get("X-Cache")
+    return time.perf_counter() - start, cache
+
+
+def _cold_baseline(path):
+    # What answering one question costs without the service
+    from filehandler import parse_transactions, read_sales_data, validate_and_filter
+    from utils.data_processor import build_aggregates, region_wise_sales
+    import contextlib
+    import io
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        valid, _, _ = validate_and_filter(parse_transactions(read_sales_data(path)))
+        region_wise_sales(build_aggregates(valid))
+    return time.perf_counter() - start
+
+
+def run_load_test(base_url, rounds, concurrency):
+    # First pass fills the cache; later rounds are what a polling dashboard sees
+    cold = [_get(base_url, endpoint, params)[0] for endpoint, params in DASHBOARD]
+
+    jobs = DASHBOARD * rounds
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda job: _get(base_url, *job), jobs))
+    elapsed = time.perf_counter() - start
+
+    warm = [latency for latency, _ in results]
+    return {
+        "cold": _summary(cold),
+        "warm": _summary(warm),
+        "warm_hit_rate": sum(cache == "HIT" for _, cache in results) / len(results),
+        "throughput_rps": round(len(jobs) / elapsed, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the analytics query service")
+    parser.add_argument("--url", help="Base URL of a running service (default: start one in-process)")
+    parser.add_argument("--rows", type=int, default=200000, help="Synthetic rows for the in-process service")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rounds", type=int, default=20, help="Times the dashboard query mix is replayed")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    server = None
+    result = {}
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        from utils.query_service import AnalyticsService, start_query_server
+
+        path = os.path.join(DATA_DIR, f"load_test_{args.rows}_s{args.seed}.txt")
+        if not os.path.exists(path):
+            generate_sales_file(path, args.rows, seed=args.seed)
+
+        result["rows"] = args.rows
+        result["cold_start_seconds_without_service"] = round(_cold_baseline(path), 3)
+
+        service = AnalyticsService(path)
+        start = time.perf_counter()
+        service.load()
+        result["service_load_seconds"] = round(time.perf_counter() - start, 3)
+        server, base_url = start_query_server(service, port=0)
+
+    try:
+        result.update(run_load_test(base_url, args.rounds, args.concurrency))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
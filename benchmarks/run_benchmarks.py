@@ -0,0 +1,275 @@
+# benchmarks/run_benchmarks.py
+#
+# Times every pipeline stage on synthetic data and compares against a saved
+# baseline so regressions are caught.
+#
+#   python -m benchmarks.run_benchmarks --sizes 10000 100000 --output benchmarks/results.json
+#   python -m benchmarks.run_benchmarks --save-baseline          # record benchmarks/baseline.json
+#   python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json   # exit 1 on regression
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(".")
+
+from benchmarks.generate_data import generate_sales_file
+from benchmarks.stub_catalog import start_stub_catalog
+
+
+DATA_DIR = "benchmarks/data"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        record = {"rows_in": rows_in}
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        # Stage functions print progress; keep benchmark output clean
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield record
+        record["seconds"] = time.perf_counter() - start
+        record["cpu_seconds"] = time.process_time() - cpu_start
+        record["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+        self.stages[name] = record
+
+
+def dataset_path(rows, seed, options):
+    suffix = "_".join(f"{k}{v}" for k, v in sorted(options.items()))
+    return os.path.join(DATA_DIR, f"sales_{rows}_s{seed}_{suffix}.txt")
+
+
+def run_size(rows, seed, options, catalog_size, workers):
+    """
+    Runs every stage once on a dataset of `rows` rows. Executed in a fresh
+    process per size so peak RSS is not carried over between sizes.
+    """
+    from filehandler import (
+        read_sales_data, parse_transactions, validate_and_filter,
+        aggregate_sales_file, parallel_ingest, iter_sales_transactions, ingest_files
+    )
+    from utils import data_processor as dp
+    from utils import columnar
+    from utils import cube
+    from utils import sqlite_store
+    from utils.api_handler import fetch_all_products, create_product_mapping, enrich_sales_data, save_enriched_data
+    from utils.report_generator import generate_sales_report
+
+    path = dataset_path(rows, seed, options)
+    if not os.path.exists(path):
+        generate_sales_file(path, rows, seed=seed, **options)
+
+    timer = _StageTimer()
+    server, url = start_stub_catalog(total=catalog_size)
+    out_dir = tempfile.mkdtemp(prefix="sales-bench-")
+
+    try:
+        with timer.stage("read_sales_data") as rec:
+            raw = read_sales_data(path)
+        rec["rows_out"] = len(raw)
+
+        with timer.stage("parse_transactions", len(raw)) as rec:
+            parsed = parse_transactions(raw)
+        rec["rows_out"] = len(parsed)
+        del raw
+
+        with timer.stage("iter_sales_transactions[mmap]") as rec:
+            rec["rows_out"] = sum(1 for _ in iter_sales_transactions(path))
+
+        with timer.stage("validate_and_filter", len(parsed)) as rec:
+            valid, _, _ = validate_and_filter(parsed)
+        rec["rows_out"] = len(valid)
+
+        with timer.stage("build_aggregates", len(valid)):
+            aggregates = dp.build_aggregates(valid)
+        with timer.stage("build_aggregates[heavy_hitters]", len(valid)):
+            dp.build_aggregates(valid, heavy_hitter_error=0.001)
+        with timer.stage("build_aggregates[hyperloglog]", len(valid)):
+            dp.build_aggregates(valid, distinct_precision=12)
+
+        for name in ["calculate_total_revenue", "region_wise_sales", "top_selling_products",
+                     "customer_analysis", "daily_sales_trend", "find_peak_sales_day",
+                     "low_performing_products"]:
+            func = getattr(dp, name)
+            with timer.stage(f"data_processor.{name}", len(valid)):
+                func(valid)
+            with timer.stage(f"data_processor.{name}[aggregates]", len(valid)):
+                func(aggregates)
+
+        with timer.stage("columnar.build_table", len(valid)):
+            table = columnar.build_table(valid)
+        for name in ["region_wise_sales", "top_selling_products", "customer_analysis",
+                     "daily_sales_trend", "low_performing_products"]:
+            with timer.stage(f"columnar.{name}", len(valid)):
+                getattr(columnar, name)(table)
+        del table
+
+        with timer.stage("cube.build_cube", len(valid)) as rec:
+            sales_cube = cube.build_cube(valid)
+        rec["rows_out"] = len(sales_cube)
+        for name in ["region_wise_sales", "top_selling_products", "daily_sales_trend",
+                     "low_performing_products"]:
+            with timer.stage(f"cube.{name}", len(sales_cube)):
+                getattr(cube, name)(sales_cube)
+        with timer.stage("cube.daily_sales_trend[month]", len(sales_cube)):
+            cube.daily_sales_trend(sales_cube, grain="month")
+        del sales_cube
+
+        store = sqlite_store.SalesStore(os.path.join(out_dir, "sales.sqlite"))
+        with timer.stage("sqlite_store.load", len(valid)) as rec:
+            rec["rows_out"] = store.load(valid)
+        for name in ["calculate_total_revenue", "region_wise_sales", "top_selling_products",
+                     "customer_analysis", "daily_sales_trend", "find_peak_sales_day",
+                     "low_performing_products"]:
+            with timer.stage(f"sqlite_store.{name}", len(valid)):
+                getattr(sqlite_store, name)(store)
+        with timer.stage("sqlite_store.aggregates_from_store", len(valid)):
+            sqlite_store.aggregates_from_store(store)
+        del store
+
+        with timer.stage("fetch_all_products") as rec:
+            products = fetch_all_products(url)
+        rec["rows_out"] = len(products)
+
+        with timer.stage("enrich_sales_data", len(valid)) as rec:
+            enriched = enrich_sales_data(valid, create_product_mapping(products), save=False)
+        rec["rows_out"] = len(enriched)
+
+        with timer.stage("save_enriched_data", len(enriched)):
+            save_enriched_data(enriched, os.path.join(out_dir, "enriched.txt"))
+
+        with timer.stage("generate_sales_report", len(valid)):
+            generate_sales_report(valid, enriched, os.path.join(out_dir, "report.txt"), aggregates=aggregates)
+
+        del parsed, valid, enriched, aggregates
+
+        with timer.stage("aggregate_sales_file[stream]") as rec:
+            _, summary = aggregate_sales_file(path)
+        rec["rows_out"] = summary["final_count"]
+
+        with timer.stage(f"parallel_ingest[{workers}]") as rec:
+            _, _, summary = parallel_ingest(path, workers)
+        rec["rows_out"] = summary["final_count"]
+
+        gz_path = os.path.join(out_dir, "sales.txt.gz")
+        with open(path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        with timer.stage(f"ingest_files[gzip,{workers}]") as rec:
+            _, _, summary = ingest_files(gz_path, workers)
+        rec["rows_out"] = summary["final_count"]
+
+    finally:
+        server.shutdown()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    return timer.stages
+
+
+def compare(results, baseline, threshold=0.2, min_seconds=0.005):
+    """
+    Returns a list of (size, stage, old_seconds, new_seconds) for every stage
+    that got more than `threshold` (relative) slower than the baseline.
+    Stages faster than min_seconds are ignored as noise.
+    """
+    regressions = []
+    for size, stages in results["results"].items():
+        base_stages = baseline.get("results", {}).get(size, {})
+        for stage, record in stages.items():
+            base = base_stages.get(stage)
+            if not base:
+                continue
+            old, new = base["seconds"], record["seconds"]
+            if new > min_seconds and new > old * (1 + threshold):
+                regressions.append((size, stage, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every sales pipeline stage")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--regions", type=int, default=4)
+    parser.add_argument("--products", type=int, default=250)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--dirty-rate", type=float, default=0.05)
+    parser.add_argument("--comma-rate", type=float, default=0.1)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--catalog-size", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default="benchmarks/results.json")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help=f"Also write the results to {DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    options = {
+        "regions": args.regions, "products": args.products, "customers": args.customers,
+        "dirty_rate": args.dirty_rate, "comma_rate": args.comma_rate, "skew": args.skew
+    }
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "options": options,
+        },
+        "results": {}
+    }
+
+    for rows in args.sizes:
+        print(f"[BENCH] {rows:,} rows...")
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            stages = pool.submit(
+                run_size, rows, args.seed, options, args.catalog_size, args.workers
+            ).result()
+        results["results"][str(rows)] = stages
+        for name, record in stages.items():
+            print(f"  {name:<52}{record['seconds']:>10.4f}s  peak RSS {record['peak_rss_mb']:>8.1f} MB")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[SUCCESS] Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[SUCCESS] Baseline saved to {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for size, stage, old, new in regressions:
+            print(f"[REGRESSION] {size} rows / {stage}: {old:.4f}s → {new:.4f}s")
+        if regressions:
+            sys.exit(1)
+        print("[SUCCESS] No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
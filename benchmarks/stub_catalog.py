@@ -0,0 +1,71 @@
+# benchmarks/stub_catalog.py
+#
+# Local stand-in for https://dummyjson.com/products so benchmarks (and the
+# catalog cache / paginated fetcher) run without the network.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _CatalogHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if urlparse(self.path).path.rstrip("/") != "/products":
+            self.send_error(404)
+            return
+
+        query = parse_qs(urlparse(self.path).query)
+        limit = int(query.get("limit", ["30"])[0]) or server.total
+        skip = int(query.get("skip", ["0"])[0])
+
+        etag = f'"catalog-{server.total}-{skip}-{limit}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        ids = range(skip + 1, min(skip + limit, server.total) + 1)
+        body = json.dumps({
+            "products": [
+                {
+                    "id": pid,
+                    "title": f"Product {pid}",
+                    "category": f"category-{pid % 12}",
+                    "brand": f"Brand {pid % 30}" if pid % 7 else None,
+                    "price": 10 + pid % 500,
+                    "rating": round(3 + (pid % 20) / 10, 2)
+                }
+                for pid in ids
+            ],
+            "total": server.total,
+            "skip": skip,
+            "limit": limit
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_catalog(total=1000, latency=0.0, port=0):
+    """
+    Starts the stub in a daemon thread.
+    Returns: (server, products_url) — call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), _CatalogHandler)
+    server.total = total
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/products"
@@ -138,9 +138,25 @@ from utils.report_generator import generate_sales_report
 generate_sales_report(transactions, enriched_transactions)
 
 
+import argparse
+import os
 import sys
-from filehandler import read_sales_data, parse_transactions, validate_and_filter
+import threading
+import time
+from functools import partial
+from filehandler import (
+    open_sales_file,
+    parse_transactions,
+    expand_inputs,
+    detect_compression,
+    ingest_files,
+    count_filtered_by_file,
+    iter_valid_transactions,
+    new_validation_summary,
+    build_filter_index
+)
 from utils.data_processor import (
+    build_aggregates,
     calculate_total_revenue,
     region_wise_sales,
     top_selling_products,
@@ -149,46 +165,485 @@ from utils.data_processor import (
     find_peak_sales_day,
     low_performing_products
 )
-from utils.api_handler import fetch_all_products, create_product_mapping, enrich_sales_data
+from utils.api_handler import (
+    fetch_all_products,
+    create_product_mapping,
+    enrich_sales_data,
+    save_enriched_data,
+    new_fetch_stats
+)
+from utils.catalog_cache import get_product_mapping, wait_for_background_refresh
+from utils.enriched_io import read_enriched_data, resolve_format
+from utils.follow import SalesFollower, follow_sales_file
+from utils.incremental import incremental_aggregate, write_state
+from utils.instrumentation import PipelineMonitor, latency_summary, profiled
+from utils.query_service import AnalyticsService, start_query_server
 from utils.report_generator import generate_sales_report
+from utils.scenarios import check_scenarios, evaluate_scenarios, load_scenarios, parse_scenario_spec
+from utils.scheduler import StageScheduler
+from utils.sqlite_store import SalesStore, aggregates_from_store, source_meta, store_is_current
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sales Analytics System")
+    parser.add_argument("--input", default="salesdata.txt",
+                        help="Pipe-delimited sales file, directory or quoted glob "
+                             "(e.g. 'data/2024-05-*/*.txt.gz'); gzip / zstd files are read as a stream")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Parse the input with N worker processes (per file, and byte ranges within "
+                             "large uncompressed files)")
+    parser.add_argument("--catalog-cache", default="data/product_cache.sqlite",
+                        help="SQLite file caching the product catalog")
+    parser.add_argument("--catalog-ttl", type=float, default=24 * 3600,
+                        help="Seconds before the cached catalog is considered stale")
+    parser.add_argument("--no-catalog-cache", action="store_true",
+                        help="Always fetch the catalog from the API")
+    parser.add_argument("--no-stale-catalog", action="store_true",
+                        help="Refresh a stale catalog before continuing instead of in the background")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only parse lines appended since the last run (saved aggregate state)")
+    parser.add_argument("--state", default="data/analytics_state.pkl",
+                        help="Aggregate state file used by --incremental")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="With --incremental, ignore the saved state and recompute everything")
+    parser.add_argument("--enriched-format", choices=["text", "parquet", "arrow", "npy"], default="text",
+                        help="Output format for the enriched data file")
+    parser.add_argument("--from-enriched", metavar="PATH",
+                        help="Load a saved enriched data file and skip parsing and API enrichment")
+    parser.add_argument("--metrics-json", default="output/run_metrics.json",
+                        help="Where to write the per-stage JSON run record ('' to skip)")
+    parser.add_argument("--metrics-prom", default="output/sales_pipeline.prom",
+                        help="Prometheus textfile for the node exporter ('' to skip)")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Record Python heap deltas per stage (slower)")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"],
+                        help="Profile the whole run and write the result to output/")
+    parser.add_argument("--heavy-hitter-error", type=float, metavar="EPS",
+                        help="Track top products/customers in bounded memory; values may "
+                             "overstate by EPS x total (e.g. 0.001). Default: exact")
+    parser.add_argument("--distinct-precision", type=int, metavar="P",
+                        help="Estimate unique customers/products with HyperLogLog sketches of "
+                             "2**P registers (4-16, e.g. 12 ≈ 1.6%% error). Default: exact sets")
+    parser.add_argument("--scenarios", metavar="FILE",
+                        help="Non-interactive batch mode: JSON list of filter scenarios "
+                             '({"name", "region", "min_amount", "max_amount"}), one report each')
+    parser.add_argument("--scenario", action="append", default=[], metavar="SPEC",
+                        help="Add a batch scenario, e.g. 'north-high:region=North,min=500,max=20000' "
+                             "(repeatable)")
+    parser.add_argument("--scenario-dir", default="output/scenarios",
+                        help="Folder for the per-scenario reports")
+    parser.add_argument("--sqlite-store", metavar="PATH",
+                        help="Also bulk-load the validated (filtered) transactions into this SQLite file")
+    parser.add_argument("--from-sqlite", metavar="PATH",
+                        help="Generate the report from a SQLite store (see --sqlite-store) "
+                             "with GROUP BY queries instead of parsing the input")
+    parser.add_argument("--follow", action="store_true",
+                        help="Keep watching the input like tail -F and regenerate the report as rows are appended")
+    parser.add_argument("--poll-interval", type=float, default=0.1,
+                        help="Seconds between checks for appended data in --follow mode")
+    parser.add_argument("--debounce", type=float, default=0.2,
+                        help="--follow: regenerate once appends have been quiet this long (seconds)")
+    parser.add_argument("--snapshot", default="output/live_snapshot.json",
+                        help="--follow: JSON snapshot of the running totals ('' to skip)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a query service: load the file once and answer HTTP "
+                             "queries (/region_wise_sales?region=North, /report, ...)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address for --serve")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve")
+    parser.add_argument("--cache-size", type=int, default=256,
+                        help="LRU result cache entries for --serve (0 disables)")
+    parser.add_argument("--refresh-interval", type=float, default=5.0,
+                        help="Seconds between checks for appended data in --serve mode (0 = only POST /refresh)")
+    return parser.parse_args(argv)
+
+
+def aggregate_options(args):
+    # SalesAggregates settings shared by every ingest path
+    options = {}
+    if args.heavy_hitter_error:
+        options["heavy_hitter_error"] = args.heavy_hitter_error
+    if args.distinct_precision is not None:
+        options["distinct_precision"] = args.distinct_precision
+    return options
+
+
+def load_product_map(args, fetch_stats=None):
+    if args.no_catalog_cache:
+        return create_product_mapping(fetch_all_products(stats=fetch_stats))
+    return get_product_mapping(
+        args.catalog_cache,
+        ttl=args.catalog_ttl,
+        stale_while_revalidate=not args.no_stale_catalog,
+        stats=fetch_stats
+    )
+
+
+def require_single_file(args, mode):
+    # These modes track byte offsets within one plain file
+    files = expand_inputs(args.input)
+    if len(files) == 1 and (not os.path.isfile(files[0]) or detect_compression(files[0]) is None):
+        return
+    raise ValueError(f"{mode} needs --input to be a single uncompressed file")
+
+
+def print_file_summaries(files, limit=20):
+    print(f"  Per file ({len(files)} files):")
+    for filename, part in list(files.items())[:limit]:
+        print(f"  - {filename}: {part['total_input']} parsed | {part['invalid']} invalid | "
+              f"{part['filtered_by_region']} filtered by region | "
+              f"{part['filtered_by_amount']} filtered by amount | {part['final_count']} kept")
+    if len(files) > limit:
+        print(f"  ... and {len(files) - limit} more")
+
+
+def run_from_enriched(args, monitor):
+    """
+    Rebuilds analytics and the report straight from a saved enriched file.
+    """
+    print("[1/3] Loading enriched data...")
+    monitor.begin("read_enriched_data")
+    enriched = read_enriched_data(args.from_enriched)
+    monitor.end(rows_out=len(enriched))
+    print(f"✓ Loaded {len(enriched)} enriched records from {args.from_enriched}\n")
+
+    print("[2/3] Generating report...")
+    monitor.begin("generate_sales_report", rows_in=len(enriched))
+    generate_sales_report(enriched, enriched, aggregates=build_aggregates(enriched, **aggregate_options(args)))
+    monitor.end()
+    print("✓ Report saved to: output/sales_report.txt\n")
+
+    print("[3/3] Process Complete!")
+    print("=" * 40)
+
+
+def run_from_sqlite(args, monitor):
+    """
+    Rebuilds the report from a SQLite store with indexed GROUP BY queries;
+    the text file is not parsed, and memory depends on the number of
+    regions / products / customers / days rather than rows.
+    """
+    fetch_stats = new_fetch_stats()
+    scheduler = StageScheduler(monitor)
+
+    print("[1/3] Querying SQLite store...")
+    store = SalesStore(args.from_sqlite)
+    meta = store.meta()
+    if meta.get("source") and not store_is_current(store, meta["source"]):
+        print(f"[INFO] {meta['source']} has changed since the store was loaded")
+
+    scheduler.add(
+        "fetch_products", partial(load_product_map, args, fetch_stats), executor="thread",
+        metrics=lambda product_map: {"rows_out": len(product_map), **latency_summary(fetch_stats)}
+    )
+    scheduler.add("aggregates_from_store", partial(aggregates_from_store, store), executor="main",
+                  metrics=lambda agg: {"rows_in": agg.transaction_count})
+
+    def report(aggregates, product_map):
+        print(f"✓ {aggregates.transaction_count} transactions in {args.from_sqlite}\n")
+        print("[2/3] Generating report...")
+        generate_sales_report(None, None, aggregates=aggregates, product_map=product_map)
+        print("✓ Report saved to: output/sales_report.txt\n")
 
-
-def main():
+    scheduler.add("generate_sales_report", report, deps=["aggregates_from_store", "fetch_products"],
+                  executor="main")
+    scheduler.run()
+
+    print("[3/3] Process Complete!")
+    print("=" * 40)
+
+
+def run_incremental(args, monitor):
+    """
+    Non-interactive pipeline that folds only newly appended lines into the
+    saved aggregate state, appends their enriched rows and regenerates the
+    report from the aggregates.
+
+    The catalog fetch (thread) runs alongside the incremental parse (worker
+    process); saving the new enriched rows overlaps report generation.
+    """
+    require_single_file(args, "--incremental")
+    enriched_format = resolve_format(args.enriched_format)
+    if enriched_format not in ("text", "npy"):
+        raise ValueError("--incremental appends enriched rows: use --enriched-format text or npy")
+    fetch_stats = new_fetch_stats()
+    scheduler = StageScheduler(monitor)
+
+    print("[1/5] Reading new sales data...")
+    print("[2/5] Fetching product data from API...\n")
+    scheduler.add(
+        "fetch_products", partial(load_product_map, args, fetch_stats), executor="thread",
+        metrics=lambda product_map: {"rows_out": len(product_map), **latency_summary(fetch_stats)}
+    )
+    scheduler.add(
+        "incremental_aggregate",
+        partial(incremental_aggregate, args.input, args.state, rebuild=args.rebuild,
+                aggregate_options=aggregate_options(args), save=False),
+        executor="process",
+        metrics=lambda result: {
+            "rows_out": len(result[2]),
+            "bytes_read": result[3]["end_offset"] - result[3]["start_offset"]
+        }
+    )
+
+    def enrich(ingested, product_map):
+        aggregates, summary, new_rows, info = ingested
+        mode = "resumed" if info["resumed"] else "full rebuild"
+        print(f"✓ {mode}: parsed bytes {info['start_offset']}-{info['end_offset']}, "
+              f"{len(new_rows)} new valid records ({aggregates.transaction_count} total)")
+        print(f"✓ Fetched {len(product_map)} products\n")
+
+        print("[3/5] Enriching new records...")
+        enrich_sales_data(new_rows, product_map, save=False)
+        return new_rows, info
+
+    def save(enriched):
+        # The watermark moves only once the new rows are on disk
+        new_rows, info = enriched
+        filename = save_enriched_data(new_rows, append=info["resumed"], fmt=enriched_format)
+        if "pending_state" in info:
+            write_state(args.state, info["pending_state"])
+        return filename
+
+    def report(ingested, product_map):
+        print("[4/5] Generating report...")
+        generate_sales_report(None, None, aggregates=ingested[0], product_map=product_map)
+
+    scheduler.add("enrich_sales_data", enrich, deps=["incremental_aggregate", "fetch_products"],
+                  executor="main", metrics=lambda result, *_: {"rows_in": len(result[0]), "rows_out": len(result[0])})
+    scheduler.add("save_enriched_data", save, deps=["enrich_sales_data"], executor="thread",
+                  metrics=lambda _, enriched: {"rows_in": len(enriched[0])})
+    scheduler.add("generate_sales_report", report, deps=["incremental_aggregate", "fetch_products"],
+                  executor="main", metrics=lambda _, ingested, __: {"rows_in": ingested[0].transaction_count})
+    results = scheduler.run()
+
+    print(f"✓ Saved to: {results['save_enriched_data']}")
+    print("✓ Report saved to: output/sales_report.txt\n")
+
+    print("[5/5] Process Complete!")
+    print("=" * 40)
+
+
+def run_batch(args, monitor):
+    """
+    Non-interactive pipeline for a list of filter scenarios: the file is
+    scanned once, each row is routed to every scenario it matches, and one
+    report per scenario is written to --scenario-dir.
+    """
+    scenarios = load_scenarios(args.scenarios) if args.scenarios else []
+    scenarios += [parse_scenario_spec(spec) for spec in args.scenario]
+    check_scenarios(scenarios)
+    require_single_file(args, "Batch mode")
+
+    fetch_stats = new_fetch_stats()
+    scheduler = StageScheduler(monitor)
+
+    print(f"[1/3] Evaluating {len(scenarios)} scenarios in one pass...")
+    scheduler.add(
+        "fetch_products", partial(load_product_map, args, fetch_stats), executor="thread",
+        metrics=lambda product_map: {"rows_out": len(product_map), **latency_summary(fetch_stats)}
+    )
+    scheduler.add(
+        "evaluate_scenarios",
+        partial(evaluate_scenarios, args.input, scenarios, workers=args.workers,
+                aggregate_options=aggregate_options(args)),
+        executor="main",
+        metrics=lambda results: {
+            "rows_in": results[0][2]["total_input"] if results else 0,
+            "scenarios": len(results)
+        }
+    )
+
+    def reports(results, product_map):
+        if results:
+            summary = results[0][2]
+            print(f"✓ Scanned {summary['total_input']} records "
+                  f"({summary['total_input'] - summary['invalid']} valid)")
+        print(f"✓ Fetched {len(product_map)} products\n")
+
+        print("[2/3] Generating scenario reports...")
+        for scenario, aggregates, summary in results:
+            output_file = os.path.join(args.scenario_dir, f"{scenario.slug}.txt")
+            generate_sales_report(None, None, output_file=output_file,
+                                  aggregates=aggregates, product_map=product_map)
+            print(f"✓ {scenario.name} ({scenario.describe()}): "
+                  f"{summary['final_count']} records → {output_file}")
+        return len(results)
+
+    scheduler.add("generate_sales_report", reports, deps=["evaluate_scenarios", "fetch_products"],
+                  executor="main", metrics=lambda n, *_: {"reports": n})
+    scheduler.run()
+
+    print("\n[3/3] Process Complete!")
+    print("=" * 40)
+
+
+def run_follow(args, monitor):
+    """
+    Reads the whole input once, then follows it as it grows: only new
+    lines are parsed and folded into the running aggregates, and the
+    report / snapshot are regenerated after each burst of appends.
+    """
+    require_single_file(args, "--follow")
+    fetch_stats = new_fetch_stats()
+
+    print("[1/2] Fetching product data from API...")
+    monitor.begin("fetch_products")
+    product_map = load_product_map(args, fetch_stats)
+    monitor.end(rows_out=len(product_map), **latency_summary(fetch_stats))
+    print(f"✓ Fetched {len(product_map)} products\n")
+
+    print(f"[2/2] Following {args.input} (Ctrl+C to stop)...")
+    follower = SalesFollower(args.input, aggregate_options=aggregate_options(args))
+
+    def updated(follower, new_rows, seconds):
+        agg = follower.aggregates
+        print(f"[{time.strftime('%H:%M:%S')}] +{new_rows} records → {agg.transaction_count} total, "
+              f"revenue ₹{agg.total_revenue:,.2f} (report updated in {seconds * 1000:.0f} ms)")
+
+    monitor.begin("follow")
     try:
-        print("=" * 40)
-        print("       SALES ANALYTICS SYSTEM")
-        print("=" * 40)
-        print()
-
-        # ---------------------------------------------------------
-        # [1/10] Read Sales Data
-        # ---------------------------------------------------------
-        print("[1/10] Reading sales data...")
-
-        raw = read_sales_data("salesdata.txt")
-        print(f"✓ Successfully read {len(raw)} raw records\n")
-
-        # ---------------------------------------------------------
-        # [2/10] Parse and Clean
-        # ---------------------------------------------------------
-        print("[2/10] Parsing and cleaning data...")
-
-        parsed = parse_transactions(raw)
-        print(f"✓ Parsed {len(parsed)} records\n")
-
-        # ---------------------------------------------------------
-        # [3/10] Show Filter Options
-        # ---------------------------------------------------------
+        follow_sales_file(follower, product_map, snapshot_file=args.snapshot or None,
+                          poll_interval=args.poll_interval, debounce=args.debounce,
+                          max_delay=max(args.debounce, 0.75), on_update=updated)
+    except KeyboardInterrupt:
+        print("\nStopped following.")
+    monitor.end(rows_out=follower.aggregates.transaction_count, rotations=follower.rotations)
+    print("=" * 40)
+
+
+def run_service(args, monitor):
+    """
+    Loads and indexes the sales file once, then answers analytics queries
+    over HTTP from memory until interrupted (Ctrl+C).
+    """
+    require_single_file(args, "--serve")
+    fetch_stats = new_fetch_stats()
+
+    print("[1/3] Fetching product data from API...")
+    monitor.begin("fetch_products")
+    product_map = load_product_map(args, fetch_stats)
+    monitor.end(rows_out=len(product_map), **latency_summary(fetch_stats))
+    print(f"✓ Fetched {len(product_map)} products\n")
+
+    print("[2/3] Loading sales data...")
+    service = AnalyticsService(args.input, product_map, aggregate_options(args), cache_size=args.cache_size)
+    monitor.begin("load_service")
+    rows = service.load()
+    monitor.end(rows_out=rows)
+    print(f"✓ {rows} valid records in memory\n")
+
+    server, url = start_query_server(service, args.host, args.port, args.refresh_interval or None)
+    print(f"[3/3] Serving analytics at {url}/ (Ctrl+C to stop)")
+    print("Endpoints: " + ", ".join("/" + name for name in service.status()["endpoints"]))
+    print("Filters:   ?region=North&min_amount=500&max_amount=20000; POST /refresh to reload\n")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\nStopping query service...")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_pipeline(args, monitor):
+    """
+    The interactive 10-step pipeline, run as a stage graph:
+    - the catalog fetch (step 6) starts first, in a thread, and overlaps
+      reading, parsing, validation, the filter prompt and analysis
+    - analysis (step 5) runs while the catalog is still loading, or else
+      after enrichment, alongside saving the enriched file (step 8)
+    Steps therefore finish in dependency order rather than strictly 1..10.
+
+    The CPU stages stay on the main thread: each takes or returns the full
+    row list, and pickling it to a worker process and back costs several
+    times the work itself. Process parallelism comes from --workers, where
+    each worker parses and pre-aggregates its own byte range, so the rows
+    are pickled once, in place of parsing them in this process.
+    """
+    fetch_stats = new_fetch_stats()
+    scheduler = StageScheduler(monitor)
+
+    # ---------------------------------------------------------
+    # [6/10] Fetch API Products (background)
+    # ---------------------------------------------------------
+    scheduler.add(
+        "fetch_products", partial(load_product_map, args, fetch_stats), executor="thread",
+        metrics=lambda product_map: {"rows_out": len(product_map), **latency_summary(fetch_stats)}
+    )
+
+    # ---------------------------------------------------------
+    # [1/10] Read Sales Data  /  [2/10] Parse and Clean
+    # ---------------------------------------------------------
+    files = expand_inputs(args.input)
+    multi_file = len(files) > 1 or any(os.path.isfile(f) and detect_compression(f) for f in files)
+
+    if args.workers > 1 or multi_file:
+        def ingest():
+            # Read, parse, validate and pre-aggregate per file / byte range
+            # (in parallel with --workers); steps 1-2 collapse
+            print("[1/10] Reading sales data...")
+            parsed, aggregates, summary = ingest_files(
+                files, args.workers, keep_rows=True, aggregate_options=aggregate_options(args)
+            )
+            source = f" from {len(summary['files'])} files" if len(summary["files"]) > 1 else ""
+            pool = f" with {args.workers} workers" if args.workers > 1 else ""
+            print(f"✓ Successfully read {summary['total_input']} records{source}{pool}\n")
+
+            print("[2/10] Parsing and cleaning data...")
+            print(f"✓ Parsed {len(parsed)} valid records\n")
+            return parsed, aggregates, summary
+
+        scheduler.add("parallel_ingest", ingest, executor="main",
+                      metrics=lambda result: {"rows_out": len(result[0]), "workers": args.workers,
+                                              "files": len(result[2]["files"])})
+        ingest_stage = "parallel_ingest"
+    else:
+        def read():
+            print("[1/10] Reading sales data...")
+            sales = open_sales_file(args.input)
+            if sales is not None:
+                print(f"✓ Mapped {sales.size:,} bytes ({sales.encoding})\n")
+            return sales
+
+        stats = {"lines": 0}
+
+        def parse(sales):
+            print("[2/10] Parsing and cleaning data...")
+            parsed = []
+            if sales is not None:
+                with sales:
+                    parsed = list(sales.iter_transactions(stats=stats))
+            print(f"✓ Successfully read {stats['lines']} raw records")
+            print(f"✓ Parsed {len(parsed)} records\n")
+            return parsed, None, None
+
+        scheduler.add("read_sales_data", read, executor="main",
+                      metrics=lambda sales: {"bytes": sales.size if sales is not None else 0})
+        scheduler.add("parse_transactions", parse, deps=["read_sales_data"], executor="main",
+                      metrics=lambda result, sales: {"rows_in": stats["lines"], "rows_out": len(result[0])})
+        ingest_stage = "parse_transactions"
+
+    # ---------------------------------------------------------
+    # [3/10] Show Filter Options
+    # ---------------------------------------------------------
+    def validate_and_index(ingested):
+        parsed, aggregates, summary = ingested
         print("[3/10] Filter Options Available:")
 
-        # derive region set
-        regions = sorted(set(tx["Region"] for tx in parsed))
-        print("Regions:", ", ".join(regions))
+        # Validate once and index the valid rows; the region list, amount
+        # range and the chosen slice are then all read from the index
+        if summary is None:
+            summary = new_validation_summary()
+            parsed = list(iter_valid_transactions(parsed, summary))
+        index = build_filter_index(parsed)
+
+        print("Regions:", ", ".join(index.regions))
+        if index.min_amount is not None:
+            print(f"Amount Range: ₹{index.min_amount:,.0f} - ₹{index.max_amount:,.0f}\n")
+        return parsed, aggregates, summary, index
 
-        # compute amount range
-        amounts = [tx["Quantity"] * tx["UnitPrice"] for tx in parsed]
-        min_amt, max_amt = min(amounts), max(amounts)
-        print(f"Amount Range: ₹{min_amt:,.0f} - ₹{max_amt:,.0f}\n")
+    def filter_prompt(validated):
+        regions = validated[3].regions
 
         # user filter choice
         apply_filter = input("Do you want to filter data? (y/n): ").strip().lower()
@@ -210,79 +665,167 @@ def main():
                 max_filter = float(max_input)
 
         print()
-
-        # ---------------------------------------------------------
-        # [4/10] Validate + Apply Filters
-        # ---------------------------------------------------------
+        return region_filter, min_filter, max_filter
+
+    scheduler.add("validate_and_index", validate_and_index, deps=[ingest_stage], executor="main",
+                  metrics=lambda result, ingested: {"rows_in": len(ingested[0]), "rows_out": len(result[0])})
+    # includes the time spent waiting on the prompts
+    scheduler.add("filter_prompt", filter_prompt, deps=["validate_and_index"], executor="main")
+
+    # ---------------------------------------------------------
+    # [4/10] Validate + Apply Filters
+    # ---------------------------------------------------------
+    def filter_query(validated, filters):
+        parsed, aggregates, summary, index = validated
+        region_filter, min_filter, max_filter = filters
         print("[4/10] Validating transactions...")
 
-        valid_tx, invalid_count, summary = validate_and_filter(
-            parsed,
-            region=region_filter,
-            min_amount=min_filter,
-            max_amount=max_filter
-        )
+        invalid_count = summary["invalid"]
+        if region_filter or min_filter is not None or max_filter is not None:
+            summary["final_count"] = 0
+            valid_tx = index.query(region_filter, min_filter, max_filter, summary)
+            aggregates = None  # worker pre-aggregates covered the unfiltered rows
+            if "files" in summary:
+                count_filtered_by_file(summary["files"], index, region_filter, min_filter, max_filter)
+        else:
+            summary["final_count"] = len(parsed)
+            valid_tx = parsed
 
         print(f"✓ Valid: {len(valid_tx)} | Invalid: {invalid_count}")
+        if summary["invalid_date"]:
+            print(f"  ({summary['invalid_date']} invalid records had a bad date)")
+        if len(summary.get("files", ())) > 1:
+            print_file_summaries(summary["files"])
         print()
-
-        # ---------------------------------------------------------
-        # [5/10] Perform Data Analysis
-        # ---------------------------------------------------------
-        print("[5/10] Analyzing sales data...")
-
-        # Perform analyses to ensure no crashes later
-        calculate_total_revenue(valid_tx)
-        region_wise_sales(valid_tx)
-        top_selling_products(valid_tx)
-        customer_analysis(valid_tx)
-        daily_sales_trend(valid_tx)
-        find_peak_sales_day(valid_tx)
-        low_performing_products(valid_tx)
-
-        print("✓ Analysis complete\n")
-
-        # ---------------------------------------------------------
-        # [6/10] Fetch API Products
-        # ---------------------------------------------------------
+        return valid_tx, aggregates
+
+    scheduler.add("filter_query", filter_query, deps=["validate_and_index", "filter_prompt"], executor="main",
+                  metrics=lambda result, validated, _: {
+                      "rows_in": len(validated[0]), "rows_out": len(result[0]),
+                      "invalid": validated[2]["invalid"]
+                  })
+
+    # ---------------------------------------------------------
+    # [7/10] Enrich Sales Data
+    # ---------------------------------------------------------
+    def enrich(filtered, product_map):
+        valid_tx = filtered[0]
         print("[6/10] Fetching product data from API...")
+        print(f"✓ Fetched {len(product_map)} products\n")
 
-        api_products = fetch_all_products()
-        print(f"✓ Fetched {len(api_products)} products\n")
-
-        # ---------------------------------------------------------
-        # [7/10] Enrich Sales Data
-        # ---------------------------------------------------------
         print("[7/10] Enriching sales data...")
-
-        product_map = create_product_mapping(api_products)
-        enriched = enrich_sales_data(valid_tx, product_map)
+        enriched = enrich_sales_data(valid_tx, product_map, save=False)
 
         enriched_count = sum(1 for tx in enriched if tx.get("API_Match"))
         success_rate = (enriched_count / len(enriched)) * 100 if enriched else 0
 
         print(f"✓ Enriched {enriched_count}/{len(enriched)} transactions ({success_rate:.1f}%)\n")
+        return enriched
+
+    # Added before analysis: when the catalog is already in, enrichment runs
+    # first so analysis can overlap saving the enriched file
+    scheduler.add("enrich_sales_data", enrich, deps=["filter_query", "fetch_products"], executor="main",
+                  metrics=lambda enriched, filtered, _: {"rows_in": len(filtered[0]), "rows_out": len(enriched)})
+
+    # ---------------------------------------------------------
+    # [5/10] Perform Data Analysis
+    # ---------------------------------------------------------
+    def analyze(filtered):
+        valid_tx, aggregates = filtered
+        print("[5/10] Analyzing sales data...")
 
-        # ---------------------------------------------------------
-        # [8/10] Saving Enriched Data
-        # ---------------------------------------------------------
-        print("[8/10] Saving enriched data...")
+        # Build every accumulator in one pass (unless the workers already did),
+        # then read all analyses from it
+        if aggregates is None:
+            aggregates = build_aggregates(valid_tx, **aggregate_options(args))
 
-        print("✓ Saved to: data/enriched_sales_data.txt\n")
+        # Perform analyses to ensure no crashes later
+        calculate_total_revenue(aggregates)
+        region_wise_sales(aggregates)
+        top_selling_products(aggregates)
+        customer_analysis(aggregates, top_n=5)
+        daily_sales_trend(aggregates)
+        find_peak_sales_day(aggregates)
+        if not aggregates.approximate_top:
+            low_performing_products(aggregates)
 
-        # ---------------------------------------------------------
-        # [9/10] Generate Report
-        # ---------------------------------------------------------
+        print("✓ Analysis complete\n")
+        return aggregates
+
+    scheduler.add("analysis", analyze, deps=["filter_query"], executor="main",
+                  metrics=lambda _, filtered: {"rows_in": len(filtered[0])})
+
+    # ---------------------------------------------------------
+    # [8/10] Saving Enriched Data (background)
+    # ---------------------------------------------------------
+    scheduler.add("save_enriched_data", partial(save_enriched_data, fmt=args.enriched_format),
+                  deps=["enrich_sales_data"], executor="thread",
+                  metrics=lambda _, enriched: {"rows_in": len(enriched)})
+
+    if args.sqlite_store:
+        def save_store(filtered, filters):
+            store = SalesStore(args.sqlite_store)
+            return store.load(filtered[0], meta=source_meta(args.input, filters))
+
+        scheduler.add("save_sqlite_store", save_store, deps=["filter_query", "filter_prompt"],
+                      executor="thread", metrics=lambda count, *_: {"rows_out": count})
+
+    # ---------------------------------------------------------
+    # [9/10] Generate Report
+    # ---------------------------------------------------------
+    def report(filtered, aggregates, enriched):
         print("[9/10] Generating report...")
-
-        generate_sales_report(valid_tx, enriched)
+        generate_sales_report(filtered[0], enriched, aggregates=aggregates)
         print("✓ Report saved to: output/sales_report.txt\n")
 
-        # ---------------------------------------------------------
-        # [10/10] Complete
-        # ---------------------------------------------------------
-        print("[10/10] Process Complete!")
+    scheduler.add("generate_sales_report", report,
+                  deps=["filter_query", "analysis", "enrich_sales_data"], executor="main",
+                  metrics=lambda _, __, aggregates, ___: {"rows_in": aggregates.transaction_count})
+
+    results = scheduler.run()
+
+    print("[8/10] Saving enriched data...")
+    print(f"✓ Saved to: {results['save_enriched_data']}")
+    if args.sqlite_store:
+        print(f"✓ Loaded {results['save_sqlite_store']} transactions into {args.sqlite_store}")
+    print()
+
+    # ---------------------------------------------------------
+    # [10/10] Complete
+    # ---------------------------------------------------------
+    print("[10/10] Process Complete!")
+    print("=" * 40)
+    print(f"Stage time: {scheduler.total_stage_seconds():.2f}s total, "
+          f"{scheduler.critical_path_seconds():.2f}s on the critical path")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    monitor = PipelineMonitor(trace_memory=args.tracemalloc)
+    status = "failed"
+
+    try:
         print("=" * 40)
+        print("       SALES ANALYTICS SYSTEM")
+        print("=" * 40)
+        print()
+
+        with profiled(args.profile):
+            if args.from_enriched:
+                run_from_enriched(args, monitor)
+            elif args.from_sqlite:
+                run_from_sqlite(args, monitor)
+            elif args.incremental:
+                run_incremental(args, monitor)
+            elif args.follow:
+                run_follow(args, monitor)
+            elif args.serve:
+                run_service(args, monitor)
+            elif args.scenarios or args.scenario:
+                run_batch(args, monitor)
+            else:
+                run_pipeline(args, monitor)
+        status = "success"
 
     except Exception as e:
         print("\n[ERROR] An unexpected error occurred.")
@@ -290,6 +833,15 @@ def main():
         print("The application will now exit safely.\n")
         sys.exit(1)
 
+    finally:
+        # Bounded: a refresh stuck retrying a down API must not delay exit
+        wait_for_background_refresh()
+        monitor.finish(status)
+        if args.metrics_json:
+            monitor.write_json(args.metrics_json)
+        if args.metrics_prom:
+            monitor.write_prometheus(args.metrics_prom)
+
 
 if __name__ == "__main__":
     main()
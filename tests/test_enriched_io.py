@@ -0,0 +1,50 @@
+# tests/test_enriched_io.py
+
+import utils.enriched_io as enriched_io
+from utils.enriched_io import read_enriched_data, write_enriched
+
+
+def make_rows(prefix, count):
+    return [
+        {
+            "TransactionID": f"{prefix}{i:03d}", "Date": "2024-01-01",
+            "ProductID": f"P{i}", "ProductName": f"Product {i}",
+            "Quantity": i, "UnitPrice": 1.5, "CustomerID": f"C{i}",
+            "Region": "North", "API_Category": None, "API_Brand": "Brand",
+            "API_Rating": 4.0, "API_Match": True
+        }
+        for i in range(count)
+    ]
+
+
+def test_append_after_interrupted_write_keeps_columns_aligned(tmp_path, monkeypatch):
+    path = str(tmp_path / "enriched_npy")
+    write_enriched(make_rows("A", 10), path, fmt="npy", chunk_size=10)
+
+    # Fail part-way through the next chunk: a few columns get the new rows
+    # and an updated header, the rest do not
+    real_header = enriched_io._npy_header
+    calls = []
+
+    def failing_header(dtype, rows):
+        if rows == 15:
+            calls.append(rows)
+        if len(calls) > 3:
+            raise OSError("disk full")
+        return real_header(dtype, rows)
+
+    monkeypatch.setattr(enriched_io, "_npy_header", failing_header)
+    try:
+        write_enriched(make_rows("X", 5), path, fmt="npy", append=True)
+    except OSError:
+        pass
+    monkeypatch.setattr(enriched_io, "_npy_header", real_header)
+    assert len(calls) == 4
+
+    assert len(read_enriched_data(path)) == 10
+
+    write_enriched(make_rows("B", 5), path, fmt="npy", append=True)
+    rows = read_enriched_data(path)
+
+    assert [tx["TransactionID"] for tx in rows] == [f"A{i:03d}" for i in range(10)] + [f"B{i:03d}" for i in range(5)]
+    assert [tx["Quantity"] for tx in rows] == list(range(10)) + list(range(5))
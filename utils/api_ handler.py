@@ -1,15 +1,116 @@
 # utils/api_handler.py
 
 import requests
-import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.enriched_io import enriched_filename, resolve_format, write_enriched
 
 # ====================================
 # Task 3.1 (a) — Fetch All Products
 # ====================================
-def fetch_all_products():
+PRODUCTS_URL = "https://dummyjson.com/products"
+
+
+def format_products(data):
+    """
+    Keeps only the fields we use from a DummyJSON /products payload.
+    """
+    formatted = []
+    for p in data.get("products", []):
+        formatted.append({
+            'id': p.get('id'),
+            'title': p.get('title'),
+            'category': p.get('category'),
+            'brand': p.get('brand'),
+            'price': p.get('price'),
+            'rating': p.get('rating')
+        })
+    return formatted
+
+
+def new_fetch_stats():
+    return {"requests": 0, "retries": 0, "pages": 0, "latencies": [], "elapsed": 0.0}
+
+
+def make_session(pool_size=8):
+    """
+    requests.Session whose connection pool can keep pool_size sockets
+    open, so concurrent page requests reuse connections.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_page(session, url, skip, limit, timeout=5, retries=3, backoff=0.5, stats=None,
+             headers=None):
+    """
+    GETs one page (?limit=&skip=) with exponential backoff on failure.
+    Per-request latency is appended to stats['latencies'] (seconds).
+    Returns: the requests.Response (a 304 is returned, not raised).
+    """
+    stats = stats if stats is not None else new_fetch_stats()
+
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            response = session.get(
+                url, params={"limit": limit, "skip": skip}, headers=headers, timeout=timeout
+            )
+            stats["requests"] += 1
+            stats["latencies"].append(time.perf_counter() - start)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+        except requests.exceptions.RequestException:
+            if attempt == retries:
+                raise
+            stats["retries"] += 1
+            time.sleep(backoff * (2 ** attempt))
+
+
+def fetch_remaining_pages(session, url, first_page, page_size=100, max_workers=8, timeout=5,
+                          retries=3, backoff=0.5, stats=None):
+    """
+    Given the decoded first page, fetches every other page concurrently
+    (at most max_workers in flight) and returns all raw products in order.
+    """
+    stats = stats if stats is not None else new_fetch_stats()
+    products = list(first_page.get("products", []))
+    total = first_page.get("total", len(products))
+    page_size = len(products) or page_size
+    skips = range(len(products), total, page_size)
+
+    def fetch(skip):
+        # Each page counts into its own stats; they are summed below, so the
+        # worker threads never update the shared dict
+        page_stats = new_fetch_stats()
+        response = get_page(session, url, skip, page_size, timeout, retries, backoff, page_stats)
+        return response.json().get("products", []), page_stats
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for page, page_stats in pool.map(fetch, skips):
+            products.extend(page)
+            stats["requests"] += page_stats["requests"]
+            stats["retries"] += page_stats["retries"]
+            stats["latencies"].extend(page_stats["latencies"])
+
+    stats["pages"] += 1 + len(skips)
+    return products
+
+
+def fetch_all_products(url=PRODUCTS_URL, timeout=5, page_size=100, max_workers=8, retries=3,
+                       backoff=0.5, stats=None):
     """
     Fetches all products from DummyJSON API
     
+    Reads the first page to learn the catalog size, then every remaining
+    page concurrently over one pooled session. Pass a dict from
+    new_fetch_stats() as `stats` to collect request counts and latencies.
+    
     Returns: list of product dictionaries in format:
     [
         {
@@ -23,30 +124,24 @@ def fetch_all_products():
         ...
     ]
     """
-    url = "https://dummyjson.com/products?limit=100"
-    
+    stats = stats if stats is not None else new_fetch_stats()
+    start = time.perf_counter()
+
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        
-        products = data.get("products", [])
+        with make_session(max_workers) as session:
+            first = get_page(session, url, 0, page_size, timeout, retries, backoff, stats).json()
+            products = fetch_remaining_pages(
+                session, url, first, page_size, max_workers, timeout, retries, backoff, stats
+            )
         
-        formatted = []
-        for p in products:
-            formatted.append({
-                'id': p.get('id'),
-                'title': p.get('title'),
-                'category': p.get('category'),
-                'brand': p.get('brand'),
-                'price': p.get('price'),
-                'rating': p.get('rating')
-            })
+        formatted = format_products({"products": products})
+        stats["elapsed"] = time.perf_counter() - start
         
         print(f"[SUCCESS] Fetched {len(formatted)} products from API")
         return formatted
 
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
+        stats["elapsed"] = time.perf_counter() - start
         print(f"[ERROR] Failed to fetch products from API: {e}")
         return []
 
@@ -80,7 +175,41 @@ def create_product_mapping(api_products):
 # ====================================
 # Task 3.2 — Enrich Sales Data
 # ====================================
-def enrich_sales_data(transactions, product_mapping):
+def parse_product_code(product_id):
+    """
+    Extracts the numeric part of a ProductID (P101 → 101), or None.
+    """
+    try:
+        return int(product_id.replace("P", "").strip())
+    except (ValueError, AttributeError):
+        return None
+
+
+def _join_product(product_id, product_mapping):
+    api_info = product_mapping.get(parse_product_code(product_id))
+    if api_info is None:
+        return {"API_Category": None, "API_Brand": None, "API_Rating": None, "API_Match": False}
+    return {
+        "API_Category": api_info.get('category'),
+        "API_Brand": api_info.get('brand'),
+        "API_Rating": api_info.get('rating'),
+        "API_Match": True
+    }
+
+
+def build_enrichment_lookup(product_ids, product_mapping):
+    """
+    Joins each distinct ProductID against the catalog exactly once.
+    Returns: { 'P101': {'API_Category': ..., 'API_Brand': ..., 'API_Rating': ..., 'API_Match': bool} }
+    """
+    lookup = {}
+    for pid in product_ids:
+        if pid not in lookup:
+            lookup[pid] = _join_product(pid, product_mapping)
+    return lookup
+
+
+def enrich_sales_data(transactions, product_mapping, save=True):
     """
     Enriches each transaction with API details.
     
@@ -90,76 +219,47 @@ def enrich_sales_data(transactions, product_mapping):
     - API_Rating
     - API_Match (True/False)
     
+    The catalog is joined once per distinct ProductID and the columns are
+    written onto the given transaction dicts in place (no per-row copies;
+    Transaction records keep a reference to the per-product dict);
+    the same list is returned.
+    
     Saving is done via `save_enriched_data()`
     """
-    enriched = []
+    lookup = {}
     
     for tx in transactions:
-        new_tx = tx.copy()
-        
-        # Extract numeric part of ProductID (P101 → 101)
-        try:
-            numeric_id = int(new_tx["ProductID"].replace("P", "").strip())
-        except:
-            numeric_id = None
-        
-        if numeric_id in product_mapping:
-            api_info = product_mapping[numeric_id]
-            new_tx["API_Category"] = api_info.get('category')
-            new_tx["API_Brand"] = api_info.get('brand')
-            new_tx["API_Rating"] = api_info.get('rating')
-            new_tx["API_Match"] = True
-        else:
-            new_tx["API_Category"] = None
-            new_tx["API_Brand"] = None
-            new_tx["API_Rating"] = None
-            new_tx["API_Match"] = False
-        
-        enriched.append(new_tx)
+        pid = tx["ProductID"]
+        api_cols = lookup.get(pid)
+        if api_cols is None:
+            api_cols = lookup[pid] = _join_product(pid, product_mapping)
+        tx.update(api_cols)
     
     # Save to file after enriching
-    save_enriched_data(enriched)
+    if save:
+        save_enriched_data(transactions)
     
-    return enriched
+    return transactions
 
 
 # ====================================
 # Helper — Save Enriched Data
 # ====================================
-def save_enriched_data(enriched_transactions, filename='data/enriched_sales_data.txt'):
+def save_enriched_data(enriched_transactions, filename='data/enriched_sales_data.txt', append=False,
+                       fmt="text"):
     """
-    Saves enriched transactions to file using pipe delimiters.
-    Creates folder if missing.
+    Saves enriched transactions to file using pipe delimiters (fmt="text"),
+    or as Parquet / Arrow IPC / npy columns via utils.enriched_io.
+    Creates folder if missing. With append=True (text / npy only), rows are
+    added to an existing file (header written only if the file is new).
     """
+    fmt = resolve_format(fmt)
+    if fmt != "text":
+        if append and fmt != "npy":
+            raise ValueError("Appending is only supported for the text and npy formats")
+        filename = enriched_filename(filename, fmt)
     
-    # Ensure output folder exists
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    
-    # Header with new API fields
-    header_fields = [
-        "TransactionID", "Date", "ProductID", "ProductName",
-        "Quantity", "UnitPrice", "CustomerID", "Region",
-        "API_Category", "API_Brand", "API_Rating", "API_Match"
-    ]
-    
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write("|".join(header_fields) + "\n")
-        
-        for tx in enriched_transactions:
-            row = [
-                str(tx.get("TransactionID", "")),
-                str(tx.get("Date", "")),
-                str(tx.get("ProductID", "")),
-                str(tx.get("ProductName", "")),
-                str(tx.get("Quantity", "")),
-                str(tx.get("UnitPrice", "")),
-                str(tx.get("CustomerID", "")),
-                str(tx.get("Region", "")),
-                str(tx.get("API_Category", "")),
-                str(tx.get("API_Brand", "")),
-                str(tx.get("API_Rating", "")),
-                str(tx.get("API_Match", ""))
-            ]
-            f.write("|".join(row) + "\n")
+    write_enriched(enriched_transactions, filename, fmt, append=append)
     
     print(f"[SUCCESS] Enriched data saved to: {filename}")
+    return filename
@@ -0,0 +1,192 @@
+# utils/catalog_cache.py
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import requests
+
+from utils.api_handler import (
+    PRODUCTS_URL,
+    format_products,
+    create_product_mapping,
+    make_session,
+    get_page,
+    fetch_remaining_pages
+)
+
+
+# ====================================
+# Persistent Product Catalog Cache
+# ====================================
+class ProductCatalogCache:
+    """
+    Stores the output of create_product_mapping() in a small SQLite file,
+    together with when it was fetched and the HTTP validators (ETag /
+    Last-Modified) needed for a conditional refresh.
+    """
+
+    def __init__(self, path="data/product_cache.sqlite"):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS products ("
+                "id INTEGER PRIMARY KEY, title TEXT, category TEXT, brand TEXT, rating REAL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self):
+        # One short-lived connection per call keeps the cache usable from
+        # the background refresh thread. `with conn` only commits, so callers
+        # also wrap it in closing()
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self):
+        """
+        Returns: (mapping, meta) or (None, {}) when nothing is cached yet.
+        meta holds 'fetched_at', 'etag' and 'last_modified' (strings).
+        """
+        with closing(self._connect()) as conn, conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if "fetched_at" not in meta:
+                return None, {}
+            rows = conn.execute("SELECT id, title, category, brand, rating FROM products")
+            mapping = {
+                pid: {'title': title, 'category': category, 'brand': brand, 'rating': rating}
+                for pid, title, category, brand, rating in rows
+            }
+        return mapping, meta
+
+    def store(self, mapping, etag=None, last_modified=None):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM products")
+            conn.executemany(
+                "INSERT INTO products (id, title, category, brand, rating) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (pid, info.get('title'), info.get('category'), info.get('brand'), info.get('rating'))
+                    for pid, info in mapping.items()
+                ]
+            )
+            self._write_meta(conn, etag, last_modified)
+
+    def touch(self, etag=None, last_modified=None):
+        """
+        Marks the cached catalog as fresh again (after a 304 Not Modified).
+        """
+        with closing(self._connect()) as conn, conn:
+            self._write_meta(conn, etag, last_modified)
+
+    @staticmethod
+    def _write_meta(conn, etag, last_modified):
+        values = {"fetched_at": repr(time.time())}
+        if etag:
+            values["etag"] = etag
+        if last_modified:
+            values["last_modified"] = last_modified
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items())
+
+
+def refresh_catalog(cache, meta=None, url=PRODUCTS_URL, timeout=5, page_size=100, max_workers=8,
+                    stats=None):
+    """
+    Conditionally re-downloads the catalog into the cache.
+
+    Sends If-None-Match / If-Modified-Since from the cached validators on
+    the first page, so an unchanged catalog costs a single 304 with no
+    body; otherwise the remaining pages are fetched concurrently.
+    Returns: the fresh mapping, or None if the API could not be reached
+    (the cache is left untouched in that case).
+    """
+    meta = meta or {}
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        with make_session(max_workers) as session:
+            response = get_page(session, url, 0, page_size, timeout, stats=stats, headers=headers)
+            if response.status_code == 304:
+                cache.touch(meta.get("etag"), meta.get("last_modified"))
+                mapping, _ = cache.load()
+                return mapping
+
+            products = fetch_remaining_pages(
+                session, url, response.json(), page_size, max_workers, timeout, stats=stats
+            )
+        mapping = create_product_mapping(format_products({"products": products}))
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"[ERROR] Failed to refresh product catalog: {e}")
+        return None
+
+    cache.store(mapping, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return mapping
+
+
+_background_refreshes = []
+
+
+def wait_for_background_refresh(timeout=1.0):
+    """
+    Gives background refreshes started by get_product_mapping up to
+    `timeout` seconds in total to finish storing the new catalog. They run
+    in daemon threads, so one still retrying an API that is down is simply
+    abandoned at exit instead of holding the process open.
+    """
+    deadline = time.monotonic() + timeout
+    for thread in _background_refreshes:
+        thread.join(max(deadline - time.monotonic(), 0))
+    _background_refreshes[:] = [thread for thread in _background_refreshes if thread.is_alive()]
+
+
+def get_product_mapping(cache_path="data/product_cache.sqlite", ttl=24 * 3600, url=PRODUCTS_URL,
+                        stale_while_revalidate=True, timeout=5, stats=None):
+    """
+    Returns the product mapping (same format as create_product_mapping),
+    using the on-disk cache whenever possible.
+
+    - Fresh cache (younger than ttl seconds): returned with no network call.
+    - Stale cache + stale_while_revalidate: returned immediately while a
+      background thread refreshes the cache for the next run.
+    - Stale cache otherwise: refreshed now; if the API is down the stale
+      mapping is still returned so enrichment keeps working.
+    - No cache: fetched now ({} if the API is down).
+
+    Pass a dict from new_fetch_stats() as `stats` to collect request
+    latencies of any synchronous fetch.
+    """
+    cache = ProductCatalogCache(cache_path)
+    mapping, meta = cache.load()
+
+    if mapping is not None:
+        age = time.time() - float(meta["fetched_at"])
+        if age < ttl:
+            print(f"[SUCCESS] Loaded {len(mapping)} products from cache ({age:.0f}s old)")
+            return mapping
+
+        if stale_while_revalidate:
+            print(f"[INFO] Using stale product cache ({age:.0f}s old), refreshing in background")
+            thread = threading.Thread(
+                target=refresh_catalog, args=(cache, meta, url, timeout), name="catalog-refresh", daemon=True
+            )
+            thread.start()
+            _background_refreshes.append(thread)
+            return mapping
+
+    fresh = refresh_catalog(cache, meta, url, timeout, stats=stats)
+    if fresh is not None:
+        print(f"[SUCCESS] Product catalog refreshed ({len(fresh)} products)")
+        return fresh
+
+    if mapping is not None:
+        print(f"[INFO] API unavailable, using cached catalog of {len(mapping)} products")
+        return mapping
+
+    return {}
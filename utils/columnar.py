@@ -0,0 +1,301 @@
+# utils/columnar.py
+
+from array import array
+
+import numpy as np
+
+from utils.api_handler import build_enrichment_lookup
+from utils.dates import date_ordinal
+
+
+# =====================================
+# Columnar Transaction Store
+# =====================================
+class _Encoder:
+    """
+    Dictionary-encodes a categorical column: each distinct label gets an
+    integer code in first-seen order (so results keep the same ordering
+    as the dict-based functions in data_processor).
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def encode(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+class TransactionTable:
+    """
+    Holds validated transactions column-wise in NumPy arrays.
+
+    Categorical columns (Region, ProductID, ProductName, CustomerID, Date)
+    are stored as int32 codes into the matching `*_labels` list.
+    TransactionID is kept as fixed-width UTF-8 bytes; Quantity, UnitPrice and
+    Amount are plain numeric arrays.
+    """
+
+    CATEGORICAL = ("Date", "ProductID", "ProductName", "CustomerID", "Region")
+
+    def __init__(self, transaction_ids, quantity, unit_price, codes, labels, amount=None):
+        self.transaction_ids = transaction_ids
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.amount = amount if amount is not None else quantity * unit_price
+        self.codes = codes          # {column: np.int32 array}
+        self.labels = labels        # {column: [label, ...]}
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """
+        Builds a table from any iterable of transaction dicts (a list or a
+        stream from stream_transactions). Rows are never held as dicts.
+        """
+        encoders = {col: _Encoder() for col in cls.CATEGORICAL}
+        code_buffers = {col: array("i") for col in cls.CATEGORICAL}
+        tids = []
+        qty = array("q")
+        price = array("d")
+
+        for tx in transactions:
+            tids.append(tx["TransactionID"].encode("utf-8"))
+            qty.append(tx["Quantity"])
+            price.append(tx["UnitPrice"])
+            for col in cls.CATEGORICAL:
+                code_buffers[col].append(encoders[col].encode(tx[col]))
+
+        quantity = np.frombuffer(qty, dtype=np.int64).copy()
+        unit_price = np.frombuffer(price, dtype=np.float64).copy()
+        codes = {
+            col: np.frombuffer(buf, dtype=np.int32).copy()
+            for col, buf in code_buffers.items()
+        }
+        labels = {col: enc.labels for col, enc in encoders.items()}
+
+        return cls(np.array(tids, dtype="S"), quantity, unit_price, codes, labels)
+
+    def __len__(self):
+        return len(self.quantity)
+
+    @property
+    def nbytes(self):
+        total = self.transaction_ids.nbytes + self.quantity.nbytes
+        total += self.unit_price.nbytes + self.amount.nbytes
+        total += sum(c.nbytes for c in self.codes.values())
+        return total
+
+    def take(self, rows):
+        """
+        Returns a new table with only the given row indices / boolean mask.
+        Label lists are shared, so codes stay valid.
+        """
+        return TransactionTable(
+            self.transaction_ids[rows],
+            self.quantity[rows],
+            self.unit_price[rows],
+            {col: c[rows] for col, c in self.codes.items()},
+            self.labels,
+            self.amount[rows],
+        )
+
+    def row(self, i):
+        """
+        Materializes one row back into the transaction dict format.
+        """
+        tx = {"TransactionID": self.transaction_ids[i].decode("utf-8")}
+        for col in self.CATEGORICAL:
+            tx[col] = self.labels[col][self.codes[col][i]]
+        tx["Quantity"] = int(self.quantity[i])
+        tx["UnitPrice"] = float(self.unit_price[i])
+        tx["Amount"] = float(self.amount[i])
+        return tx
+
+    def to_transactions(self):
+        return [self.row(i) for i in range(len(self))]
+
+
+def build_table(transactions):
+    return TransactionTable.from_transactions(transactions)
+
+
+def _group_sum(table, column, values):
+    # Sequential per-group sums (np.bincount adds in input order)
+    return np.bincount(table.codes[column], weights=values, minlength=len(table.labels[column]))
+
+
+def _group_count(table, column):
+    return np.bincount(table.codes[column], minlength=len(table.labels[column]))
+
+
+def _distinct_pairs_per_group(table, group_col, member_col):
+    # Number / identity of distinct (group, member) pairs via a combined int64 key
+    n_members = max(len(table.labels[member_col]), 1)
+    keys = table.codes[group_col].astype(np.int64) * n_members + table.codes[member_col]
+    pairs = np.unique(keys)
+    return pairs // n_members, pairs % n_members
+
+
+# =====================================
+# Catalog Join
+# =====================================
+def join_catalog(table, product_mapping):
+    """
+    Hash-joins the catalog onto the table by ProductID code: each distinct
+    ProductID is looked up once, then the per-product values are gathered
+    for every row with one fancy-index per column.
+
+    Returns: {'API_Category': ..., 'API_Brand': ..., 'API_Rating': ..., 'API_Match': ...}
+    as row-aligned NumPy arrays (object, object, float64 with NaN, bool).
+    """
+    lookup = build_enrichment_lookup(table.labels["ProductID"], product_mapping)
+    per_product = [lookup[pid] for pid in table.labels["ProductID"]]
+    codes = table.codes["ProductID"]
+
+    rating = np.array(
+        [np.nan if p["API_Rating"] is None else p["API_Rating"] for p in per_product],
+        dtype=np.float64
+    )
+    return {
+        "API_Category": np.array([p["API_Category"] for p in per_product], dtype=object)[codes],
+        "API_Brand": np.array([p["API_Brand"] for p in per_product], dtype=object)[codes],
+        "API_Rating": rating[codes],
+        "API_Match": np.array([p["API_Match"] for p in per_product], dtype=bool)[codes],
+    }
+
+
+# =====================================
+# Vectorized Analytics (same formats as data_processor)
+# =====================================
+def calculate_total_revenue(table):
+    """
+    Returns: float
+    """
+    return float(table.amount.sum())
+
+
+def region_wise_sales(table):
+    """
+    Same format as data_processor.region_wise_sales
+    """
+    totals = _group_sum(table, "Region", table.amount).tolist()
+    counts = _group_count(table, "Region").tolist()
+    global_total = sum(totals)
+
+    final = {}
+    for code, region in enumerate(table.labels["Region"]):
+        if not counts[code]:
+            continue
+        final[region] = {
+            "total_sales": totals[code],
+            "transaction_count": counts[code],
+            "percentage": (totals[code] / global_total * 100) if global_total else 0
+        }
+
+    return dict(sorted(final.items(), key=lambda x: x[1]["total_sales"], reverse=True))
+
+
+def _product_totals(table):
+    present = _group_count(table, "ProductName") > 0
+    qty = _group_sum(table, "ProductName", table.quantity).astype(np.int64)
+    rev = _group_sum(table, "ProductName", table.amount)
+    codes = np.flatnonzero(present)
+    return codes, qty[codes], rev[codes]
+
+
+def top_selling_products(table, n=5):
+    """
+    Same format as data_processor.top_selling_products
+    """
+    codes, qty, rev = _product_totals(table)
+    order = np.argsort(-qty, kind="stable")[:n]
+    names = table.labels["ProductName"]
+    return [(names[codes[i]], int(qty[i]), float(rev[i])) for i in order]
+
+
+def customer_analysis(table, top_n=None):
+    """
+    Same format as data_processor.customer_analysis
+    """
+    spent = _group_sum(table, "CustomerID", table.amount)
+    counts = _group_count(table, "CustomerID")
+    cust_codes, prod_codes = _distinct_pairs_per_group(table, "CustomerID", "ProductName")
+
+    # split the sorted (customer, product) pairs into one slice per customer
+    bounds = np.searchsorted(cust_codes, np.arange(len(counts) + 1)).tolist()
+    names = table.labels["ProductName"]
+    cids = table.labels["CustomerID"]
+
+    # The output is built in Python: plain lists avoid a NumPy scalar per access
+    order = np.argsort(-spent, kind="stable")
+    order = order[counts[order] > 0]
+    if top_n is not None:
+        order = order[:top_n]
+    spent_list, counts_list, products_list = spent.tolist(), counts.tolist(), prod_codes.tolist()
+
+    final = {}
+    for code in order.tolist():
+        count = counts_list[code]
+        total = spent_list[code]
+        final[cids[code]] = {
+            "total_spent": total,
+            "purchase_count": count,
+            "avg_order_value": total / count,
+            "products_bought": [names[p] for p in products_list[bounds[code]:bounds[code + 1]]]
+        }
+
+    return final
+
+
+def daily_sales_trend(table):
+    """
+    Same format as data_processor.daily_sales_trend
+    """
+    revenue = _group_sum(table, "Date", table.amount)
+    counts = _group_count(table, "Date")
+    day_codes, _ = _distinct_pairs_per_group(table, "Date", "CustomerID")
+    uniques = np.bincount(day_codes, minlength=len(counts))
+
+    # only the distinct date labels need parsing for the chronological order;
+    # unparsable dates are left out, as in data_processor
+    dates = table.labels["Date"]
+    present = sorted(
+        (date_ordinal(dates[code]), code) for code in range(len(dates))
+        if counts[code] and date_ordinal(dates[code]) is not None
+    )
+
+    final = {}
+    for _, code in present:
+        final[dates[code]] = {
+            "revenue": float(revenue[code]),
+            "transaction_count": int(counts[code]),
+            "unique_customers": int(uniques[code])
+        }
+
+    return final
+
+
+def find_peak_sales_day(table):
+    """
+    Returns (date, revenue, transaction_count), or None for an empty table
+    """
+    daily = daily_sales_trend(table)
+    if not daily:
+        return None
+    date, stats = max(daily.items(), key=lambda x: x[1]["revenue"])
+    return (date, stats["revenue"], stats["transaction_count"])
+
+
+def low_performing_products(table, threshold=10):
+    """
+    Same format as data_processor.low_performing_products
+    """
+    codes, qty, rev = _product_totals(table)
+    low = np.flatnonzero(qty < threshold)
+    order = low[np.argsort(qty[low], kind="stable")]
+    names = table.labels["ProductName"]
+    return [(names[codes[i]], int(qty[i]), float(rev[i])) for i in order]
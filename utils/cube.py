@@ -0,0 +1,232 @@
+# utils/cube.py
+
+from datetime import date
+
+from utils.dates import date_ordinal, ordinal_to_iso
+
+
+# =====================================
+# Region × Product × Day Sales Cube
+# =====================================
+GRAINS = ("day", "week", "month")
+
+
+def _period_start(ordinal, grain):
+    # First day (as an ordinal) of the week (Monday) / month holding `ordinal`
+    if grain == "day":
+        return ordinal
+    if grain == "week":
+        return ordinal - (ordinal - 1) % 7  # ordinal 1 (0001-01-01) is a Monday
+    if grain == "month":
+        return ordinal - date.fromordinal(ordinal).day + 1
+    raise ValueError(f"Unknown grain: {grain} (use one of {', '.join(GRAINS)})")
+
+
+def period_label(ordinal, grain="day"):
+    """
+    'YYYY-MM-DD' for days and weeks (the Monday), 'YYYY-MM' for months.
+    """
+    iso = ordinal_to_iso(ordinal)
+    return iso[:7] if grain == "month" else iso
+
+
+def _as_ordinal(value):
+    if value is None or isinstance(value, int):
+        return value
+    ordinal = date_ordinal(value)
+    if ordinal is None:
+        raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+    return ordinal
+
+
+class SalesCube:
+    """
+    Materialized aggregate keyed by (region, product_name, day_ordinal).
+
+    Each cell holds [revenue, quantity, transaction_count]; rows whose date
+    does not parse go to day None and only show up in queries without a
+    date range. Week and month roll-ups are built from the day cells the
+    first time they are queried and kept until the cube changes.
+
+    Queries scan cells, never rows, so they cost O(cells) however many
+    transactions were added. Keys keep first-seen order, so ties come out
+    in the same order as the functions in data_processor.
+    """
+
+    def __init__(self):
+        self.cells = {}
+        self._rollups = {}
+
+    def add(self, tx):
+        key = (tx["Region"], tx["ProductName"], date_ordinal(tx["Date"]))
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = [0.0, 0, 0]
+        cell[0] += tx["Amount"]
+        cell[1] += tx["Quantity"]
+        cell[2] += 1
+        self._rollups.clear()
+
+    def update(self, transactions):
+        for tx in transactions:
+            self.add(tx)
+        return self
+
+    def merge(self, other):
+        """
+        Folds in another cube (e.g. one built from a later slice of the file).
+        """
+        for key, (revenue, qty, count) in other.cells.items():
+            cell = self.cells.get(key)
+            if cell is None:
+                self.cells[key] = [revenue, qty, count]
+            else:
+                cell[0] += revenue
+                cell[1] += qty
+                cell[2] += count
+        self._rollups.clear()
+        return self
+
+    def __len__(self):
+        return len(self.cells)
+
+    def rollup(self, grain):
+        """
+        Cells re-keyed by (region, product_name, period_start_ordinal).
+        """
+        if grain == "day":
+            return self.cells
+        cells = self._rollups.get(grain)
+        if cells is None:
+            _period_start(1, grain)  # validate grain
+            cells = {}
+            for (region, pname, day), (revenue, qty, count) in self.cells.items():
+                key = (region, pname, None if day is None else _period_start(day, grain))
+                cell = cells.get(key)
+                if cell is None:
+                    cells[key] = [revenue, qty, count]
+                else:
+                    cell[0] += revenue
+                    cell[1] += qty
+                    cell[2] += count
+            self._rollups[grain] = cells
+        return cells
+
+    def query(self, by=(), region=None, product=None, start=None, end=None, grain="day"):
+        """
+        Sums the cells matching the filters, grouped by any of
+        'region', 'product' and 'period' (the grain's period start ordinal).
+
+        start / end ('YYYY-MM-DD' or day ordinal, inclusive) filter at day
+        level even for week / month grouping, so partial periods are exact.
+
+        Returns: {group_key: [revenue, quantity, transaction_count]} where
+        group_key is a tuple in `by` order (a plain value for one field,
+        () for none).
+        """
+        positions = {"region": 0, "product": 1, "period": 2}
+        try:
+            picks = [positions[field] for field in by]
+        except KeyError as e:
+            raise ValueError(f"Unknown cube dimension: {e.args[0]}") from None
+
+        start, end = _as_ordinal(start), _as_ordinal(end)
+        dated = start is not None or end is not None
+        # A date range needs day cells; otherwise the roll-up is smaller
+        cells = self.cells if dated else self.rollup(grain)
+
+        result = {}
+        for key, (revenue, qty, count) in cells.items():
+            cell_region, cell_product, day = key
+            if region is not None and cell_region != region:
+                continue
+            if product is not None and cell_product != product:
+                continue
+            if dated:
+                if day is None or (start is not None and day < start) or (end is not None and day > end):
+                    continue
+                if grain != "day":
+                    key = (cell_region, cell_product, _period_start(day, grain))
+
+            if len(picks) == 1:
+                group = key[picks[0]]
+            else:
+                group = tuple(key[i] for i in picks)
+            totals = result.get(group)
+            if totals is None:
+                result[group] = [revenue, qty, count]
+            else:
+                totals[0] += revenue
+                totals[1] += qty
+                totals[2] += count
+        return result
+
+
+def build_cube(transactions):
+    return SalesCube().update(transactions)
+
+
+# =====================================
+# Analytics From The Cube
+# =====================================
+# Same formats as the data_processor functions, plus region / date filters.
+def calculate_total_revenue(cube, region=None, start=None, end=None):
+    totals = cube.query((), region=region, start=start, end=end).get((), [0.0])
+    return float(totals[0])
+
+
+def region_wise_sales(cube, start=None, end=None, product=None):
+    by_region = cube.query(("region",), product=product, start=start, end=end)
+    global_total = sum(revenue for revenue, _, _ in by_region.values())
+
+    final = {}
+    for region, (revenue, _, count) in by_region.items():
+        final[region] = {
+            "total_sales": revenue,
+            "transaction_count": count,
+            "percentage": (revenue / global_total * 100) if global_total else 0
+        }
+    return dict(sorted(final.items(), key=lambda x: x[1]["total_sales"], reverse=True))
+
+
+def _product_rows(cube, region, start, end):
+    by_product = cube.query(("product",), region=region, start=start, end=end)
+    return [(pname, qty, revenue) for pname, (revenue, qty, _) in by_product.items()]
+
+
+def top_selling_products(cube, n=5, region=None, start=None, end=None):
+    rows = _product_rows(cube, region, start, end)
+    rows.sort(key=lambda x: x[1], reverse=True)
+    return rows[:n]
+
+
+def daily_sales_trend(cube, region=None, start=None, end=None, grain="day"):
+    """
+    Chronological trend per day / week / month. unique_customers is None:
+    the cube has no customer dimension.
+    """
+    by_period = cube.query(("period",), region=region, start=start, end=end, grain=grain)
+
+    final = {}
+    for period in sorted(p for p in by_period if p is not None):
+        revenue, _, count = by_period[period]
+        final[period_label(period, grain)] = {
+            "revenue": revenue,
+            "transaction_count": count,
+            "unique_customers": None
+        }
+    return final
+
+
+def find_peak_sales_day(cube, region=None, start=None, end=None):
+    daily = daily_sales_trend(cube, region, start, end)
+    if not daily:
+        return None
+    day, stats = max(daily.items(), key=lambda x: x[1]["revenue"])
+    return (day, stats["revenue"], stats["transaction_count"])
+
+
+def low_performing_products(cube, threshold=10, region=None, start=None, end=None):
+    low = [row for row in _product_rows(cube, region, start, end) if row[1] < threshold]
+    low.sort(key=lambda x: x[1])
+    return low
@@ -1,7 +1,241 @@
 # utils/data_processor.py
 
-from collections import defaultdict
-from datetime import datetime
+import heapq
+
+from utils.dates import date_ordinal, ordinal_to_iso
+from utils.sketches import CountMinSketch, HyperLogLog, SpaceSaving
+
+
+# =====================================
+# Single-pass Aggregation Engine
+# =====================================
+class SalesAggregates:
+    """
+    Accumulators behind every analytics function, built in one pass.
+
+    Plain dicts/lists are used (no lambdas) so the object stays picklable.
+    - regions:   {region: [total_sales, transaction_count]}
+    - products:  {product_name: [total_qty, total_revenue]}
+    - customers: {customer_id: [total_spent, purchase_count, set(product_names)]}
+    - days:      {day_ordinal: [revenue, transaction_count, set(customer_ids)]}
+                 (see utils.dates; rows with an unparsable date only count in `undated`)
+    - product_ids: {product_id: transaction_count} (for enrichment summaries)
+
+    heavy_hitter_error (e.g. 0.001) switches products and customers to
+    bounded-memory heavy-hitter tracking for streams with too many keys:
+    - product_hh:  SpaceSaving by quantity, payload = revenue
+    - customer_hh: SpaceSaving by amount, payload = [purchase_count, set(product_names)]
+    - customer_spend: CountMinSketch of amount per customer
+    Tracked values overestimate by at most heavy_hitter_error * total weight;
+    `products` and `customers` stay empty in this mode.
+
+    distinct_precision (4-16) replaces the per-day customer sets and the
+    per-customer product sets with HyperLogLog sketches of that precision
+    (relative error ~1.04 / sqrt(2**p)); exact sets are the default.
+    """
+
+    def __init__(self, heavy_hitter_error=None, distinct_precision=None):
+        self.total_revenue = 0.0
+        self.transaction_count = 0
+        self.regions = {}
+        self.products = {}
+        self.customers = {}
+        self.days = {}
+        self.undated = 0
+        self.product_ids = {}
+
+        self.heavy_hitter_error = heavy_hitter_error
+        if heavy_hitter_error:
+            self.product_hh = SpaceSaving.for_error(heavy_hitter_error)
+            self.customer_hh = SpaceSaving.for_error(heavy_hitter_error)
+            self.customer_spend = CountMinSketch(epsilon=heavy_hitter_error)
+        else:
+            self.product_hh = self.customer_hh = self.customer_spend = None
+
+        if distinct_precision is not None:
+            HyperLogLog(distinct_precision)  # validate early
+        self.distinct_precision = distinct_precision
+
+    @property
+    def approximate_top(self):
+        return self.product_hh is not None
+
+    @property
+    def approximate_distinct(self):
+        return self.distinct_precision is not None
+
+    @property
+    def distinct_error(self):
+        # Relative standard error of unique counts (0 when exact)
+        if self.distinct_precision is None:
+            return 0
+        return HyperLogLog(self.distinct_precision).relative_error
+
+    def _new_distinct(self):
+        if self.distinct_precision is None:
+            return set()
+        return HyperLogLog(self.distinct_precision)
+
+    def add(self, tx):
+        qty = tx["Quantity"]
+        amount = qty * tx["UnitPrice"]
+        pname = tx["ProductName"]
+        cid = tx["CustomerID"]
+
+        self.total_revenue += amount
+        self.transaction_count += 1
+
+        region = self.regions.get(tx["Region"])
+        if region is None:
+            region = self.regions[tx["Region"]] = [0.0, 0]
+        region[0] += amount
+        region[1] += 1
+
+        if self.product_hh is not None:
+            self._add_heavy_hitters(pname, qty, cid, amount)
+        else:
+            product = self.products.get(pname)
+            if product is None:
+                product = self.products[pname] = [0, 0.0]
+            product[0] += qty
+            product[1] += amount
+
+            customer = self.customers.get(cid)
+            if customer is None:
+                customer = self.customers[cid] = [0.0, 0, self._new_distinct()]
+            customer[0] += amount
+            customer[1] += 1
+            customer[2].add(pname)
+
+        ordinal = date_ordinal(tx["Date"])
+        if ordinal is None:
+            self.undated += 1
+        else:
+            day = self.days.get(ordinal)
+            if day is None:
+                day = self.days[ordinal] = [0.0, 0, self._new_distinct()]
+            day[0] += amount
+            day[1] += 1
+            day[2].add(cid)
+
+        pid = tx["ProductID"]
+        self.product_ids[pid] = self.product_ids.get(pid, 0) + 1
+
+    def _add_heavy_hitters(self, pname, qty, cid, amount):
+        # A counter evicted and re-admitted starts a fresh payload
+        product = self.product_hh.add(pname, qty)
+        if product[2] is None:
+            product[2] = 0.0
+        product[2] += amount
+
+        customer = self.customer_hh.add(cid, amount)
+        if customer[2] is None:
+            customer[2] = [0, self._new_distinct()]
+        customer[2][0] += 1
+        customer[2][1].add(pname)
+
+        self.customer_spend.add(cid, amount)
+
+    def update(self, transactions):
+        for tx in transactions:
+            self.add(tx)
+        return self
+
+    def merge(self, other):
+        """
+        Folds another partial aggregation (e.g. from a worker that saw a
+        later slice of the same file) into this one. Merging partials in
+        file order keeps the same key order as a serial pass.
+        """
+        if self.heavy_hitter_error != other.heavy_hitter_error:
+            raise ValueError("Cannot merge aggregates built with different heavy-hitter settings")
+        if self.distinct_precision != other.distinct_precision:
+            raise ValueError("Cannot merge aggregates built with different distinct-count precision")
+
+        self.total_revenue += other.total_revenue
+        self.transaction_count += other.transaction_count
+
+        for region, (total, count) in other.regions.items():
+            mine = self.regions.get(region)
+            if mine is None:
+                self.regions[region] = [total, count]
+            else:
+                mine[0] += total
+                mine[1] += count
+
+        for pname, (qty, rev) in other.products.items():
+            mine = self.products.get(pname)
+            if mine is None:
+                self.products[pname] = [qty, rev]
+            else:
+                mine[0] += qty
+                mine[1] += rev
+
+        for cid, (spent, count, products) in other.customers.items():
+            mine = self.customers.get(cid)
+            if mine is None:
+                self.customers[cid] = [spent, count, products.copy()]
+            else:
+                mine[0] += spent
+                mine[1] += count
+                mine[2] |= products
+
+        self.undated += other.undated
+        for ordinal, (revenue, count, customers) in other.days.items():
+            mine = self.days.get(ordinal)
+            if mine is None:
+                self.days[ordinal] = [revenue, count, customers.copy()]
+            else:
+                mine[0] += revenue
+                mine[1] += count
+                mine[2] |= customers
+
+        for pid, count in other.product_ids.items():
+            self.product_ids[pid] = self.product_ids.get(pid, 0) + count
+
+        if self.product_hh is not None:
+            self.product_hh.merge(other.product_hh, _merge_revenue)
+            self.customer_hh.merge(other.customer_hh, _merge_customer_payload)
+            self.customer_spend.merge(other.customer_spend)
+
+        return self
+
+
+def _merge_revenue(mine, theirs):
+    return mine + theirs
+
+
+def _merge_customer_payload(mine, theirs):
+    mine[0] += theirs[0]
+    mine[1] |= theirs[1]
+    return mine
+
+
+def build_aggregates(transactions, **options):
+    """
+    Walks the transactions once and returns a SalesAggregates object
+    that every analytics function below can read from.
+    options are passed to SalesAggregates (e.g. heavy_hitter_error=0.001).
+    """
+    return SalesAggregates(**options).update(transactions)
+
+
+def _as_aggregates(transactions):
+    # Accept either raw transactions or an already-built aggregates object
+    if isinstance(transactions, SalesAggregates):
+        return transactions
+    return build_aggregates(transactions)
+
+
+def top_error(transactions):
+    """
+    Returns (quantity_error, spend_error): the most a heavy-hitter quantity
+    or customer spend can overstate the true value. (0, 0) when exact.
+    """
+    agg = _as_aggregates(transactions)
+    if not agg.approximate_top:
+        return 0, 0
+    return agg.product_hh.max_error, min(agg.customer_hh.max_error, agg.customer_spend.max_error)
 
 
 # =====================================
@@ -10,12 +244,10 @@ from datetime import datetime
 def calculate_total_revenue(transactions):
     """
     Calculates total revenue from all transactions.
+    Accepts a transaction list or a SalesAggregates object.
     Returns: float
     """
-    total = 0.0
-    for tx in transactions:
-        total += tx["Quantity"] * tx["UnitPrice"]
-    return float(total)
+    return float(_as_aggregates(transactions).total_revenue)
 
 
 # =====================================
@@ -30,27 +262,23 @@ def region_wise_sales(transactions):
         ...
     }
     """
-    region_stats = defaultdict(lambda: {"total_sales": 0.0, "transaction_count": 0})
-    
-    # Calculate totals & counts
-    for tx in transactions:
-        amount = tx["Quantity"] * tx["UnitPrice"]
-        region = tx["Region"]
-        region_stats[region]["total_sales"] += amount
-        region_stats[region]["transaction_count"] += 1
-    
+    agg = _as_aggregates(transactions)
+
     # Calculate global total for percentage
-    global_total = sum(r["total_sales"] for r in region_stats.values())
-    
+    global_total = sum(total for total, _ in agg.regions.values())
+
     # Add percentage and sort
     final = {}
-    for region, stats in region_stats.items():
-        stats["percentage"] = (stats["total_sales"] / global_total * 100) if global_total else 0
-        final[region] = stats
-    
+    for region, (total, count) in agg.regions.items():
+        final[region] = {
+            "total_sales": total,
+            "transaction_count": count,
+            "percentage": (total / global_total * 100) if global_total else 0
+        }
+
     # Sort by total_sales desc
     final = dict(sorted(final.items(), key=lambda x: x[1]["total_sales"], reverse=True))
-    
+
     return final
 
 
@@ -66,32 +294,29 @@ def top_selling_products(transactions, n=5):
         ...
     ]
     """
-    product_map = defaultdict(lambda: {"qty": 0, "rev": 0.0})
-    
-    for tx in transactions:
-        pname = tx["ProductName"]
-        amount = tx["Quantity"] * tx["UnitPrice"]
-        product_map[pname]["qty"] += tx["Quantity"]
-        product_map[pname]["rev"] += amount
-    
+    agg = _as_aggregates(transactions)
+
+    # Heavy-hitter mode: quantities are upper bounds (see top_error)
+    if agg.approximate_top:
+        return [(pname, qty, rev) for pname, qty, _, rev in agg.product_hh.top(n)]
+
     # convert to tuples
-    result = [
-        (pname, vals["qty"], vals["rev"])
-        for pname, vals in product_map.items()
-    ]
-    
-    # sort by qty desc
-    result.sort(key=lambda x: x[1], reverse=True)
-    
-    return result[:n]
+    result = (
+        (pname, qty, rev)
+        for pname, (qty, rev) in agg.products.items()
+    )
+
+    # heap select instead of sorting every product (same order as a stable sort)
+    return heapq.nlargest(n, result, key=lambda x: x[1])
 
 
 # =====================================
 # Task 2.1 (d) — Customer Purchase Analysis
 # =====================================
-def customer_analysis(transactions):
+def customer_analysis(transactions, top_n=None):
     """
     Returns customer purchase metrics sorted by total_spent desc.
+    top_n keeps only the n biggest spenders (heap select, no full sort).
     Format:
     {
         'C001': {
@@ -102,35 +327,41 @@ def customer_analysis(transactions):
         },
         ...
     }
+    In distinct-count (HyperLogLog) mode product names are not kept:
+    products_bought is None and 'unique_products' holds the estimate.
     """
-    cust_map = defaultdict(lambda: {
-        "total_spent": 0.0,
-        "purchase_count": 0,
-        "products": set()
-    })
-    
-    for tx in transactions:
-        cid = tx["CustomerID"]
-        amount = tx["Quantity"] * tx["UnitPrice"]
-        cust_map[cid]["total_spent"] += amount
-        cust_map[cid]["purchase_count"] += 1
-        cust_map[cid]["products"].add(tx["ProductName"])
-    
+    agg = _as_aggregates(transactions)
+
+    if agg.approximate_top:
+        # Only tracked heavy hitters are known; total_spent is the tighter of
+        # the Space-Saving and Count-Min overestimates
+        ranked = sorted((
+            (cid, min(spent, agg.customer_spend.estimate(cid)), count, products)
+            for cid, (spent, _, (count, products)) in agg.customer_hh.counters.items()
+        ), key=lambda x: x[1], reverse=True)[:top_n]
+    else:
+        ranked = (
+            (cid, total, count, products)
+            for cid, (total, count, products) in agg.customers.items()
+        )
+        if top_n is None:
+            # sort by total_spent descending
+            ranked = sorted(ranked, key=lambda x: x[1], reverse=True)
+        else:
+            ranked = heapq.nlargest(top_n, ranked, key=lambda x: x[1])
+
     # build final output
     final = {}
-    for cid, stats in cust_map.items():
-        total = stats["total_spent"]
-        count = stats["purchase_count"]
+    for cid, total, count, products in ranked:
         final[cid] = {
             "total_spent": total,
             "purchase_count": count,
             "avg_order_value": (total / count) if count else 0,
-            "products_bought": list(stats["products"])
+            "products_bought": None if agg.approximate_distinct else list(products)
         }
-    
-    # sort by total_spent descending
-    final = dict(sorted(final.items(), key=lambda x: x[1]["total_spent"], reverse=True))
-    
+        if agg.approximate_distinct:
+            final[cid]["unique_products"] = len(products)
+
     return final
 
 
@@ -149,25 +380,20 @@ def daily_sales_trend(transactions):
         },
         ...
     }
+    unique_customers is a HyperLogLog estimate in distinct-count mode.
+    Rows whose date does not parse are left out.
     """
-    day_map = defaultdict(lambda: {"revenue": 0.0, "transaction_count": 0, "customers": set()})
-    
-    for tx in transactions:
-        date_str = tx["Date"]  # expected format 'YYYY-MM-DD'
-        amount = tx["Quantity"] * tx["UnitPrice"]
-        day_map[date_str]["revenue"] += amount
-        day_map[date_str]["transaction_count"] += 1
-        day_map[date_str]["customers"].add(tx["CustomerID"])
-    
+    agg = _as_aggregates(transactions)
+
     # build final sorted chronologically
     final = {}
-    for date_str, stats in sorted(day_map.items(), key=lambda x: datetime.strptime(x[0], "%Y-%m-%d")):
-        final[date_str] = {
-            "revenue": stats["revenue"],
-            "transaction_count": stats["transaction_count"],
-            "unique_customers": len(stats["customers"])
+    for ordinal, (revenue, count, customers) in sorted(agg.days.items()):
+        final[ordinal_to_iso(ordinal)] = {
+            "revenue": revenue,
+            "transaction_count": count,
+            "unique_customers": len(customers)
         }
-    
+
     return final
 
 
@@ -176,16 +402,19 @@ def daily_sales_trend(transactions):
 # =====================================
 def find_peak_sales_day(transactions):
     """
-    Returns (date, revenue, transaction_count)
+    Returns (date, revenue, transaction_count), or None when there are
+    no (dated) transactions, e.g. a filter that matches nothing
     """
-    daily = daily_sales_trend(transactions)
-    
+    daily = daily_sales_trend(_as_aggregates(transactions))
+    if not daily:
+        return None
+
     peak_day = max(daily.items(), key=lambda x: x[1]["revenue"])
-    
+
     date = peak_day[0]
     revenue = peak_day[1]["revenue"]
     count = peak_day[1]["transaction_count"]
-    
+
     return (date, revenue, count)
 
 
@@ -196,23 +425,20 @@ def low_performing_products(transactions, threshold=10):
     """
     Returns list of (ProductName, TotalQuantity, TotalRevenue)
     for products with quantity < threshold sorted qty asc.
+    Not available in heavy-hitter mode, which drops the long tail.
     """
-    product_map = defaultdict(lambda: {"qty": 0, "rev": 0.0})
-    
-    for tx in transactions:
-        pname = tx["ProductName"]
-        amount = tx["Quantity"] * tx["UnitPrice"]
-        product_map[pname]["qty"] += tx["Quantity"]
-        product_map[pname]["rev"] += amount
-    
+    agg = _as_aggregates(transactions)
+    if agg.approximate_top:
+        raise ValueError("Low performers are not tracked in heavy-hitter mode")
+
     # filter low performers
     low = [
-        (pname, vals["qty"], vals["rev"])
-        for pname, vals in product_map.items()
-        if vals["qty"] < threshold
+        (pname, qty, rev)
+        for pname, (qty, rev) in agg.products.items()
+        if qty < threshold
     ]
-    
+
     # sort by qty ascending
     low.sort(key=lambda x: x[1])
-    
+
     return low
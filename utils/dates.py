@@ -0,0 +1,61 @@
+# utils/dates.py
+
+from datetime import date
+
+
+# ====================================
+# Shared Date Layer
+# ====================================
+# Every distinct date string is parsed once and interned as its proleptic
+# Gregorian day ordinal (date.toordinal()), so days can be sorted and
+# bucketed as plain ints. Bad strings are cached too (as None).
+_ORDINALS = {}
+_ISO = {}
+MAX_CACHED = 1 << 16  # years of distinct days; stops junk input growing the cache forever
+
+
+def _parse_iso_date(date_str):
+    # Fixed YYYY-MM-DD only: checks the shape first, then lets the C
+    # date constructor reject impossible days (2024-02-30, month 13, ...)
+    if len(date_str) != 10 or date_str[4] != "-" or date_str[7] != "-":
+        return None
+    year, month, day = date_str[:4], date_str[5:7], date_str[8:]
+    if not (year.isdigit() and month.isdigit() and day.isdigit()):
+        return None
+    try:
+        return date(int(year), int(month), int(day)).toordinal()
+    except ValueError:
+        return None
+
+
+def date_ordinal(date_str):
+    """
+    Returns the day ordinal for a 'YYYY-MM-DD' string, or None if the
+    string is not a valid date.
+    """
+    try:
+        return _ORDINALS[date_str]
+    except KeyError:
+        pass
+    ordinal = _parse_iso_date(date_str)
+    if len(_ORDINALS) < MAX_CACHED:
+        _ORDINALS[date_str] = ordinal
+    return ordinal
+
+
+def is_valid_date(date_str):
+    return date_ordinal(date_str) is not None
+
+
+def ordinal_to_iso(ordinal):
+    """
+    Returns the 'YYYY-MM-DD' string for a day ordinal.
+    """
+    try:
+        return _ISO[ordinal]
+    except KeyError:
+        pass
+    iso = date.fromordinal(ordinal).isoformat()
+    if len(_ISO) < MAX_CACHED:
+        _ISO[ordinal] = iso
+    return iso
@@ -0,0 +1,404 @@
+# utils/enriched_io.py
+
+import os
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional: Parquet / Arrow output needs pyarrow
+    pa = None
+
+
+ENRICHED_FIELDS = [
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region",
+    "API_Category", "API_Brand", "API_Rating", "API_Match"
+]
+
+STRING_FIELDS = ["TransactionID", "Date", "ProductID", "ProductName", "CustomerID", "Region"]
+NULLABLE_STRING_FIELDS = ["API_Category", "API_Brand"]
+
+# "npy" is a directory of column files, named like the other outputs
+FORMAT_EXTENSIONS = {"text": ".txt", "parquet": ".parquet", "arrow": ".arrow", "npy": "_npy"}
+NPY_HEADER_BYTES = 128  # fixed size, so the row count can be rewritten in place
+NPY_COLUMNS = (
+    STRING_FIELDS + NULLABLE_STRING_FIELDS
+    + [field + "__null" for field in NULLABLE_STRING_FIELDS]
+    + ["Quantity", "UnitPrice", "API_Rating", "API_Match"]
+)
+
+
+# ====================================
+# Enriched Data Writers
+# ====================================
+class EnrichedWriter:
+    """
+    Base class: write_chunk() is called with lists of enriched transaction
+    dicts, close() finalizes the file. Usable as a context manager.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.rows_written = 0
+        folder = os.path.dirname(filename)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def write_chunk(self, rows):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TextWriter(EnrichedWriter):
+    """
+    The original pipe-delimited format, written through a large buffer.
+    """
+
+    def __init__(self, filename, append=False, buffer_size=1 << 20):
+        super().__init__(filename)
+        append = append and os.path.exists(filename)
+        self.file = open(filename, "a" if append else "w", encoding="utf-8", buffering=buffer_size)
+        if not append:
+            self.file.write("|".join(ENRICHED_FIELDS) + "\n")
+
+    def write_chunk(self, rows):
+        self.file.write("".join(
+            "|".join([str(tx.get(field, "")) for field in ENRICHED_FIELDS]) + "\n"
+            for tx in rows
+        ))
+        self.rows_written += len(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def _chunk_columns(rows):
+    # Row dicts → typed column lists shared by the binary writers
+    columns = {field: [tx.get(field) for tx in rows] for field in STRING_FIELDS + NULLABLE_STRING_FIELDS}
+    columns["Quantity"] = [tx.get("Quantity") for tx in rows]
+    columns["UnitPrice"] = [tx.get("UnitPrice") for tx in rows]
+    columns["API_Rating"] = [tx.get("API_Rating") for tx in rows]
+    columns["API_Match"] = [bool(tx.get("API_Match")) for tx in rows]
+    return columns
+
+
+class ArrowWriter(EnrichedWriter):
+    """
+    Parquet (fmt='parquet') or Arrow IPC file (fmt='arrow'); one record
+    batch / row group per chunk. Requires pyarrow.
+    """
+
+    def __init__(self, filename, fmt="parquet"):
+        if pa is None:
+            raise ImportError("pyarrow is required for Parquet / Arrow output")
+        super().__init__(filename)
+        self.schema = pa.schema(
+            [(field, pa.string()) for field in STRING_FIELDS + NULLABLE_STRING_FIELDS]
+            + [("Quantity", pa.int64()), ("UnitPrice", pa.float64()),
+               ("API_Rating", pa.float64()), ("API_Match", pa.bool_())]
+        )
+        if fmt == "parquet":
+            self.writer = pq.ParquetWriter(filename, self.schema)
+        else:
+            self.writer = pa_ipc.new_file(filename, self.schema)
+
+    def write_chunk(self, rows):
+        if not rows:
+            return
+        self.writer.write_table(pa.Table.from_pydict(_chunk_columns(rows), schema=self.schema))
+        self.rows_written += len(rows)
+
+    def close(self):
+        self.writer.close()
+
+
+def _npy_header(dtype, rows):
+    # .npy format 1.0 header padded to NPY_HEADER_BYTES (a multiple of 64)
+    text = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)})
+    prefix = b"\x93NUMPY\x01\x00"
+    size = NPY_HEADER_BYTES - len(prefix) - 2
+    return prefix + size.to_bytes(2, "little") + (text.ljust(size - 1) + "\n").encode("latin1")
+
+
+def _string_dtype(chars):
+    # Widths are rounded up to a power of two, so a column is widened rarely
+    return np.dtype(f"<U{1 << max(chars - 1, 0).bit_length()}")
+
+
+def _chunk_arrays(rows):
+    columns = _chunk_columns(rows)
+    arrays = {field: np.array(columns[field], dtype=str) for field in STRING_FIELDS}
+    for field in NULLABLE_STRING_FIELDS:
+        values = columns[field]
+        arrays[field] = np.array(["" if v is None else v for v in values], dtype=str)
+        arrays[field + "__null"] = np.array([v is None for v in values], dtype=bool)
+    arrays["Quantity"] = np.array(columns["Quantity"], dtype=np.int64)
+    arrays["UnitPrice"] = np.array(columns["UnitPrice"], dtype=np.float64)
+    arrays["API_Rating"] = np.array(
+        [np.nan if v is None else v for v in columns["API_Rating"]], dtype=np.float64
+    )
+    arrays["API_Match"] = np.array(columns["API_Match"], dtype=bool)
+    return arrays
+
+
+class NpyWriter(EnrichedWriter):
+    """
+    A directory holding one .npy file per column (fallback when pyarrow is
+    missing). Nullable string columns get a '<field>__null' mask; missing
+    ratings are NaN.
+
+    Each chunk is appended to the column files as it arrives and the row
+    count in their headers is updated, so memory is bounded by the chunk
+    and every column can be opened with np.load(..., mmap_mode="r") (see
+    load_enriched_columns). Strings are fixed width: if a chunk holds a
+    longer value than a column allows, that column is rewritten wider.
+    """
+
+    def __init__(self, filename, append=False):
+        super().__init__(filename)
+        os.makedirs(filename, exist_ok=True)
+        self.files = {}  # column -> (open file, dtype)
+        self.size = 0
+
+        headers = {}
+        for name in sorted(os.listdir(filename)):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(filename, name)
+            if not append:
+                os.remove(path)
+                continue
+            f = open(path, "r+b")
+            np.lib.format.read_magic(f)
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+            if f.tell() != NPY_HEADER_BYTES:
+                f.close()
+                raise ValueError(f"Cannot append to {path}: not written by NpyWriter")
+            self.files[name[:-4]] = (f, dtype)
+            headers[name[:-4]] = shape[0]
+        if not headers:
+            return
+
+        # An interrupted chunk can leave some columns longer than others (or
+        # missing); keep only the rows every column has
+        if set(headers) != set(NPY_COLUMNS):
+            self.size = 0
+        else:
+            self.size = min(headers.values())
+        for f, dtype in self.files.values():
+            f.truncate(NPY_HEADER_BYTES + self.size * dtype.itemsize)
+            f.seek(0)
+            f.write(_npy_header(dtype, self.size))
+
+    def _column(self, name, array):
+        state = self.files.get(name)
+        if state is None:
+            dtype = _string_dtype(array.dtype.itemsize // 4) if array.dtype.kind == "U" else array.dtype
+            f = open(os.path.join(self.filename, name + ".npy"), "w+b")
+            f.write(_npy_header(dtype, 0))
+            state = self.files[name] = (f, dtype)
+        elif array.dtype.kind == "U" and array.dtype.itemsize > state[1].itemsize:
+            state = self._widen(name, _string_dtype(array.dtype.itemsize // 4))
+        return state
+
+    def _widen(self, name, dtype, block=1 << 20):
+        f, old_dtype = self.files[name]
+        f.close()
+        path = os.path.join(self.filename, name + ".npy")
+        old = np.load(path, mmap_mode="r") if self.size else np.empty(0, old_dtype)
+        with open(path + ".tmp", "wb") as out:
+            out.write(_npy_header(dtype, self.size))
+            for start in range(0, self.size, block):
+                out.write(old[start:start + block].astype(dtype).tobytes())
+        del old
+        os.replace(path + ".tmp", path)
+        self.files[name] = (open(path, "r+b"), dtype)
+        return self.files[name]
+
+    def write_chunk(self, rows):
+        if not rows:
+            return
+        size = self.size + len(rows)
+        for name, array in _chunk_arrays(rows).items():
+            f, dtype = self._column(name, array)
+            f.seek(0, os.SEEK_END)
+            f.write(array.astype(dtype, copy=False).tobytes())
+            f.seek(0)
+            f.write(_npy_header(dtype, size))
+        self.size = size
+        self.rows_written += len(rows)
+
+    def close(self):
+        for f, _ in self.files.values():
+            f.close()
+
+
+def resolve_format(fmt):
+    """
+    Parquet / Arrow fall back to npy columns when pyarrow is not installed.
+    """
+    if fmt in ("parquet", "arrow") and pa is None:
+        print(f"[INFO] pyarrow not installed, writing npy columns instead of {fmt}")
+        return "npy"
+    return fmt
+
+
+def enriched_filename(base="data/enriched_sales_data.txt", fmt="text"):
+    # Same path with the extension matching the output format
+    return os.path.splitext(base)[0] + FORMAT_EXTENSIONS[fmt]
+
+
+def get_writer(filename, fmt="text", append=False):
+    if fmt == "text":
+        return TextWriter(filename, append=append)
+    if fmt in ("parquet", "arrow"):
+        return ArrowWriter(filename, fmt)
+    if fmt == "npy":
+        return NpyWriter(filename, append=append)
+    raise ValueError(f"Unknown enriched data format: {fmt}")
+
+
+def write_enriched(rows, filename, fmt="text", append=False, chunk_size=50000):
+    """
+    Streams rows (any iterable) through the chosen writer in chunks.
+    Returns: number of rows written
+    """
+    with get_writer(filename, fmt, append) as writer:
+        chunk = []
+        for tx in rows:
+            chunk.append(tx)
+            if len(chunk) >= chunk_size:
+                writer.write_chunk(chunk)
+                chunk = []
+        if chunk:
+            writer.write_chunk(chunk)
+    return writer.rows_written
+
+
+# ====================================
+# Enriched Data Reader
+# ====================================
+def _detect_format(filename):
+    if os.path.isdir(filename):
+        return "npy"
+    if filename.endswith(".npz"):
+        return "npz"  # archives from older runs
+    for fmt, ext in FORMAT_EXTENSIONS.items():
+        if filename.endswith(ext):
+            return fmt
+    return "text"
+
+
+def _finish_row(tx):
+    tx["Amount"] = tx["Quantity"] * tx["UnitPrice"]
+    return tx
+
+
+def _read_text(filename):
+    def none_or(value, convert=str):
+        return None if value in ("None", "") else convert(value)
+
+    rows = []
+    with open(filename, "r", encoding="utf-8") as f:
+        header = f.readline().rstrip("\n").split("|")
+        for line in f:
+            values = dict(zip(header, line.rstrip("\n").split("|")))
+            if len(values) != len(ENRICHED_FIELDS):
+                continue
+            rows.append(_finish_row({
+                "TransactionID": values["TransactionID"],
+                "Date": values["Date"],
+                "ProductID": values["ProductID"],
+                "ProductName": values["ProductName"],
+                "Quantity": int(values["Quantity"]),
+                "UnitPrice": float(values["UnitPrice"]),
+                "CustomerID": values["CustomerID"],
+                "Region": values["Region"],
+                "API_Category": none_or(values["API_Category"]),
+                "API_Brand": none_or(values["API_Brand"]),
+                "API_Rating": none_or(values["API_Rating"], float),
+                "API_Match": values["API_Match"] == "True"
+            }))
+    return rows
+
+
+def _read_arrow(filename, fmt):
+    if pa is None:
+        raise ImportError("pyarrow is required to read Parquet / Arrow files")
+    if fmt == "parquet":
+        table = pq.read_table(filename)
+    else:
+        with pa.memory_map(filename) as source:
+            table = pa_ipc.open_file(source).read_all()
+
+    rows = []
+    for tx in table.to_pylist():
+        rating = tx["API_Rating"]
+        tx["API_Rating"] = None if rating is None or rating != rating else rating
+        rows.append(_finish_row({field: tx[field] for field in ENRICHED_FIELDS}))
+    return rows
+
+
+def load_enriched_columns(dirname):
+    """
+    Memory-maps every column of an npy enriched data directory.
+    Returns: {column: read-only array}; values are paged in on use.
+    """
+    return {
+        name[:-4]: np.load(os.path.join(dirname, name), mmap_mode="r")
+        for name in sorted(os.listdir(dirname)) if name.endswith(".npy")
+    }
+
+
+def _rows_from_columns(data):
+    if any(name not in data for name in NPY_COLUMNS):
+        return []
+    columns = {field: data[field].tolist() for field in STRING_FIELDS}
+    for field in NULLABLE_STRING_FIELDS:
+        values, nulls = data[field].tolist(), data[field + "__null"].tolist()
+        columns[field] = [None if null else v for v, null in zip(values, nulls)]
+    columns["Quantity"] = data["Quantity"].tolist()
+    columns["UnitPrice"] = data["UnitPrice"].tolist()
+    columns["API_Rating"] = [None if r != r else r for r in data["API_Rating"].tolist()]
+    columns["API_Match"] = data["API_Match"].tolist()
+
+    # Columns left uneven by an interrupted write are cut to the shortest
+    count = min(len(values) for values in columns.values())
+    return [
+        _finish_row({field: columns[field][i] for field in ENRICHED_FIELDS})
+        for i in range(count)
+    ]
+
+
+def _read_npz(filename):
+    with np.load(filename) as data:
+        return _rows_from_columns(data)
+
+
+def read_enriched_data(filename, fmt=None):
+    """
+    Loads a previously saved enriched data file (any supported format)
+    back into the enriched transaction dict format, so a later run can
+    skip parsing and API enrichment.
+    """
+    fmt = fmt or _detect_format(filename)
+    if fmt == "text":
+        return _read_text(filename)
+    if fmt in ("parquet", "arrow"):
+        return _read_arrow(filename, fmt)
+    if fmt == "npy":
+        return _rows_from_columns(load_enriched_columns(filename))
+    if fmt == "npz":
+        return _read_npz(filename)
+    raise ValueError(f"Unknown enriched data format: {fmt}")
@@ -1,129 +1,832 @@
+import codecs
+import copy
+import glob
+import gzip
+import mmap
+import os
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from utils.data_processor import SalesAggregates
+from utils.dates import date_ordinal
+from utils.records import Transaction, new_symbol_tables
+
+try:
+    import zstandard
+except ImportError:  # optional: .zst input needs zstandard
+    zstandard = None
+
+
 # =========================
-# TASK 1.1 — FILE HANDLER
+# MEMORY-MAPPED INPUT
 # =========================
-def read_sales_data(filename):
-    encodings = ["utf-8", "latin-1", "cp1252"]
-    raw_lines = []
+ENCODING_SAMPLE_BYTES = 1 << 16
+MAX_DECODED = 1 << 18  # distinct raw values remembered per column
 
-    for enc in encodings:
+
+def detect_encoding(data, sample_size=ENCODING_SAMPLE_BYTES):
+    """
+    Picks the encoding of a sales file from samples of its start, middle
+    and end (raw bytes or an mmap). Strict decoding is tried in order:
+
+    - 'utf-8-sig' / 'utf-8': every sample is valid UTF-8 (plain ASCII included)
+    - 'cp1252':              Windows exports (€, smart quotes, ...)
+    - 'latin-1':             decodes any byte, so it always succeeds last
+    """
+    if data[:3] == codecs.BOM_UTF8:
+        return "utf-8-sig"
+
+    size = len(data)
+    samples = []
+    for offset in sorted({0, max(size // 2 - sample_size // 2, 0), max(size - sample_size, 0)}):
+        sample = data[offset:offset + sample_size]
+        if offset:
+            # Start on a line boundary so no multi-byte character is cut in half
+            sample = sample[sample.find(b"\n") + 1:]
+        samples.append(sample)
+
+    for encoding in ("utf-8", "cp1252"):
         try:
-            with open(filename, "r", encoding=enc, errors="replace") as f:
-                lines = f.read().splitlines()
-            break
-        except FileNotFoundError:
-            print(f"❌ File not found: {filename}")
-            return []
-        except Exception:
+            for sample in samples:
+                # final=False: a character cut off at the sample's end is not an error
+                codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
             continue
-    else:
-        print("❌ Failed to decode file.")
-        return []
+        return encoding
+    return "latin-1"
+
+
+class _Decoded(dict):
+    # raw bytes -> decoded (and interned) value; each distinct value of a
+    # column is decoded once, later rows are a single dict lookup
+    def __init__(self, encoding, table, convert=None):
+        super().__init__()
+        self.encoding = encoding
+        self.table = table
+        self.convert = convert
+
+    def __missing__(self, raw):
+        value = raw.decode(self.encoding, errors="replace")
+        if self.convert is not None:
+            value = self.convert(value)  # ValueError propagates, nothing cached
+        value = self.table.intern(value)
+        if len(self) < MAX_DECODED:
+            self[raw] = value
+        return value
+
+
+def _parse_price(text):
+    return float(text.replace(",", ""))
+
+
+def _strip_commas(text):
+    return text.replace(",", "")
+
+
+class SalesFile:
+    """
+    Read-only memory map of a pipe-delimited sales file.
+
+    Lines are found with mmap.find and sliced one at a time, so the file
+    is never read into one big string or list of lines; only the fields a
+    Transaction needs are decoded, and repeated values (dates, products,
+    customers, regions, prices) are decoded once per file rather than once
+    per row. Works for any ASCII-compatible encoding (see detect_encoding).
+
+    Usage:
+        with SalesFile("data/sales_data.txt") as sales:
+            rows = list(sales.iter_transactions())
+    """
+
+    def __init__(self, filename, encoding=None):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            # mmap cannot map an empty file
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.encoding = encoding or detect_encoding(self.data)
+        self.has_header = True
+
+    @classmethod
+    def from_bytes(cls, data, encoding=None, has_header=True):
+        """
+        Wraps bytes already in memory (e.g. a chunk appended to a followed
+        file). has_header=False for chunks that do not start the file.
+        """
+        sales = cls.__new__(cls)
+        sales.filename = None
+        sales.data = data
+        sales.size = len(data)
+        sales.encoding = encoding or detect_encoding(data)
+        sales.has_header = has_header
+        return sales
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_lines(self, start=0, end=None):
+        """
+        Yields stripped, non-empty lines in [start, end) as bytes. start
+        must be a line boundary; only the range starting at byte 0 can
+        contain the header row, which is skipped (unless has_header is off).
+        """
+        data = self.data
+        end = self.size if end is None else min(end, self.size)
+        pos = start
+        header_checked = start > 0 or not self.has_header
+        while pos < end:
+            newline = data.find(b"\n", pos, end)
+            if newline < 0:
+                newline = end
+            line = data[pos:newline].strip()
+            pos = newline + 1
+            if not line:
+                continue
+            if not header_checked:
+                header_checked = True
+                if b"TransactionID" in line:
+                    continue
+            yield line
+
+    def iter_transactions(self, start=0, end=None, stats=None, symbols=None):
+        """
+        Same records as iter_parse_transactions over the decoded lines,
+        straight from the raw bytes. Pass a stats dict to get the number
+        of raw data lines in stats['lines'], and intern tables from
+        new_symbol_tables() to share values with other calls (default:
+        fresh tables for this call).
+        """
+        encoding = self.encoding
+        symbols = symbols or new_symbol_tables()
+        dates = _Decoded(encoding, symbols["Date"])
+        product_ids = _Decoded(encoding, symbols["ProductID"])
+        product_names = _Decoded(encoding, symbols["ProductName"], _strip_commas)
+        prices = _Decoded(encoding, symbols["UnitPrice"], _parse_price)
+        customer_ids = _Decoded(encoding, symbols["CustomerID"])
+        regions = _Decoded(encoding, symbols["Region"])
+
+        lines = 0
+        try:
+            for line in self.iter_lines(start, end):
+                lines += 1
+                parts = line.split(b"|")
+                if len(parts) != 8:
+                    continue
+
+                tid, date, pid, pname, qty, price, cid, region = parts
+                try:
+                    # int() parses ASCII digits straight from bytes
+                    qty = int(qty.replace(b",", b""))
+                    price = prices[price]
+                except ValueError:
+                    continue
+
+                yield Transaction(
+                    tid.decode(encoding, errors="replace"), dates[date], product_ids[pid],
+                    product_names[pname], qty, price, customer_ids[cid], regions[region]
+                )
+        finally:
+            if stats is not None:
+                stats["lines"] = stats.get("lines", 0) + lines
+
+
+def open_sales_file(filename):
+    """
+    Returns a SalesFile, or None (with a message) if the file does not exist.
+    """
+    try:
+        return SalesFile(filename)
+    except FileNotFoundError:
+        print(f"❌ File not found: {filename}")
+        return None
+
+
+# =========================
+# MULTI-FILE & COMPRESSED INPUT
+# =========================
+STREAM_CHUNK_BYTES = 8 << 20  # decompressed bytes parsed at a time
 
-    lines = [line.strip() for line in lines if line.strip()]
-    if lines and "TransactionID" in lines[0]:
-        lines = lines[1:]
 
-    return lines
+def expand_inputs(inputs):
+    """
+    Resolves an input spec (or a list of them) to a list of files:
+    - a file is kept as is (even if missing, so the caller reports it)
+    - a directory gives every non-hidden file below it, in sorted order
+    - a glob such as 'data/2024-05-*/store_*.txt.gz' gives its sorted
+      matches ('**' recurses)
+    """
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    files = []
+    for spec in inputs:
+        if os.path.isdir(spec):
+            for root, dirs, names in os.walk(spec):
+                dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+                files.extend(os.path.join(root, name) for name in sorted(names) if not name.startswith("."))
+        elif any(c in spec for c in "*?[") and not os.path.exists(spec):
+            matches = sorted(path for path in glob.glob(spec, recursive=True) if os.path.isfile(path))
+            if not matches:
+                print(f"❌ No files match: {spec}")
+            files.extend(matches)
+        else:
+            files.append(spec)
+    return list(dict.fromkeys(files))
+
+
+def detect_compression(filename):
+    """
+    Returns: 'gzip', 'zstd' or None, from the file's magic bytes (not its name).
+    """
+    with open(filename, "rb") as f:
+        magic = f.read(4)
+    if magic[:2] == b"\x1f\x8b":
+        return "gzip"
+    if magic == b"\x28\xb5\x2f\xfd":
+        return "zstd"
+    return None
+
+
+def open_decompressed(filename):
+    """
+    Binary stream of the file's contents, decompressed on the fly for
+    gzip / zstd files (nothing is staged to disk).
+    """
+    compression = detect_compression(filename)
+    if compression == "gzip":
+        return gzip.open(filename, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstandard is required to read .zst files")
+        return zstandard.ZstdDecompressor().stream_reader(open(filename, "rb"), read_across_frames=True)
+    return open(filename, "rb")
+
+
+def iter_stream_chunks(stream, encoding=None, chunk_size=STREAM_CHUNK_BYTES):
+    """
+    Splits a binary stream into newline-aligned SalesFile chunks of about
+    chunk_size bytes, so memory stays bounded however large the
+    decompressed file is. Only the first chunk can hold the header row.
+    """
+    pending = b""
+    first = True
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+        data = pending + block
+        cut = data.rfind(b"\n") + 1
+        pending = data[cut:]
+        if cut:
+            encoding = encoding or detect_encoding(data[:cut])
+            yield SalesFile.from_bytes(data[:cut], encoding, has_header=first)
+            first = False
+    if pending:
+        yield SalesFile.from_bytes(pending, encoding, has_header=first)
+
+
+def iter_file_chunks(filename, encoding=None):
+    """
+    Yields SalesFile views covering one file: its whole memory map for a
+    plain file, decompressed chunks for a gzip / zstd one.
+    """
+    try:
+        compression = detect_compression(filename)
+    except FileNotFoundError:
+        print(f"❌ File not found: {filename}")
+        return
+
+    if compression is None:
+        with SalesFile(filename, encoding) as sales:
+            yield sales
+        return
+    with open_decompressed(filename) as stream:
+        yield from iter_stream_chunks(stream, encoding)
+
+
+# =========================
+# TASK 1.1 — FILE HANDLER
+# =========================
+def iter_sales_lines(filename, encoding=None):
+    """
+    Streams stripped, non-empty data lines from the sales file one at a time.
+    The header row (if present) is skipped. Memory use does not depend on file size.
+    The encoding is detected from the file unless given.
+
+    filename may also be a directory or glob (see expand_inputs), read file
+    by file, and gzip / zstd files are decompressed as they are read.
+    """
+    for path in expand_inputs(filename):
+        for chunk in iter_file_chunks(path, encoding):
+            for line in chunk.iter_lines():
+                yield line.decode(chunk.encoding, errors="replace")
+
+
+def read_sales_data(filename):
+    """
+    Returns all data lines as a list (thin wrapper over iter_sales_lines).
+    """
+    return list(iter_sales_lines(filename))
+
+
+def iter_sales_transactions(filename, stats=None):
+    """
+    Lazily reads and parses the sales file in one pass over the memory
+    map (see SalesFile); equivalent to
+    iter_parse_transactions(iter_sales_lines(filename)), including for
+    directories, globs and compressed files.
+    """
+    for path in expand_inputs(filename):
+        for chunk in iter_file_chunks(path):
+            yield from chunk.iter_transactions(stats=stats)
 
 
 # =========================
 # TASK 1.2 — PARSE CLEAN
 # =========================
-def parse_transactions(raw_lines):
-    transactions = []
+def _parse_line(line, symbols):
+    parts = line.split("|")
+    if len(parts) != 8:
+        return None
 
-    for line in raw_lines:
-        parts = line.split("|")
-        if len(parts) != 8:
-            continue
+    tid, date, pid, pname, qty, price, cid, region = parts
 
-        tid, date, pid, pname, qty, price, cid, region = parts
+    pname = pname.replace(",", "")
+    qty = qty.replace(",", "")
+    price = price.replace(",", "")
 
-        pname = pname.replace(",", "")
-        qty = qty.replace(",", "")
-        price = price.replace(",", "")
+    try:
+        qty = int(qty)
+        price = float(price)
+    except ValueError:
+        return None
 
-        try:
-            qty = int(qty)
-            price = float(price)
-        except ValueError:
-            continue
+    return Transaction.interned(symbols, tid, date, pid, pname, qty, price, cid, region)
 
-        record = {
-            "TransactionID": tid,
-            "Date": date,
-            "ProductID": pid,
-            "ProductName": pname,
-            "Quantity": qty,
-            "UnitPrice": price,
-            "CustomerID": cid,
-            "Region": region
-        }
 
-        transactions.append(record)
+def iter_parse_transactions(raw_lines, symbols=None):
+    """
+    Lazily parses raw lines into Transaction records (interned categoricals,
+    Amount precomputed), skipping malformed lines. Values are interned in
+    `symbols` (see new_symbol_tables), fresh for each call by default.
+    """
+    symbols = symbols or new_symbol_tables()
+    for line in raw_lines:
+        record = _parse_line(line, symbols)
+        if record is not None:
+            yield record
 
-    return transactions
+
+def parse_transactions(raw_lines):
+    return list(iter_parse_transactions(raw_lines))
 
 
 # =========================
 # TASK 1.3 — VALIDATION + FILTER
 # =========================
-def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
-    valid = []
-    invalid_count = 0
+def new_validation_summary():
+    return {
+        "total_input": 0,
+        "invalid": 0,
+        "invalid_date": 0,
+        "filtered_by_region": 0,
+        "filtered_by_amount": 0,
+        "final_count": 0
+    }
+
 
+def _is_valid(tx):
+    if tx["Quantity"] <= 0 or tx["UnitPrice"] <= 0:
+        return False
+    if not tx["TransactionID"].startswith("T"):
+        return False
+    if not tx["ProductID"].startswith("P"):
+        return False
+    if not tx["CustomerID"].startswith("C"):
+        return False
+    return True
+
+
+def iter_valid_transactions(transactions, summary):
+    """
+    Lazily yields valid transactions (with Amount set), counting
+    total_input and invalid rows into `summary` as it goes. Rows with an
+    impossible or non-ISO date are invalid and also counted in invalid_date.
+    """
     for tx in transactions:
-        tx["Amount"] = tx["Quantity"] * tx["UnitPrice"]
+        summary["total_input"] += 1
+        if "Amount" not in tx:  # Transaction records already carry it
+            tx["Amount"] = tx["Quantity"] * tx["UnitPrice"]
 
-        if tx["Quantity"] <= 0 or tx["UnitPrice"] <= 0:
-            invalid_count += 1
+        if not _is_valid(tx):
+            summary["invalid"] += 1
+            continue
+        if date_ordinal(tx["Date"]) is None:
+            summary["invalid"] += 1
+            summary["invalid_date"] += 1
             continue
-        if not tx["TransactionID"].startswith("T"):
-            invalid_count += 1
+
+        yield tx
+
+
+def iter_filtered_transactions(transactions, summary, region=None, min_amount=None, max_amount=None):
+    """
+    Lazily applies the region / amount filters, counting removed and
+    surviving rows into `summary` exactly like validate_and_filter.
+    """
+    for tx in transactions:
+        if region and tx["Region"] != region:
+            summary["filtered_by_region"] += 1
             continue
-        if not tx["ProductID"].startswith("P"):
-            invalid_count += 1
+        if min_amount is not None and tx["Amount"] < min_amount:
+            summary["filtered_by_amount"] += 1
             continue
-        if not tx["CustomerID"].startswith("C"):
-            invalid_count += 1
+        if max_amount is not None and tx["Amount"] > max_amount:
+            summary["filtered_by_amount"] += 1
             continue
 
-        valid.append(tx)
+        summary["final_count"] += 1
+        yield tx
 
-    summary = {
-        "total_input": len(transactions),
-        "invalid": invalid_count,
-        "filtered_by_region": 0,
-        "filtered_by_amount": 0,
-        "final_count": 0
-    }
+
+def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
+    summary = new_validation_summary()
+
+    valid = list(iter_valid_transactions(transactions, summary))
+    invalid_count = summary["invalid"]
 
     regions = sorted(set(tx["Region"] for tx in valid))
     amounts = [tx["Amount"] for tx in valid]
     print(f"Available Regions: {regions}")
     print(f"Amount Range: min={min(amounts):.2f}, max={max(amounts):.2f}")
 
-    filtered = valid
+    filtered = list(iter_filtered_transactions(valid, summary, region, min_amount, max_amount))
 
     if region:
-        before = len(filtered)
-        filtered = [tx for tx in filtered if tx["Region"] == region]
-        summary["filtered_by_region"] = before - len(filtered)
-        print(f"After region filter ({region}): {len(filtered)} records")
+        print(f"After region filter ({region}): {len(filtered) + summary['filtered_by_amount']} records")
 
-    if min_amount is not None:
-        before = len(filtered)
-        filtered = [tx for tx in filtered if tx["Amount"] >= min_amount]
-        summary["filtered_by_amount"] += before - len(filtered)
+    return filtered, invalid_count, summary
 
-    if max_amount is not None:
-        before = len(filtered)
-        filtered = [tx for tx in filtered if tx["Amount"] <= max_amount]
-        summary["filtered_by_amount"] += before - len(filtered)
 
-    summary["final_count"] = len(filtered)
+# =========================
+# FILTER INDEX
+# =========================
+class FilterIndex:
+    """
+    Reusable index over validated transactions for region / amount slices.
 
-    return filtered, invalid_count, summary
+    Built once in O(n log n); afterwards the available regions and the
+    amount range are O(1) attributes, and query() finds the rows of any
+    region + [min, max] slice with two bisects on an amount-sorted
+    permutation (O(log n + k), plus k log k to return rows in file order).
+
+    extended() indexes appended rows without re-sorting the old ones: each
+    key keeps a few amount-sorted runs (at most ~log2 n, merged like a
+    binary counter), so appending k rows costs about O(k log n).
+    """
+
+    def __init__(self, transactions):
+        self.rows = transactions
+        self.size = len(transactions)
+
+        region_rows = {}
+        for i, tx in enumerate(transactions):
+            region_rows.setdefault(tx["Region"], []).append(i)
+        self.region_counts = {region: len(ids) for region, ids in region_rows.items()}
+
+        # key (None = all regions) -> runs of (sorted amounts, row ids in that order)
+        self._runs = {None: [self._sort_by_amount(range(self.size))]}
+        for region, ids in region_rows.items():
+            self._runs[region] = [self._sort_by_amount(ids)]
+
+        amounts = self._runs[None][0][0]
+        self.regions = sorted(region_rows)
+        self.min_amount = amounts[0] if amounts else None
+        self.max_amount = amounts[-1] if amounts else None
+
+    def _sort_by_amount(self, ids):
+        order = sorted(ids, key=lambda i: self.rows[i]["Amount"])
+        return [self.rows[i]["Amount"] for i in order], order
+
+    def _add_run(self, runs, run):
+        runs = runs + [run]
+        while len(runs) > 1 and len(runs[-2][1]) <= 2 * len(runs[-1][1]):
+            # Both halves are sorted, so timsort merges them in linear time
+            last = runs.pop()
+            runs[-1] = self._sort_by_amount(runs[-1][1] + last[1])
+        return runs
+
+    def extended(self, new_rows):
+        """
+        Returns a new index over rows + new_rows and appends new_rows to
+        the (shared) row list. This index is left untouched and stays valid:
+        it only ever reads its first `size` rows.
+        """
+        if self.size != len(self.rows):
+            raise ValueError("Only the newest index over a row list can be extended")
+
+        index = copy.copy(self)
+        start = self.size
+        self.rows.extend(new_rows)
+        index.size = len(self.rows)
+        index._runs = dict(self._runs)
+        index.region_counts = dict(self.region_counts)
+
+        region_rows = {}
+        for i in range(start, index.size):
+            region_rows.setdefault(self.rows[i]["Region"], []).append(i)
+
+        for key, ids in [(None, range(start, index.size))] + list(region_rows.items()):
+            if ids:
+                index._runs[key] = self._add_run(self._runs.get(key, []), self._sort_by_amount(ids))
+        for region, ids in region_rows.items():
+            index.region_counts[region] = index.region_counts.get(region, 0) + len(ids)
+
+        index.regions = sorted(index.region_counts)
+        amounts = [run[0] for run in index._runs.get(None, []) if run[0]]
+        index.min_amount = min(run[0] for run in amounts) if amounts else None
+        index.max_amount = max(run[-1] for run in amounts) if amounts else None
+        return index
+
+    def query_ids(self, region=None, min_amount=None, max_amount=None):
+        """
+        Row ids (ascending) matching the slice.
+        """
+        ids = []
+        for amounts, order in self._runs.get(region or None, ()):
+            lo = bisect_left(amounts, min_amount) if min_amount is not None else 0
+            hi = bisect_right(amounts, max_amount) if max_amount is not None else len(amounts)
+            ids.extend(order[lo:hi])
+        ids.sort()
+        return ids
+
+    def query(self, region=None, min_amount=None, max_amount=None, summary=None):
+        """
+        Same rows, order and summary counts as validate_and_filter's filters.
+        """
+        ids = self.query_ids(region, min_amount, max_amount)
+
+        if summary is not None:
+            in_region = self.region_counts.get(region, 0) if region else self.size
+            summary["filtered_by_region"] += self.size - in_region
+            summary["filtered_by_amount"] += in_region - len(ids)
+            summary["final_count"] += len(ids)
+
+        return [self.rows[i] for i in ids]
+
+
+def build_filter_index(transactions):
+    return FilterIndex(transactions)
+
+
+# =========================
+# STREAMING MODE
+# =========================
+def iter_chunks(iterable, chunk_size):
+    """
+    Groups any iterable into lists of at most chunk_size items.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_transactions(filename, chunk_size=50000, region=None, min_amount=None,
+                        max_amount=None, summary=None):
+    """
+    Reads, parses, validates and filters the sales file lazily and yields
+    the surviving transactions in lists of at most chunk_size rows.
+
+    Pass a summary dict (see new_validation_summary) to collect the same
+    counts validate_and_filter returns. Peak memory is bounded by chunk_size.
+    """
+    if summary is None:
+        summary = new_validation_summary()
+
+    parsed = iter_sales_transactions(filename)
+    valid = iter_valid_transactions(parsed, summary)
+    filtered = iter_filtered_transactions(valid, summary, region, min_amount, max_amount)
+
+    yield from iter_chunks(filtered, chunk_size)
+
+
+def aggregate_sales_file(filename, chunk_size=50000, region=None, min_amount=None, max_amount=None,
+                         aggregate_options=None):
+    """
+    Streams the sales file straight into a SalesAggregates object without
+    ever holding the full transaction list. aggregate_options are passed to
+    SalesAggregates (e.g. {'heavy_hitter_error': 0.001}).
+
+    Returns: (aggregates, summary)
+    """
+    summary = new_validation_summary()
+    aggregates = SalesAggregates(**(aggregate_options or {}))
+
+    for chunk in stream_transactions(filename, chunk_size, region, min_amount, max_amount, summary):
+        aggregates.update(chunk)
+
+    return aggregates, summary
+
+
+# =========================
+# PARALLEL INGEST (BYTE RANGES)
+# =========================
+def split_byte_ranges(filename, parts):
+    """
+    Splits the file into at most `parts` (start, end) byte ranges whose
+    boundaries fall right after a newline, so no line is cut in two.
+    """
+    size = os.path.getsize(filename)
+    parts = max(1, min(parts, size or 1))
+
+    boundaries = [0]
+    with open(filename, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts - 1, 0))
+            f.readline()
+            pos = min(f.tell(), size)
+            if pos > boundaries[-1]:
+                boundaries.append(pos)
+    if boundaries[-1] != size:
+        boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def ingest_byte_range(filename, start, end, region=None, min_amount=None, max_amount=None,
+                      keep_rows=False, aggregate_options=None, symbols=None):
+    """
+    Parses, validates, filters and pre-aggregates the lines in [start, end).
+    start must be a line boundary. Used by the parallel workers and by
+    incremental runs that only read the newly appended bytes.
+    `symbols`: intern tables to share with earlier ranges (e.g. kept rows).
+
+    Returns: (rows or None, aggregates, summary)
+    """
+    with SalesFile(filename) as sales:
+        return _ingest(sales.iter_transactions(start, end, symbols=symbols), region, min_amount, max_amount,
+                       keep_rows, aggregate_options)
+
+
+def _ingest(parsed, region, min_amount, max_amount, keep_rows, aggregate_options):
+    summary = new_validation_summary()
+    aggregates = SalesAggregates(**(aggregate_options or {}))
+    rows = [] if keep_rows else None
+
+    valid = iter_valid_transactions(parsed, summary)
+    filtered = iter_filtered_transactions(valid, summary, region, min_amount, max_amount)
+    for tx in filtered:
+        aggregates.add(tx)
+        if keep_rows:
+            rows.append(tx)
+
+    return rows, aggregates, summary
+
+
+def parallel_ingest(filename, workers=None, region=None, min_amount=None, max_amount=None,
+                    keep_rows=False, aggregate_options=None):
+    """
+    Parses one large sales file with a pool of worker processes, each
+    handling a newline-aligned byte range, and merges the partial results
+    in file order.
+
+    Returns: (rows or None, aggregates, summary) — aggregates and summary
+    match aggregate_sales_file / validate_and_filter on the same input.
+    """
+    workers = workers or os.cpu_count() or 1
+    if not os.path.exists(filename):
+        print(f"❌ File not found: {filename}")
+        return ([] if keep_rows else None), SalesAggregates(**(aggregate_options or {})), new_validation_summary()
+
+    ranges = split_byte_ranges(filename, workers)
+    args = [
+        (filename, start, end, region, min_amount, max_amount, keep_rows, aggregate_options)
+        for start, end in ranges
+    ]
+
+    if len(ranges) == 1:
+        partials = [ingest_byte_range(*args[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            partials = list(pool.map(ingest_byte_range, *zip(*args)))
+
+    rows = [] if keep_rows else None
+    aggregates = SalesAggregates(**(aggregate_options or {}))
+    summary = new_validation_summary()
+    for part_rows, part_agg, part_summary in partials:
+        if keep_rows:
+            rows.extend(part_rows)
+        aggregates.merge(part_agg)
+        for key in summary:
+            summary[key] += part_summary[key]
+
+    return rows, aggregates, summary
+
+
+def ingest_file(filename, start=0, end=None, region=None, min_amount=None, max_amount=None,
+                keep_rows=False, aggregate_options=None):
+    """
+    ingest_byte_range for any input file: the whole file (the default
+    start / end) may be gzip / zstd compressed; a byte range must come from
+    a plain file.
+
+    Returns: (rows or None, aggregates, summary)
+    """
+    if start or end is not None:
+        return ingest_byte_range(filename, start, end, region, min_amount, max_amount,
+                                 keep_rows, aggregate_options)
+    parsed = (tx for chunk in iter_file_chunks(filename) for tx in chunk.iter_transactions())
+    return _ingest(parsed, region, min_amount, max_amount, keep_rows, aggregate_options)
+
+
+def ingest_files(inputs, workers=None, region=None, min_amount=None, max_amount=None,
+                 keep_rows=False, aggregate_options=None):
+    """
+    Ingests every file an input spec resolves to (see expand_inputs) with
+    a pool of worker processes: one task per file, compressed files
+    decompressed as a stream inside the worker, and plain files also split
+    into byte ranges when there are fewer files than workers. Partial
+    results are merged in file order.
+
+    Returns: (rows or None, aggregates, summary) — summary holds the
+    validate_and_filter totals plus summary['files']: {filename: the same
+    counts for that file alone}.
+    """
+    workers = workers or os.cpu_count() or 1
+    files = []
+    for filename in expand_inputs(inputs):
+        if os.path.isfile(filename):
+            files.append(filename)
+        else:
+            print(f"❌ File not found: {filename}")
+
+    parts = max(1, workers // len(files)) if files else 1
+    tasks = []
+    for filename in files:
+        ranges = split_byte_ranges(filename, parts) if parts > 1 and detect_compression(filename) is None else []
+        if len(ranges) > 1:
+            tasks.extend((filename, start, end) for start, end in ranges)
+        else:
+            tasks.append((filename, 0, None))
+
+    args = [task + (region, min_amount, max_amount, keep_rows, aggregate_options) for task in tasks]
+    if workers == 1 or len(tasks) <= 1:
+        partials = [ingest_file(*task_args) for task_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            partials = list(pool.map(ingest_file, *zip(*args)))
+
+    rows = [] if keep_rows else None
+    aggregates = SalesAggregates(**(aggregate_options or {}))
+    summary = new_validation_summary()
+    per_file = {filename: new_validation_summary() for filename in files}
+    for (filename, _, _), (part_rows, part_agg, part_summary) in zip(tasks, partials):
+        if keep_rows:
+            rows.extend(part_rows)
+        aggregates.merge(part_agg)
+        for key in summary:
+            summary[key] += part_summary[key]
+            per_file[filename][key] += part_summary[key]
+
+    summary["files"] = per_file
+    return rows, aggregates, summary
+
+
+def count_filtered_by_file(files, index, region=None, min_amount=None, max_amount=None):
+    """
+    Per-file filtered_by_region / filtered_by_amount / final_count for a
+    FilterIndex.query slice, written into `files` (summary['files'] from an
+    unfiltered ingest_files, whose rows the index was built over). Each
+    file's rows are a contiguous run of row ids, so the counts are bisects
+    on the matching ids.
+    """
+    in_region = index.query_ids(region) if region else None
+    matched = index.query_ids(region, min_amount, max_amount)
+
+    start = 0
+    for part in files.values():
+        end = start + part["total_input"] - part["invalid"]
+        if in_region is None:
+            kept_region = end - start
+        else:
+            kept_region = bisect_left(in_region, end) - bisect_left(in_region, start)
+        kept = bisect_left(matched, end) - bisect_left(matched, start)
+
+        part["filtered_by_region"] = end - start - kept_region
+        part["filtered_by_amount"] = kept_region - kept
+        part["final_count"] = kept
+        start = end
 
 
 # =========================
@@ -0,0 +1,235 @@
+# utils/follow.py
+
+import json
+import os
+import time
+
+from filehandler import (
+    SalesFile,
+    detect_encoding,
+    iter_filtered_transactions,
+    iter_valid_transactions,
+    new_validation_summary
+)
+from utils.data_processor import SalesAggregates, region_wise_sales
+from utils.report_generator import generate_sales_report
+
+
+READ_CHUNK_BYTES = 8 << 20  # bounds memory while catching up on a big file
+HEAD_BYTES = 256            # compared on every growth to spot an in-place rewrite
+
+
+# ====================================
+# Tail / Follow Mode
+# ====================================
+class SalesFollower:
+    """
+    Follows a growing sales file like `tail -F`: each poll() reads only
+    the bytes appended since the previous one and folds the new rows into
+    running aggregates (SalesAggregates.add is O(1) per row).
+
+    - A trailing line without a newline is held back until it is complete.
+    - Rotation (the path now points to a new file): the rest of the old
+      file is drained from the still-open handle, then the new file is
+      read from the start.
+    - Truncation or an in-place rewrite (size shrinks / first bytes change):
+      reading restarts at byte 0 of the file.
+    Totals carry on across rotation / truncation, as the file is one stream
+    of sales; reset_on_rotate=True starts them over instead.
+    """
+
+    def __init__(self, filename, region=None, min_amount=None, max_amount=None,
+                 aggregate_options=None, reset_on_rotate=False):
+        self.filename = filename
+        self.filters = (region, min_amount, max_amount)
+        self.aggregate_options = aggregate_options or {}
+        self.reset_on_rotate = reset_on_rotate
+
+        self.aggregates = SalesAggregates(**self.aggregate_options)
+        self.summary = new_validation_summary()
+        self.rotations = 0
+
+        self._file = None
+        self._identity = None
+        self._offset = 0     # bytes read from the current file
+        self._pending = b""  # incomplete last line
+        self._head = b""
+        self._encoding = None
+
+    # ---- file tracking ----
+    def _open(self):
+        try:
+            f = open(self.filename, "rb")
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(f.fileno())
+        self._file = f
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._offset = 0
+        self._pending = b""
+        self._head = b""
+        return True
+
+    def _restart(self):
+        self.rotations += 1
+        if self.reset_on_rotate:
+            self.aggregates = SalesAggregates(**self.aggregate_options)
+            self.summary = new_validation_summary()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def poll(self):
+        """
+        Reads whatever was appended since the last call.
+        Returns: number of new rows that passed validation and filters.
+        """
+        if self._file is None and not self._open():
+            return 0
+
+        added = 0
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            stat = None  # mid-rotation: keep draining the old handle
+
+        if stat is not None and (stat.st_dev, stat.st_ino) != self._identity:
+            added += self._read_available(final=True)
+            self.close()
+            self._open()
+            self._restart()
+        elif stat is not None and (stat.st_size < self._offset or self._rewritten()):
+            self._file.seek(0)
+            self._offset = 0
+            self._pending = b""
+            self._head = b""
+            self._restart()
+
+        if self._file is not None:
+            added += self._read_available()
+        return added
+
+    def _rewritten(self):
+        if not self._head:
+            return False
+        self._file.seek(0)
+        head = self._file.read(len(self._head))
+        self._file.seek(self._offset)
+        return head != self._head
+
+    def _read_available(self, final=False):
+        added = 0
+        while True:
+            chunk = self._file.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            if len(self._head) < HEAD_BYTES:
+                self._head = (self._head + chunk)[:HEAD_BYTES]
+            start = self._offset - len(self._pending)
+            self._offset += len(chunk)
+
+            data = self._pending + chunk
+            cut = data.rfind(b"\n") + 1
+            self._pending = data[cut:]
+            added += self._fold(data[:cut], at_start=(start == 0))
+
+        if final and self._pending:
+            # The rotated file gets no more writes: its last line is complete
+            added += self._fold(self._pending, at_start=(self._offset == len(self._pending)))
+            self._pending = b""
+        return added
+
+    def _fold(self, data, at_start):
+        if not data:
+            return 0
+        if self._encoding is None:
+            self._encoding = detect_encoding(data)
+
+        chunk = SalesFile.from_bytes(data, self._encoding, has_header=at_start)
+        valid = iter_valid_transactions(chunk.iter_transactions(), self.summary)
+        added = 0
+        add = self.aggregates.add
+        for tx in iter_filtered_transactions(valid, self.summary, *self.filters):
+            add(tx)
+            added += 1
+        return added
+
+    def snapshot(self):
+        agg = self.aggregates
+        return {
+            "updated_at": time.time(),
+            "file": os.path.abspath(self.filename),
+            "transaction_count": agg.transaction_count,
+            "total_revenue": agg.total_revenue,
+            "regions": region_wise_sales(agg),
+            "summary": dict(self.summary),
+            "rotations": self.rotations,
+        }
+
+
+def write_snapshot(snapshot, filename):
+    # Written then renamed, like the report, so dashboards never read half a file
+    folder = os.path.dirname(filename)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = filename + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(tmp, filename)
+
+
+def follow_sales_file(follower, product_map=None, report_file="output/sales_report.txt",
+                      snapshot_file=None, poll_interval=0.1, debounce=0.2, max_delay=0.75,
+                      stop=None, on_update=None):
+    """
+    Polls the file every poll_interval seconds and regenerates the report
+    (and snapshot) once appends have been quiet for `debounce` seconds —
+    or at the latest `max_delay` seconds after the first unreported row,
+    so a constant trickle of appends still refreshes the numbers.
+
+    stop: optional threading.Event ending the loop; on_update(follower,
+    new_rows, seconds) is called after each regeneration.
+    """
+    dirty_since = None
+    last_change = None
+    pending_rows = 0
+    rotations = follower.rotations
+
+    try:
+        while stop is None or not stop.is_set():
+            added = follower.poll()
+            now = time.monotonic()
+            if added or follower.rotations != rotations:
+                rotations = follower.rotations
+                pending_rows += added
+                last_change = now
+                if dirty_since is None:
+                    dirty_since = now
+
+            if dirty_since is not None and (now - last_change >= debounce or now - dirty_since >= max_delay):
+                start = time.perf_counter()
+                try:
+                    # Empty aggregates (e.g. reset_on_rotate onto a header-only
+                    # file) render as an empty report
+                    generate_sales_report(None, None, output_file=report_file,
+                                          aggregates=follower.aggregates, product_map=product_map)
+                    if snapshot_file:
+                        write_snapshot(follower.snapshot(), snapshot_file)
+                except (OSError, ValueError) as e:
+                    # Keep following: the next change regenerates again
+                    print(f"[ERROR] Could not regenerate the report: {e}")
+                else:
+                    if on_update is not None:
+                        on_update(follower, pending_rows, time.perf_counter() - start)
+                dirty_since = None
+                pending_rows = 0
+                continue  # poll again right away: more rows may have arrived meanwhile
+
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+    finally:
+        follower.close()
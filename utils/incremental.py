@@ -0,0 +1,157 @@
+# utils/incremental.py
+
+import hashlib
+import os
+import pickle
+
+from filehandler import ingest_byte_range, new_validation_summary
+from utils.data_processor import SalesAggregates
+
+
+STATE_VERSION = 4
+FINGERPRINT_BYTES = 64 * 1024
+
+
+# ====================================
+# Incremental (Append-only) Analytics
+# ====================================
+def file_fingerprint(filename, offset):
+    """
+    Content watermark for the first `offset` bytes: hashes of the head of
+    the file and of the bytes just before the offset. If either changes,
+    the file was rewritten or rotated rather than appended to.
+    """
+    with open(filename, "rb") as f:
+        head = f.read(min(offset, FINGERPRINT_BYTES))
+        f.seek(max(offset - FINGERPRINT_BYTES, 0))
+        tail = f.read(offset - f.tell())
+    return hashlib.sha256(head).hexdigest(), hashlib.sha256(tail).hexdigest()
+
+
+def last_line_end(filename, start, size, block=64 * 1024):
+    # Offset just past the last newline in [start, size) — or start if none
+    with open(filename, "rb") as f:
+        pos = size
+        while pos > start:
+            read_from = max(pos - block, start)
+            f.seek(read_from)
+            chunk = f.read(pos - read_from)
+            idx = chunk.rfind(b"\n")
+            if idx != -1:
+                return read_from + idx + 1
+            pos = read_from
+    return start
+
+
+def load_state(state_path):
+    try:
+        with open(state_path, "rb") as f:
+            state = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    if state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(state_path, state):
+    write_state(state_path, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def write_state(state_path, data):
+    # data: a pickled state, e.g. info["pending_state"] from incremental_aggregate
+    folder = os.path.dirname(state_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    # Write then rename so a crash never leaves a half-written state file
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, state_path)
+
+
+def _state_is_usable(state, filename, filters, size):
+    if state is None:
+        return False
+    if state["filename"] != os.path.abspath(filename) or state["filters"] != filters:
+        return False
+    if size < state["offset"]:
+        return False
+    return file_fingerprint(filename, state["offset"]) == state["fingerprint"]
+
+
+def incremental_aggregate(filename, state_path="data/analytics_state.pkl", region=None,
+                          min_amount=None, max_amount=None, rebuild=False, aggregate_options=None,
+                          save=True):
+    """
+    Folds only the bytes appended since the last run into the saved
+    aggregator state, then saves the new state and byte watermark.
+    With save=False the pickled state is returned in info["pending_state"]
+    instead, for the caller to write_state() once new_rows are persisted.
+
+    The state is rebuilt from scratch when `rebuild` is set, when the
+    filters or aggregate_options differ, or when the already-processed part of the file no
+    longer matches its fingerprint (rewrite / rotation / truncation).
+
+    A trailing line without a newline is counted in the returned
+    aggregates/summary but not in the saved state or new_rows, so it is
+    parsed (and persisted) once it has been completed.
+
+    Returns: (aggregates, summary, new_rows, info)
+    - new_rows: validated rows from the newly completed lines (for enrichment)
+    - info: {'resumed': bool, 'start_offset': int, 'end_offset': int}
+    """
+    options = aggregate_options or {}
+    if not os.path.exists(filename):
+        print(f"❌ File not found: {filename}")
+        return SalesAggregates(**options), new_validation_summary(), [], {
+            "resumed": False, "start_offset": 0, "end_offset": 0
+        }
+
+    filters = (region, min_amount, max_amount, tuple(sorted(options.items())))
+    size = os.path.getsize(filename)
+    state = None if rebuild else load_state(state_path)
+
+    if _state_is_usable(state, filename, filters, size):
+        resumed = True
+        aggregates, summary, start = state["aggregates"], state["summary"], state["offset"]
+    else:
+        resumed = False
+        aggregates, summary, start = SalesAggregates(**options), new_validation_summary(), 0
+
+    end = last_line_end(filename, start, size)
+
+    new_rows, part_agg, part_summary = ingest_byte_range(
+        filename, start, end, region, min_amount, max_amount, keep_rows=True,
+        aggregate_options=options
+    )
+    aggregates.merge(part_agg)
+    for key in summary:
+        summary[key] += part_summary[key]
+
+    state = {
+        "version": STATE_VERSION,
+        "filename": os.path.abspath(filename),
+        "filters": filters,
+        "offset": end,
+        "fingerprint": file_fingerprint(filename, end),
+        "aggregates": aggregates,
+        "summary": summary,
+    }
+    info = {"resumed": resumed, "start_offset": start, "end_offset": end}
+    if save:
+        save_state(state_path, state)
+    else:
+        info["pending_state"] = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # Unterminated last line: include it in this run's answer only
+    if end < size:
+        _, tail_agg, tail_summary = ingest_byte_range(
+            filename, end, size, region, min_amount, max_amount, aggregate_options=options
+        )
+        aggregates.merge(tail_agg)
+        for key in summary:
+            summary[key] += tail_summary[key]
+
+    return aggregates, summary, new_rows, info
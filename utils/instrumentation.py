@@ -0,0 +1,255 @@
+# utils/instrumentation.py
+
+import contextlib
+import json
+import os
+import resource
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+
+
+# ====================================
+# Pipeline Stage Instrumentation
+# ====================================
+def peak_rss_bytes():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PipelineMonitor:
+    """
+    Records wall time, CPU time, rows in/out, peak RSS and (optionally)
+    tracemalloc deltas for each pipeline stage, plus free-form extras such
+    as API latency. The run record can be written as JSON and as a
+    Prometheus textfile for the node exporter's textfile collector.
+
+    Usage:
+        monitor.begin("parse_transactions", rows_in=len(raw))
+        ...
+        monitor.end(rows_out=len(parsed))
+    or:
+        with monitor.stage("parse_transactions", rows_in=len(raw)) as st:
+            ...
+            st["rows_out"] = len(parsed)
+
+    Stages that ran concurrently (thread / process pools) are recorded
+    after the fact with add_stage(); their cpu_seconds are the stage's own.
+    """
+
+    def __init__(self, trace_memory=False, pipeline="sales_analytics"):
+        self.pipeline = pipeline
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.started_at = time.time()
+        self._run_start = time.perf_counter()
+        self._run_cpu_start = time.process_time()
+        self._current = None
+        self._lock = threading.Lock()
+        self.status = "running"
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def begin(self, name, rows_in=None):
+        if self._current is not None:
+            self.end()
+
+        record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        record["_wall"] = time.perf_counter()
+        record["_cpu"] = time.process_time()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            record["_mem"] = tracemalloc.get_traced_memory()[0]
+        self._current = record
+        return record
+
+    def end(self, rows_out=None, **extra):
+        record = self._current
+        if record is None:
+            return None
+        self._current = None
+
+        record["wall_seconds"] = time.perf_counter() - record.pop("_wall")
+        record["cpu_seconds"] = time.process_time() - record.pop("_cpu")
+        record["peak_rss_bytes"] = peak_rss_bytes()
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            start = record.pop("_mem")
+            record["tracemalloc_delta_bytes"] = current - start
+            record["tracemalloc_peak_bytes"] = peak - start
+        if rows_out is not None:
+            record["rows_out"] = rows_out
+        record.update(extra)
+
+        with self._lock:
+            self.stages.append(record)
+        return record
+
+    def add_stage(self, name, wall_seconds, cpu_seconds, rows_in=None, rows_out=None, **extra):
+        record = {
+            "stage": name,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": cpu_seconds,
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+        record.update(extra)
+        with self._lock:
+            self.stages.append(record)
+        return record
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        record = self.begin(name, rows_in)
+        try:
+            yield record
+        finally:
+            if self._current is record:
+                self.end()
+
+    def finish(self, status="success"):
+        self.end()
+        self.status = status
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def run_record(self):
+        return {
+            "pipeline": self.pipeline,
+            "host": socket.gethostname(),
+            "started_at": self.started_at,
+            "status": self.status,
+            "wall_seconds": time.perf_counter() - self._run_start,
+            "cpu_seconds": time.process_time() - self._run_cpu_start,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": self.stages,
+        }
+
+    def write_json(self, filename):
+        _atomic_write(filename, json.dumps(self.run_record(), indent=2, default=str))
+        return filename
+
+    def write_prometheus(self, filename):
+        """
+        Writes a .prom file; point the node exporter's
+        --collector.textfile.directory at its folder.
+        """
+        record = self.run_record()
+        labels = f'pipeline="{self.pipeline}"'
+        lines = [
+            "# HELP sales_pipeline_run_wall_seconds Wall time of the last run.",
+            "# TYPE sales_pipeline_run_wall_seconds gauge",
+            f"sales_pipeline_run_wall_seconds{{{labels}}} {record['wall_seconds']:.6f}",
+            "# HELP sales_pipeline_run_success 1 if the last run succeeded.",
+            "# TYPE sales_pipeline_run_success gauge",
+            f"sales_pipeline_run_success{{{labels}}} {int(self.status == 'success')}",
+            "# HELP sales_pipeline_run_timestamp_seconds Start time of the last run.",
+            "# TYPE sales_pipeline_run_timestamp_seconds gauge",
+            f"sales_pipeline_run_timestamp_seconds{{{labels}}} {record['started_at']:.0f}",
+            "# HELP sales_pipeline_peak_rss_bytes Peak resident set size of the last run.",
+            "# TYPE sales_pipeline_peak_rss_bytes gauge",
+            f"sales_pipeline_peak_rss_bytes{{{labels}}} {record['peak_rss_bytes']}",
+        ]
+
+        stage_metrics = [
+            ("wall_seconds", "Wall time per stage."),
+            ("cpu_seconds", "CPU time per stage."),
+            ("rows_in", "Rows entering each stage."),
+            ("rows_out", "Rows leaving each stage."),
+            ("tracemalloc_delta_bytes", "Net Python heap growth per stage."),
+            ("tracemalloc_peak_bytes", "Peak Python heap growth per stage."),
+            ("api_requests", "HTTP requests made per stage."),
+            ("api_latency_max_seconds", "Slowest HTTP request per stage."),
+            ("api_latency_avg_seconds", "Mean HTTP request latency per stage."),
+        ]
+        for key, help_text in stage_metrics:
+            samples = [s for s in self.stages if s.get(key) is not None]
+            if not samples:
+                continue
+            metric = f"sales_pipeline_stage_{key}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for s in samples:
+                lines.append(f'{metric}{{{labels},stage="{s["stage"]}"}} {s[key]}')
+
+        _atomic_write(filename, "\n".join(lines) + "\n")
+        return filename
+
+
+def latency_summary(fetch_stats):
+    """
+    Stage extras from an api_handler fetch stats dict.
+    """
+    latencies = fetch_stats.get("latencies") or []
+    return {
+        "api_requests": fetch_stats.get("requests", 0),
+        "api_retries": fetch_stats.get("retries", 0),
+        "api_latency_max_seconds": max(latencies) if latencies else None,
+        "api_latency_avg_seconds": (sum(latencies) / len(latencies)) if latencies else None,
+    }
+
+
+def _atomic_write(filename, text):
+    # The node exporter must never scrape a half-written file
+    folder = os.path.dirname(filename)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = filename + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, filename)
+
+
+# ====================================
+# Optional Profilers
+# ====================================
+@contextlib.contextmanager
+def profiled(kind=None, output_dir="output"):
+    """
+    Wraps a block in cProfile ('cprofile' → output/profile.prof) or
+    pyinstrument ('pyinstrument' → output/profile.html). No-op for None.
+    """
+    if not kind:
+        yield
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    if kind == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = os.path.join(output_dir, "profile.prof")
+            profiler.dump_stats(path)
+            print(f"[SUCCESS] cProfile stats written to: {path}")
+        return
+
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[ERROR] pyinstrument is not installed; running without profiler")
+            yield
+            return
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path = os.path.join(output_dir, "profile.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            print(f"[SUCCESS] pyinstrument report written to: {path}")
+        return
+
+    raise ValueError(f"Unknown profiler: {kind}")
@@ -0,0 +1,407 @@
+# utils/query_service.py
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from filehandler import build_filter_index, ingest_byte_range, new_validation_summary
+from utils import data_processor as dp
+from utils.data_processor import SalesAggregates, build_aggregates
+from utils.incremental import file_fingerprint, last_line_end
+from utils.records import new_symbol_tables
+from utils.report_generator import render_sales_report
+
+
+# ====================================
+# LRU Result Cache
+# ====================================
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache. clear() drops everything and is
+    called whenever new data is ingested.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {"size": len(self.entries), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses}
+
+
+# ====================================
+# Warm Analytics State
+# ====================================
+def _optional_float(value):
+    return float(value) if value not in (None, "") else None
+
+
+def _optional_int(value):
+    return int(value) if value not in (None, "") else None
+
+
+# endpoint: (function, {parameter: (converter, default)})
+ENDPOINTS = {
+    "total_revenue": (dp.calculate_total_revenue, {}),
+    "region_wise_sales": (dp.region_wise_sales, {}),
+    "top_selling_products": (dp.top_selling_products, {"n": (int, 5)}),
+    "customer_analysis": (dp.customer_analysis, {"top_n": (_optional_int, 10)}),
+    "daily_sales_trend": (dp.daily_sales_trend, {}),
+    "peak_sales_day": (dp.find_peak_sales_day, {}),
+    "low_performing_products": (dp.low_performing_products, {"threshold": (int, 10)}),
+}
+QUERY_ENDPOINTS = set(ENDPOINTS) | {"report"}
+FILTERS = {"region": (str, None), "min_amount": (_optional_float, None), "max_amount": (_optional_float, None)}
+
+
+def normalize_query(endpoint, params):
+    """
+    Converts raw query-string values to typed, defaulted arguments so that
+    equivalent requests (?n=5 vs none, ?region= vs none, 500 vs 500.0)
+    share one cache key.
+
+    Returns: (filters tuple, arguments tuple)
+    """
+    if endpoint not in QUERY_ENDPOINTS:
+        raise KeyError(endpoint)
+    spec = ENDPOINTS[endpoint][1] if endpoint in ENDPOINTS else {}
+
+    unknown = set(params) - set(spec) - set(FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+
+    def convert(name, converter, default):
+        raw = params.get(name)
+        if raw in (None, ""):
+            return default
+        try:
+            return converter(raw)
+        except ValueError:
+            raise ValueError(f"Bad value for {name}: {raw!r}") from None
+
+    filters = tuple(convert(name, *FILTERS[name]) for name in FILTERS)
+    arguments = tuple((name, convert(name, *spec[name])) for name in sorted(spec))
+    return filters, arguments
+
+
+class AnalyticsService:
+    """
+    Keeps the validated transactions, a FilterIndex over them and the
+    unfiltered aggregates in memory, so queries never touch the file.
+
+    Results are cached in an LRU keyed on (endpoint, normalized filters,
+    normalized arguments); per-filter aggregates share the same cache.
+    refresh() parses only bytes appended since the last load (falls back
+    to a full reload if the file was rewritten) and clears the cache.
+
+    A refresh costs O(appended rows), not O(total rows): the new rows are
+    appended to the row list, the FilterIndex is extended copy-on-write
+    (in-flight queries keep the index they started with) and the new
+    partial aggregates are merged in place under _aggregates_lock, which
+    unfiltered computations hold while they read the live aggregates.
+    """
+
+    def __init__(self, filename, product_map=None, aggregate_options=None, cache_size=256):
+        self.filename = filename
+        self.product_map = product_map or {}
+        self.aggregate_options = aggregate_options or {}
+        self.cache = LRUCache(cache_size)
+        self.generation = 0
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self._aggregates_lock = threading.Lock()
+        self._ingest_lock = threading.RLock()  # one load / refresh at a time
+
+        self.rows = []
+        self.summary = new_validation_summary()
+        self.aggregates = SalesAggregates(**self.aggregate_options)
+        self.index = build_filter_index(self.rows)
+        self.offset = 0
+        self.fingerprint = None
+        # Shared by the kept rows across refreshes; replaced on a full load
+        # so values only the dropped rows used can be freed
+        self.symbols = new_symbol_tables()
+
+    # ---- ingestion ----
+    def load(self):
+        """
+        Full (re)load of the file. Returns the number of valid rows.
+        """
+        with self._ingest_lock:
+            return self._load()
+
+    def _load(self):
+        size = os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
+        # An unterminated last line waits for the next refresh
+        end = last_line_end(self.filename, 0, size) if size else 0
+        self.symbols = new_symbol_tables()
+        rows, aggregates, summary = ingest_byte_range(
+            self.filename, 0, end, keep_rows=True, aggregate_options=self.aggregate_options,
+            symbols=self.symbols
+        ) if end else ([], SalesAggregates(**self.aggregate_options), new_validation_summary())
+        index = build_filter_index(rows)
+        with self._aggregates_lock:
+            self.aggregates = aggregates
+        self._swap(rows, summary, index, end)
+        return len(rows)
+
+    def refresh(self):
+        """
+        Ingests lines appended since the last load. Returns the number of
+        new valid rows (0 if nothing changed).
+        """
+        with self._ingest_lock:
+            return self._refresh()
+
+    def _refresh(self):
+        if not os.path.exists(self.filename):
+            return 0
+        size = os.path.getsize(self.filename)
+        if size < self.offset or (self.offset and file_fingerprint(self.filename, self.offset) != self.fingerprint):
+            return self._load()
+
+        end = last_line_end(self.filename, self.offset, size)
+        if end == self.offset:
+            return 0
+
+        new_rows, part_agg, part_summary = ingest_byte_range(
+            self.filename, self.offset, end, keep_rows=True, aggregate_options=self.aggregate_options,
+            symbols=self.symbols
+        )
+        summary = dict(self.summary)
+        for key in summary:
+            summary[key] += part_summary[key]
+        # Appends to self.rows; queries holding the old index only see its rows
+        index = self.index.extended(new_rows)
+        with self._aggregates_lock:
+            self.aggregates.merge(part_agg)
+        self._swap(self.rows, summary, index, end)
+        return len(new_rows)
+
+    def _swap(self, rows, summary, index, offset):
+        with self._lock:
+            self.rows, self.summary, self.index = rows, summary, index
+            self.offset = offset
+            self.fingerprint = file_fingerprint(self.filename, offset) if offset else None
+            self.generation += 1
+            self.loaded_at = time.time()
+            self.cache.clear()
+
+    # ---- queries ----
+    def _aggregates_for(self, filters, generation, index):
+        key = ("aggregates", generation, filters)
+        agg = self.cache.get(key)
+        if agg is None:
+            agg = build_aggregates(index.query(*filters), **self.aggregate_options)
+            self.cache.put(key, agg)
+        return agg
+
+    def check_available(self, endpoint):
+        # Raises ValueError for an endpoint this service's aggregates cannot answer
+        if endpoint == "low_performing_products" and self.aggregates.approximate_top:
+            raise ValueError("Low performing products are not tracked in heavy-hitter mode")
+
+    def _snapshot(self):
+        with self._lock:
+            return self.generation, self.index
+
+    def _compute(self, endpoint, filters, arguments, snapshot):
+        generation, index = snapshot
+        if filters == (None, None, None):
+            # The live aggregates are merged into in place on refresh
+            with self._aggregates_lock:
+                return self._run(endpoint, self.aggregates, arguments)
+        return self._run(endpoint, self._aggregates_for(filters, generation, index), arguments)
+
+    def _run(self, endpoint, agg, arguments):
+        if endpoint == "report":
+            return render_sales_report(agg, product_map=self.product_map)
+        return ENDPOINTS[endpoint][0](agg, **dict(arguments))
+
+    def query(self, endpoint, params=None):
+        """
+        Runs one endpoint with raw string params. Returns (result, cached).
+        Raises KeyError for an unknown endpoint, ValueError for bad params.
+        """
+        filters, arguments = normalize_query(endpoint, params or {})
+        snapshot = self._snapshot()
+
+        # The generation in the key keeps a result computed from old data
+        # from landing in the cache after a concurrent refresh cleared it
+        key = (endpoint, snapshot[0], filters, arguments)
+        result = self.cache.get(key)
+        if result is not None:
+            return result, True
+
+        result = self._compute(endpoint, filters, arguments, snapshot)
+        self.cache.put(key, result)
+        return result, False
+
+    def response(self, endpoint, params=None):
+        """
+        Like query() but returns the encoded HTTP body, cached as bytes so
+        a hit skips JSON encoding too.
+
+        Returns: (body bytes, content type, cached)
+        """
+        filters, arguments = normalize_query(endpoint, params or {})
+        snapshot = self._snapshot()
+        key = ("response", endpoint, snapshot[0], filters, arguments)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit + (True,)
+
+        result = self._compute(endpoint, filters, arguments, snapshot)
+        if endpoint == "report":
+            encoded = (result.encode("utf-8"), "text/plain")
+        else:
+            body = json.dumps({"endpoint": endpoint, "result": result}, default=list)
+            encoded = (body.encode("utf-8"), "application/json")
+        self.cache.put(key, encoded)
+        return encoded + (False,)
+
+    def status(self):
+        return {
+            "file": self.filename,
+            "rows": self.index.size,
+            "summary": self.summary,
+            "offset": self.offset,
+            "generation": self.generation,
+            "loaded_at": self.loaded_at,
+            "cache": self.cache.stats(),
+            "endpoints": sorted(ENDPOINTS) + ["report"],
+        }
+
+
+# ====================================
+# HTTP Front End
+# ====================================
+class _QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive for dashboards polling often
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, data, content_type="application/json", cached=None):
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if cached is not None:
+            self.send_header("X-Cache", "HIT" if cached else "MISS")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, value):
+        self._send(status, json.dumps(value, default=list).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.strip("/")
+        params = {name: values[-1] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        service = self.server.service
+
+        if endpoint in ("", "health"):
+            self._send_json(200, service.status())
+            return
+        if endpoint not in QUERY_ENDPOINTS:
+            self._send_json(404, {"error": f"Unknown endpoint: /{endpoint}"})
+            return
+        try:
+            normalize_query(endpoint, params)
+            service.check_available(endpoint)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            body, content_type, cached = service.response(endpoint, params)
+        except Exception as e:
+            self._send_error(endpoint, e)
+            return
+        self._send(200, body, content_type, cached)
+
+    def _send_error(self, endpoint, error):
+        # Anything raised past parameter checks is a server bug, not a bad request
+        print(f"[ERROR] /{endpoint} failed: {error!r}")
+        self._send_json(500, {"error": f"Internal error while handling /{endpoint}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path.strip("/") != "refresh":
+            self._send_json(404, {"error": "POST only supports /refresh"})
+            return
+        service = self.server.service
+        try:
+            new_rows = service.refresh()
+        except Exception as e:
+            self._send_error("refresh", e)
+            return
+        self._send_json(200, {"new_rows": new_rows, "generation": service.generation})
+
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default 5 stalls concurrent dashboards on connect
+
+    def __init__(self, address, service, refresh_interval=None):
+        super().__init__(address, _QueryHandler)
+        self.service = service
+        self.refresh_interval = refresh_interval
+        self._stop_polling = threading.Event()
+
+    def poll_for_appends(self):
+        while not self._stop_polling.wait(self.refresh_interval):
+            # One failed refresh (e.g. the file briefly missing during a
+            # rotation) must not stop polling for the life of the server
+            try:
+                self.service.refresh()
+            except Exception as e:
+                print(f"[ERROR] Background refresh failed: {e!r}")
+
+    def shutdown(self):
+        self._stop_polling.set()
+        super().shutdown()
+
+
+def start_query_server(service, host="127.0.0.1", port=8765, refresh_interval=None):
+    """
+    Serves `service` from a QueryServer in a daemon thread. With
+    refresh_interval (seconds) a second thread polls the file for appends.
+    Returns: (server, base_url) — call server.shutdown() when done.
+    """
+    server = QueryServer((host, port), service, refresh_interval)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    if refresh_interval:
+        threading.Thread(target=server.poll_for_appends, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,158 @@
+# utils/records.py
+
+
+# ====================================
+# Compact Transaction Records
+# ====================================
+class SymbolTable:
+    """
+    Per-column intern table: every distinct value is stored once and all
+    rows holding it share that one object.
+    """
+
+    def __init__(self):
+        self.symbols = {}
+
+    def intern(self, value):
+        return self.symbols.setdefault(value, value)
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+# Region / product / customer / date strings (and unit prices) repeat on
+# almost every row, so each parsed value is swapped for the shared copy
+SYMBOL_COLUMNS = ("Date", "ProductID", "ProductName", "UnitPrice", "CustomerID", "Region")
+
+
+def new_symbol_tables():
+    """
+    One SymbolTable per interned column. Tables are scoped to an ingest
+    (one parse call, or one service load) rather than global, so values
+    no longer referenced by any row can be freed in long-running modes.
+    """
+    return {column: SymbolTable() for column in SYMBOL_COLUMNS}
+
+BASE_FIELDS = (
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region"
+)
+API_FIELDS = ("API_Category", "API_Brand", "API_Rating", "API_Match")
+BASE_FIELD_SET = frozenset(BASE_FIELDS + ("Amount",))
+API_FIELD_SET = frozenset(API_FIELDS)
+
+
+class Transaction:
+    """
+    One sales row in a fixed set of slots instead of a per-row dict.
+    Amount is computed once on creation.
+
+    Supports the dict-style access the rest of the pipeline uses
+    (tx["Region"], tx.get("API_Match"), tx["API_Brand"] = ..., tx.update(...)),
+    so every function that took transaction dicts takes these too.
+
+    The API_* fields only exist once enrichment has set them, like dict keys.
+    They live in one `_api` dict: update() with API fields only stores the
+    given dict itself, so rows of the same product share enrichment's
+    per-ProductID dict; single-field writes copy it first.
+    """
+
+    __slots__ = BASE_FIELDS + ("Amount", "_api")
+
+    def __init__(self, transaction_id, date, product_id, product_name,
+                 quantity, unit_price, customer_id, region):
+        self.TransactionID = transaction_id
+        self.Date = date
+        self.ProductID = product_id
+        self.ProductName = product_name
+        self.Quantity = quantity
+        self.UnitPrice = unit_price
+        self.CustomerID = customer_id
+        self.Region = region
+        self.Amount = quantity * unit_price
+        self._api = None
+
+    @classmethod
+    def interned(cls, symbols, transaction_id, date, product_id, product_name,
+                 quantity, unit_price, customer_id, region):
+        """
+        Builds a record whose categorical values come from `symbols`
+        (see new_symbol_tables).
+        """
+        return cls(
+            transaction_id,
+            symbols["Date"].intern(date),
+            symbols["ProductID"].intern(product_id),
+            symbols["ProductName"].intern(product_name),
+            quantity,
+            symbols["UnitPrice"].intern(unit_price),
+            symbols["CustomerID"].intern(customer_id),
+            symbols["Region"].intern(region)
+        )
+
+    @classmethod
+    def from_dict(cls, tx):
+        record = cls(*(tx[field] for field in BASE_FIELDS))
+        api = {field: tx[field] for field in API_FIELDS if field in tx}
+        if api:
+            record._api = api
+        return record
+
+    # ---- dict-style access ----
+    def __getitem__(self, key):
+        if key in API_FIELD_SET:
+            if self._api is not None and key in self._api:
+                return self._api[key]
+        elif key in BASE_FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in API_FIELD_SET:
+            api = dict(self._api or {})
+            api[key] = value
+            self._api = api
+        elif key in BASE_FIELD_SET:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in API_FIELD_SET:
+            return key in (self._api or {})
+        return key in BASE_FIELD_SET
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, values):
+        if self._api is None and values and all(k in API_FIELD_SET for k in values):
+            self._api = values  # shared, never mutated through this record
+            return
+        for key, value in values.items():
+            self[key] = value
+
+    def keys(self):
+        return list(BASE_FIELDS) + ["Amount"] + list(self._api or {})
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Transaction, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Transaction({self.to_dict()!r})"
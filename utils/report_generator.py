@@ -1,178 +1,289 @@
 # utils/report_generator.py
 
+import heapq
 import os
 from datetime import datetime
+from itertools import islice
 from utils.data_processor import (
+    build_aggregates,
     calculate_total_revenue,
     region_wise_sales,
     top_selling_products,
     customer_analysis,
     daily_sales_trend,
     find_peak_sales_day,
-    low_performing_products
+    low_performing_products,
+    top_error
 )
+from utils.api_handler import build_enrichment_lookup
+from utils.dates import ordinal_to_iso
+
+
+# Section caps: a report must stay readable (and small) however big the input
+MAX_DAILY_ROWS = 366   # most recent days shown; earlier ones are summed up
+MAX_LIST_ROWS = 50     # regions, low performers, products not enriched
 
 
 def format_currency(amount):
     return f"₹{amount:,.2f}"
 
 
-def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt'):
+class ReportWriter:
+    """
+    Writes report lines to disk as they are produced instead of collecting
+    them in a list. Output goes to a temp file that replaces `output_file`
+    only once the report is complete, so readers never see half a report.
+    append() keeps the old "\n".join(lines) layout byte for byte.
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.tmp_file = output_file + ".tmp"
+        self.f = open(self.tmp_file, "w", encoding="utf-8", buffering=1 << 16)
+        self.sep = ""
+
+    def append(self, line):
+        self.f.write(self.sep + line)
+        self.sep = "\n"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.f.close()
+        if exc_type is None:
+            os.replace(self.tmp_file, self.output_file)
+        else:
+            os.remove(self.tmp_file)
+
+
+def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt',
+                          aggregates=None, product_map=None,
+                          max_daily_rows=MAX_DAILY_ROWS, max_list_rows=MAX_LIST_ROWS):
+    """
+    Writes the report section by section. Long sections are capped:
+    the daily trend shows the latest max_daily_rows days, and lists show
+    their first max_list_rows entries followed by a count of the rest.
+    Products that failed enrichment are listed once each with their
+    transaction count, most frequent first.
+    """
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
-    report_lines = []
+    # Every section reads from one single-pass aggregation
+    agg = aggregates if aggregates is not None else build_aggregates(transactions)
+
+    with ReportWriter(output_file) as report:
+        _write_report(report, agg, enriched_transactions, product_map,
+                      max_daily_rows, max_list_rows)
+
+    print(f"[SUCCESS] Sales report generated at: {output_file}")
+
+
+def render_sales_report(aggregates, product_map=None, enriched_transactions=None,
+                        max_daily_rows=MAX_DAILY_ROWS, max_list_rows=MAX_LIST_ROWS):
+    """
+    Returns the report text instead of writing it (for the query service).
+    """
+    lines = []
+    _write_report(lines, aggregates, enriched_transactions, product_map,
+                  max_daily_rows, max_list_rows)
+    return "\n".join(lines)
+
+
+def _write_report(report, agg, enriched_transactions, product_map, max_daily_rows, max_list_rows):
 
     # --------------------------------------------------
     # 1. HEADER
     # --------------------------------------------------
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    total_records = len(transactions)
+    total_records = agg.transaction_count
 
-    report_lines.append("=" * 60)
-    report_lines.append(f"{'SALES ANALYTICS REPORT':^60}")
-    report_lines.append(f"Generated: {now:^60}")
-    report_lines.append(f"Records Processed: {total_records:^60}")
-    report_lines.append("=" * 60)
-    report_lines.append("\n")
+    report.append("=" * 60)
+    report.append(f"{'SALES ANALYTICS REPORT':^60}")
+    report.append(f"Generated: {now:^60}")
+    report.append(f"Records Processed: {total_records:^60}")
+    report.append("=" * 60)
+    report.append("\n")
 
     # --------------------------------------------------
     # 2. OVERALL SUMMARY
     # --------------------------------------------------
-    revenue = calculate_total_revenue(transactions)
+    revenue = calculate_total_revenue(agg)
     avg_order_value = revenue / total_records if total_records > 0 else 0
 
     # date range
-    dates = sorted(set([tx["Date"] for tx in transactions]))
-    date_range = f"{dates[0]} to {dates[-1]}" if dates else "N/A"
+    date_range = f"{ordinal_to_iso(min(agg.days))} to {ordinal_to_iso(max(agg.days))}" if agg.days else "N/A"
 
-    report_lines.append("OVERALL SUMMARY")
-    report_lines.append("-" * 60)
-    report_lines.append(f"Total Revenue:\t\t{format_currency(revenue)}")
-    report_lines.append(f"Total Transactions:\t{total_records}")
-    report_lines.append(f"Average Order Value:\t{format_currency(avg_order_value)}")
-    report_lines.append(f"Date Range:\t\t{date_range}")
-    report_lines.append("\n")
+    report.append("OVERALL SUMMARY")
+    report.append("-" * 60)
+    report.append(f"Total Revenue:\t\t{format_currency(revenue)}")
+    report.append(f"Total Transactions:\t{total_records}")
+    report.append(f"Average Order Value:\t{format_currency(avg_order_value)}")
+    report.append(f"Date Range:\t\t{date_range}")
+    report.append("\n")
 
     # --------------------------------------------------
     # 3. REGION-WISE PERFORMANCE
     # --------------------------------------------------
-    region_stats = region_wise_sales(transactions)
+    region_stats = region_wise_sales(agg)
 
-    report_lines.append("REGION-WISE PERFORMANCE")
-    report_lines.append("-" * 60)
-    report_lines.append(f"{'Region':<10}{'Sales':<20}{'% of Total':<15}{'Transactions'}")
+    report.append("REGION-WISE PERFORMANCE")
+    report.append("-" * 60)
+    report.append(f"{'Region':<10}{'Sales':<20}{'% of Total':<15}{'Transactions'}")
     total_sales = revenue
 
-    for region, stats in region_stats.items():
-        report_lines.append(
+    for region, stats in islice(region_stats.items(), max_list_rows):
+        report.append(
             f"{region:<10}{format_currency(stats['total_sales']):<20}"
             f"{stats['percentage']:.2f}%{'':<5}{stats['transaction_count']}"
         )
-    report_lines.append("\n")
+    if len(region_stats) > max_list_rows:
+        report.append(f"... and {len(region_stats) - max_list_rows} more regions")
+    report.append("\n")
 
     # --------------------------------------------------
     # 4. TOP 5 PRODUCTS
     # --------------------------------------------------
-    report_lines.append("TOP 5 PRODUCTS")
-    report_lines.append("-" * 60)
-    report_lines.append(f"{'Rank':<6}{'Product':<20}{'Qty Sold':<12}{'Revenue'}")
+    qty_error, spend_error = top_error(agg)
 
-    top_products = top_selling_products(transactions, n=5)
+    report.append("TOP 5 PRODUCTS")
+    report.append("-" * 60)
+    if agg.approximate_top:
+        report.append(f"(Approximate: Qty Sold may overstate by up to {qty_error:,.0f})")
+    report.append(f"{'Rank':<6}{'Product':<20}{'Qty Sold':<12}{'Revenue'}")
+
+    top_products = top_selling_products(agg, n=5)
     for i, (pname, qty, rev) in enumerate(top_products, start=1):
-        report_lines.append(
+        report.append(
             f"{i:<6}{pname:<20}{qty:<12}{format_currency(rev)}"
         )
-    report_lines.append("\n")
+    report.append("\n")
 
     # --------------------------------------------------
     # 5. TOP 5 CUSTOMERS
     # --------------------------------------------------
-    customers = customer_analysis(transactions)
-    report_lines.append("TOP 5 CUSTOMERS")
-    report_lines.append("-" * 60)
-    report_lines.append(f"{'Rank':<6}{'Customer':<12}{'Total Spent':<18}{'Orders'}")
+    customers = customer_analysis(agg, top_n=5)
+    report.append("TOP 5 CUSTOMERS")
+    report.append("-" * 60)
+    if agg.approximate_top:
+        report.append(f"(Approximate: Total Spent may overstate by up to {format_currency(spend_error)})")
+    report.append(f"{'Rank':<6}{'Customer':<12}{'Total Spent':<18}{'Orders'}")
 
     for i, (cid, stats) in enumerate(customers.items(), start=1):
-        if i > 5: break
-        report_lines.append(
+        report.append(
             f"{i:<6}{cid:<12}{format_currency(stats['total_spent']):<18}{stats['purchase_count']}"
         )
-    report_lines.append("\n")
+    report.append("\n")
 
     # --------------------------------------------------
     # 6. DAILY SALES TREND
     # --------------------------------------------------
-    daily_stats = daily_sales_trend(transactions)
-
-    report_lines.append("DAILY SALES TREND")
-    report_lines.append("-" * 60)
-    report_lines.append(f"{'Date':<14}{'Revenue':<18}{'Transactions':<15}{'Unique Cust.'}")
+    daily_stats = daily_sales_trend(agg)
+
+    report.append("DAILY SALES TREND")
+    report.append("-" * 60)
+    if agg.approximate_distinct:
+        report.append(f"(Approximate: Unique Cust. is a HyperLogLog estimate, "
+                            f"±{agg.distinct_error * 100:.1f}% std. error)")
+    report.append(f"{'Date':<14}{'Revenue':<18}{'Transactions':<15}{'Unique Cust.'}")
+
+    # Only the most recent days are listed; older ones are summed in one line
+    hidden = max(len(daily_stats) - max_daily_rows, 0)
+    if hidden:
+        older = list(islice(daily_stats.values(), hidden))
+        report.append(
+            f"... {hidden} earlier days omitted (Revenue: "
+            f"{format_currency(sum(d['revenue'] for d in older))}, "
+            f"Transactions: {sum(d['transaction_count'] for d in older)})"
+        )
 
-    for date, stats in daily_stats.items():
-        report_lines.append(
+    for date, stats in islice(daily_stats.items(), hidden, None):
+        report.append(
             f"{date:<14}{format_currency(stats['revenue']):<18}"
             f"{stats['transaction_count']:<15}{stats['unique_customers']}"
         )
-    report_lines.append("\n")
+    report.append("\n")
 
     # --------------------------------------------------
     # 7. PRODUCT PERFORMANCE ANALYSIS
     # --------------------------------------------------
-    peak_day, peak_rev, peak_txn = find_peak_sales_day(transactions)
-    low_perf = low_performing_products(transactions, threshold=10)
+    peak = find_peak_sales_day(agg)
+    # Heavy-hitter mode keeps no long tail to search for low performers
+    low_perf = None if agg.approximate_top else low_performing_products(agg, threshold=10)
 
     # Avg transaction per region
     region_avg_val = {r: (region_stats[r]['total_sales'] / region_stats[r]['transaction_count'])
                       for r in region_stats}
 
-    report_lines.append("PRODUCT PERFORMANCE ANALYSIS")
-    report_lines.append("-" * 60)
-    report_lines.append(f"Best Selling Day: {peak_day} (Revenue: {format_currency(peak_rev)}, Transactions: {peak_txn})")
-
-    if low_perf:
-        report_lines.append("\nLow Performing Products (Qty < 10):")
-        report_lines.append(f"{'Product':<20}{'Qty':<10}{'Revenue'}")
-        for pname, qty, rev in low_perf:
-            report_lines.append(f"{pname:<20}{qty:<10}{format_currency(rev)}")
+    report.append("PRODUCT PERFORMANCE ANALYSIS")
+    report.append("-" * 60)
+    if peak is None:
+        report.append("Best Selling Day: No transactions")
+    else:
+        peak_day, peak_rev, peak_txn = peak
+        report.append(f"Best Selling Day: {peak_day} (Revenue: {format_currency(peak_rev)}, Transactions: {peak_txn})")
+
+    if low_perf is None:
+        report.append("\nLow Performing Products: not tracked in heavy-hitter mode")
+    elif low_perf:
+        report.append("\nLow Performing Products (Qty < 10):")
+        report.append(f"{'Product':<20}{'Qty':<10}{'Revenue'}")
+        for pname, qty, rev in low_perf[:max_list_rows]:
+            report.append(f"{pname:<20}{qty:<10}{format_currency(rev)}")
+        if len(low_perf) > max_list_rows:
+            report.append(f"... and {len(low_perf) - max_list_rows} more products")
     else:
-        report_lines.append("\nLow Performing Products: None")
+        report.append("\nLow Performing Products: None")
 
-    report_lines.append("\n\nAverage Transaction Value Per Region:")
-    for r, val in region_avg_val.items():
-        report_lines.append(f"  {r}: {format_currency(val)}")
-    report_lines.append("\n")
+    report.append("\n\nAverage Transaction Value Per Region:")
+    for r, val in islice(region_avg_val.items(), max_list_rows):
+        report.append(f"  {r}: {format_currency(val)}")
+    if len(region_avg_val) > max_list_rows:
+        report.append(f"  ... and {len(region_avg_val) - max_list_rows} more regions")
+    report.append("\n")
 
     # --------------------------------------------------
     # 8. API ENRICHMENT SUMMARY
     # --------------------------------------------------
-    report_lines.append("API ENRICHMENT SUMMARY")
-    report_lines.append("-" * 60)
+    report.append("API ENRICHMENT SUMMARY")
+    report.append("-" * 60)
+
+    if enriched_transactions is not None:
+        total = len(enriched_transactions)
+        success = 0
+        failed_counts = {}
+        for tx in enriched_transactions:
+            if tx.get("API_Match"):
+                success += 1
+            else:
+                pid = tx["ProductID"]
+                failed_counts[pid] = failed_counts.get(pid, 0) + 1
+    else:
+        # No row-level data (e.g. incremental runs): join the per-ProductID
+        # counts against the catalog instead
+        lookup = build_enrichment_lookup(agg.product_ids, product_map or {})
+        total = agg.transaction_count
+        success = sum(n for pid, n in agg.product_ids.items() if lookup[pid]["API_Match"])
+        failed_counts = {
+            pid: n for pid, n in agg.product_ids.items() if not lookup[pid]["API_Match"]
+        }
 
-    total = len(enriched_transactions)
-    success = sum(1 for tx in enriched_transactions if tx.get("API_Match"))
     fail = total - success
     success_rate = (success / total * 100) if total > 0 else 0
 
-    failed_products = [
-        tx["ProductID"] for tx in enriched_transactions if not tx.get("API_Match")
-    ]
-
-    report_lines.append(f"Total Enriched Records:\t{total}")
-    report_lines.append(f"Successful Matches:\t{success}")
-    report_lines.append(f"Failed Matches:\t\t{fail}")
-    report_lines.append(f"Success Rate:\t\t{success_rate:.2f}%")
-
-    if failed_products:
-        report_lines.append("\nProducts Not Enriched:")
-        for pid in failed_products:
-            report_lines.append(f"  - {pid}")
+    report.append(f"Total Enriched Records:\t{total}")
+    report.append(f"Successful Matches:\t{success}")
+    report.append(f"Failed Matches:\t\t{fail}")
+    report.append(f"Success Rate:\t\t{success_rate:.2f}%")
+
+    if failed_counts:
+        # Each ProductID once, most failed transactions first
+        worst = heapq.nsmallest(max_list_rows, failed_counts.items(), key=lambda x: (-x[1], x[0]))
+        report.append(f"\nProducts Not Enriched ({len(failed_counts)} distinct):")
+        for pid, n in worst:
+            report.append(f"  - {pid} ({n} transactions)")
+        if len(failed_counts) > len(worst):
+            rest = fail - sum(n for _, n in worst)
+            report.append(f"  ... and {len(failed_counts) - len(worst)} more products ({rest} transactions)")
     else:
-        report_lines.append("\nAll Products Successfully Enriched")
-
-    # --------------------------------------------------
-    # WRITE OUTPUT FILE
-    # --------------------------------------------------
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(report_lines))
-
-    print(f"[SUCCESS] Sales report generated at: {output_file}")
+        report.append("\nAll Products Successfully Enriched")
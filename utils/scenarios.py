@@ -0,0 +1,200 @@
+# utils/scenarios.py
+
+import json
+import os
+import re
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+from filehandler import SalesFile, iter_valid_transactions, new_validation_summary, split_byte_ranges
+from utils.data_processor import SalesAggregates
+
+
+# ====================================
+# Batch Filter Scenarios
+# ====================================
+class Scenario:
+    """
+    One named filter combination — the same region / amount filters the
+    interactive prompt offers. None means "no filter" for that field.
+    """
+
+    def __init__(self, name, region=None, min_amount=None, max_amount=None):
+        self.name = name
+        self.region = region or None
+        self.min_amount = None if min_amount is None else float(min_amount)
+        self.max_amount = None if max_amount is None else float(max_amount)
+
+    @property
+    def slug(self):
+        # Safe file name for the scenario's report
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", self.name).strip("_") or "scenario"
+
+    def describe(self):
+        parts = [f"region={self.region}" if self.region else "all regions"]
+        if self.min_amount is not None:
+            parts.append(f"amount>={self.min_amount:,.0f}")
+        if self.max_amount is not None:
+            parts.append(f"amount<={self.max_amount:,.0f}")
+        return ", ".join(parts)
+
+    def __repr__(self):
+        return f"Scenario({self.name!r}, {self.describe()})"
+
+
+_SPEC_KEYS = {"region": "region", "min": "min_amount", "min_amount": "min_amount",
+              "max": "max_amount", "max_amount": "max_amount"}
+
+
+def parse_scenario_spec(spec):
+    """
+    Parses a command-line scenario:
+        'north-high:region=North,min=500,max=20000'
+        'all'                   (no filters)
+    """
+    name, _, filters = spec.partition(":")
+    options = {}
+    for item in filter(None, (part.strip() for part in filters.split(","))):
+        key, sep, value = item.partition("=")
+        key = key.strip().lower()
+        if not sep or key not in _SPEC_KEYS:
+            raise ValueError(f"Bad scenario filter '{item}' in '{spec}' (use region=, min=, max=)")
+        options[_SPEC_KEYS[key]] = value.strip() or None
+    return Scenario(name.strip(), **options)
+
+
+def load_scenarios(filename):
+    """
+    Reads scenarios from a JSON file: a list (or {"scenarios": [...]}) of
+    objects with "name" and optional "region", "min_amount", "max_amount".
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("scenarios", [])
+
+    scenarios = []
+    for i, item in enumerate(data):
+        unknown = set(item) - {"name", "region", "min_amount", "max_amount"}
+        if unknown:
+            raise ValueError(f"Scenario #{i + 1}: unknown field(s) {', '.join(sorted(unknown))}")
+        scenarios.append(Scenario(
+            item.get("name") or f"scenario_{i + 1}",
+            item.get("region"), item.get("min_amount"), item.get("max_amount")
+        ))
+    return scenarios
+
+
+def check_scenarios(scenarios):
+    if not scenarios:
+        raise ValueError("No scenarios given")
+    seen = set()
+    for scenario in scenarios:
+        if scenario.slug in seen:
+            raise ValueError(f"Duplicate scenario name: {scenario.name}")
+        seen.add(scenario.slug)
+    return scenarios
+
+
+class ScenarioRouter:
+    """
+    Finds every scenario a row belongs to without testing all of them:
+    scenarios are bucketed by region (plus one bucket for "any region"),
+    and each bucket is sorted by min_amount, so one bisect drops every
+    scenario whose lower bound is above the row's amount.
+    """
+
+    def __init__(self, scenarios):
+        buckets = {}
+        for i, scenario in enumerate(scenarios):
+            low = float("-inf") if scenario.min_amount is None else scenario.min_amount
+            buckets.setdefault(scenario.region, []).append((low, i, scenario.max_amount))
+
+        self.buckets = {}
+        for region, entries in buckets.items():
+            entries.sort()
+            self.buckets[region] = ([low for low, _, _ in entries],
+                                    [(i, high) for _, i, high in entries])
+        self.any_region = self.buckets.pop(None, None)
+
+    def route(self, tx):
+        """
+        Indexes of the scenarios whose filters keep this row.
+        """
+        amount = tx["Amount"]
+        matched = []
+        for bucket in (self.buckets.get(tx["Region"]), self.any_region):
+            if bucket is None:
+                continue
+            lows, entries = bucket
+            for i, high in entries[:bisect_right(lows, amount)]:
+                if high is None or amount <= high:
+                    matched.append(i)
+        return matched
+
+
+def scan_scenarios(filename, scenarios, start=0, end=None, aggregate_options=None):
+    """
+    One pass over [start, end) of the sales file: every valid row is
+    added to the aggregates of each scenario it matches.
+
+    Returns: (aggregates per scenario, validation summary, valid rows per region)
+    """
+    summary = new_validation_summary()
+    aggregates = [SalesAggregates(**(aggregate_options or {})) for _ in scenarios]
+    region_counts = {}
+    route = ScenarioRouter(scenarios).route
+
+    with SalesFile(filename) as sales:
+        for tx in iter_valid_transactions(sales.iter_transactions(start, end), summary):
+            region = tx["Region"]
+            region_counts[region] = region_counts.get(region, 0) + 1
+            for i in route(tx):
+                aggregates[i].add(tx)
+
+    return aggregates, summary, region_counts
+
+
+def evaluate_scenarios(filename, scenarios, workers=1, aggregate_options=None):
+    """
+    Evaluates all scenarios in a single scan of the file (split across
+    `workers` processes by byte range, like parallel_ingest).
+
+    Returns: [(scenario, aggregates, summary), ...] in the given order;
+    each summary has the counts validate_and_filter would report for
+    that scenario's filters.
+    """
+    if not os.path.exists(filename):
+        print(f"❌ File not found: {filename}")
+        ranges = []
+    else:
+        ranges = split_byte_ranges(filename, max(workers, 1))
+
+    args = [(filename, scenarios, start, end, aggregate_options) for start, end in ranges]
+    if len(args) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(args))) as pool:
+            partials = list(pool.map(scan_scenarios, *zip(*args)))
+    else:
+        partials = [scan_scenarios(*a) for a in args]
+
+    aggregates = [SalesAggregates(**(aggregate_options or {})) for _ in scenarios]
+    summary = new_validation_summary()
+    region_counts = {}
+    for part_aggs, part_summary, part_regions in partials:
+        for mine, theirs in zip(aggregates, part_aggs):
+            mine.merge(theirs)
+        for key in summary:
+            summary[key] += part_summary[key]
+        for region, n in part_regions.items():
+            region_counts[region] = region_counts.get(region, 0) + n
+
+    valid = summary["total_input"] - summary["invalid"]
+    results = []
+    for scenario, agg in zip(scenarios, aggregates):
+        in_region = region_counts.get(scenario.region, 0) if scenario.region else valid
+        scenario_summary = dict(summary)
+        scenario_summary["filtered_by_region"] = valid - in_region
+        scenario_summary["filtered_by_amount"] = in_region - agg.transaction_count
+        scenario_summary["final_count"] = agg.transaction_count
+        results.append((scenario, agg, scenario_summary))
+    return results
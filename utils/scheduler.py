@@ -0,0 +1,199 @@
+# utils/scheduler.py
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+
+# ====================================
+# DAG Stage Scheduler
+# ====================================
+class Stage:
+    """
+    One pipeline step. `func` is called with the results of `deps`
+    (positionally, in the order listed).
+
+    executor:
+    - 'main':    runs in the calling thread (interactive / GIL-heavy steps)
+    - 'thread':  thread pool, for I/O-bound steps (network, disk)
+    - 'process': process pool, for CPU-bound steps with cheap-to-pickle
+                 inputs; func must be a module-level function (or partial)
+    metrics: optional callable(result, *dep_results) -> dict of extras for
+    the run record (e.g. rows_in / rows_out).
+    """
+
+    EXECUTORS = ("main", "thread", "process")
+
+    def __init__(self, name, func, deps=(), executor="thread", metrics=None):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}")
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.executor = executor
+        self.metrics = metrics
+
+
+class StageError(RuntimeError):
+    def __init__(self, stage, error):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+def _noop():
+    return None
+
+
+def _timed_call(func, args):
+    # Runs in the worker; thread_time is per-thread and process_time is
+    # per-process, so each is the stage's own CPU time
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    result = func(*args)
+    return result, time.perf_counter() - wall, time.thread_time() - cpu
+
+
+class StageScheduler:
+    """
+    Runs stages as soon as their dependencies are done, so independent
+    stages overlap and total wall time approaches the longest dependency
+    path rather than the sum of all stages.
+
+    Stages must be added after their dependencies, which also rules out
+    cycles. 'main' stages run one at a time, earliest-added first among
+    those that are ready. A result is dropped once every stage depending
+    on it has started, so big intermediates (raw lines, ...) can be freed.
+
+    Usage:
+        sched = StageScheduler(monitor)
+        sched.add("fetch_products", fetch, executor="thread")
+        sched.add("ingest", ingest, executor="main")
+        sched.add("enrich", enrich, deps=["ingest", "fetch_products"], executor="main")
+        results = sched.run()
+    """
+
+    def __init__(self, monitor=None, max_threads=4, max_processes=2):
+        self.monitor = monitor
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.stages = {}
+        self.timings = {}
+
+    def add(self, name, func, deps=(), executor="thread", metrics=None):
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        missing = [d for d in deps if d not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {', '.join(missing)}")
+        self.stages[name] = Stage(name, func, deps, executor, metrics)
+        return self
+
+    def run(self):
+        """
+        Returns: {stage_name: result} for the stages nothing depends on.
+        The first failing stage cancels everything not yet started and is
+        raised as StageError.
+        """
+        results = {}
+        done = set()
+        waiting_on = {name: 0 for name in self.stages}
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                waiting_on[dep] += 1
+        sinks = [name for name, n in waiting_on.items() if n == 0]
+
+        pending = dict(self.stages)
+        running = {}
+        processes = None
+        if any(s.executor == "process" for s in pending.values()):
+            # Fork the workers now, before any stage thread exists
+            processes = ProcessPoolExecutor(self.max_processes)
+            processes.submit(_noop).result()
+        threads = ThreadPoolExecutor(self.max_threads, thread_name_prefix="stage")
+
+        def take_args(stage):
+            args = tuple(results[d] for d in stage.deps)
+            for dep in stage.deps:
+                waiting_on[dep] -= 1
+                if not waiting_on[dep]:
+                    del results[dep]
+            return args
+
+        try:
+            while pending or running:
+                ready = [s for s in pending.values() if all(d in done for d in s.deps)]
+
+                for stage in ready:
+                    if stage.executor == "main":
+                        continue
+                    del pending[stage.name]
+                    pool = threads if stage.executor == "thread" else processes
+                    args = take_args(stage)
+                    future = pool.submit(_timed_call, stage.func, args)
+                    running[future] = (stage, args, time.perf_counter())
+
+                main_ready = [s for s in ready if s.executor == "main"]
+                if main_ready:
+                    stage = main_ready[0]
+                    del pending[stage.name]
+                    results[stage.name] = self._run_main(stage, take_args(stage))
+                    done.add(stage.name)
+                    self._collect(running, results, done, block=False)
+                elif running:
+                    self._collect(running, results, done, block=True)
+                elif pending:
+                    raise RuntimeError("Stage scheduler stalled: " + ", ".join(pending))
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+        finally:
+            threads.shutdown(wait=True, cancel_futures=True)
+            if processes is not None:
+                processes.shutdown(wait=True, cancel_futures=True)
+
+        return {name: results[name] for name in sinks}
+
+    def _run_main(self, stage, args):
+        if self.monitor is not None:
+            self.monitor.begin(stage.name)
+        start = time.perf_counter()
+        try:
+            result = stage.func(*args)
+        except Exception as e:
+            if self.monitor is not None:
+                self.monitor.end()
+            raise StageError(stage.name, e) from e
+        self.timings[stage.name] = (start, time.perf_counter())
+        if self.monitor is not None:
+            self.monitor.end(**(stage.metrics(result, *args) if stage.metrics else {}))
+        return result
+
+    def _collect(self, running, results, done, block):
+        finished, _ = wait(list(running), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in finished:
+            stage, args, submitted = running.pop(future)
+            try:
+                result, wall, cpu = future.result()
+            except Exception as e:
+                raise StageError(stage.name, e) from e
+            results[stage.name] = result
+            done.add(stage.name)
+            self.timings[stage.name] = (submitted, submitted + wall)
+            if self.monitor is not None:
+                extra = stage.metrics(result, *args) if stage.metrics else {}
+                self.monitor.add_stage(stage.name, wall, cpu, executor=stage.executor, **extra)
+
+    def critical_path_seconds(self):
+        """
+        Longest chain of stage durations through the dependency graph —
+        the best wall time any schedule could reach.
+        """
+        finish = {}
+        for name, stage in self.stages.items():  # insertion order is topological
+            start, end = self.timings.get(name, (0.0, 0.0))
+            finish[name] = (end - start) + max((finish[d] for d in stage.deps), default=0.0)
+        return max(finish.values(), default=0.0)
+
+    def total_stage_seconds(self):
+        return sum(end - start for start, end in self.timings.values())
@@ -0,0 +1,247 @@
+# utils/sketches.py
+
+import hashlib
+import heapq
+import math
+import struct
+
+
+# =====================================
+# Space-Saving Heavy Hitters
+# =====================================
+class SpaceSaving:
+    """
+    Weighted Space-Saving summary keeping at most `capacity` counters.
+
+    Every key whose true weight exceeds total_weight / capacity is
+    guaranteed to be tracked, and each tracked count overestimates the
+    true weight by at most its recorded error (≤ total_weight / capacity).
+
+    Each counter is a list [count, error, payload]; `payload` is free for
+    the caller to attach extra per-key accumulators (reset on eviction).
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.counters = {}
+        self.total_weight = 0
+        self._heap = []  # lazy min-heap of (count, key); stale entries skipped
+
+    @classmethod
+    def for_error(cls, epsilon):
+        """
+        Summary whose per-key overestimate is at most epsilon * total_weight.
+        """
+        return cls(math.ceil(1 / epsilon))
+
+    def add(self, key, weight=1):
+        """
+        Adds weight to key and returns its counter [count, error, payload].
+        """
+        self.total_weight += weight
+        entry = self.counters.get(key)
+        if entry is not None:
+            entry[0] += weight
+            heapq.heappush(self._heap, (entry[0], key))
+            return entry
+
+        if len(self.counters) < self.capacity:
+            entry = self.counters[key] = [weight, 0, None]
+        else:
+            # Evict the smallest counter; the newcomer inherits its count as error
+            floor, victim = self._pop_min()
+            del self.counters[victim]
+            entry = self.counters[key] = [floor + weight, floor, None]
+
+        heapq.heappush(self._heap, (entry[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+        return entry
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            entry = self.counters.get(key)
+            if entry is not None and entry[0] == count:
+                return count, key
+
+    def _rebuild_heap(self):
+        self._heap = [(entry[0], key) for key, entry in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    @property
+    def max_error(self):
+        return self.total_weight / self.capacity
+
+    def top(self, n):
+        """
+        Returns the n largest counters as [(key, count, error, payload), ...].
+        """
+        best = heapq.nlargest(n, self.counters.items(), key=lambda kv: kv[1][0])
+        return [(key, entry[0], entry[1], entry[2]) for key, entry in best]
+
+    def _floor(self):
+        # Weight an untracked key may have had (0 until the summary is full)
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self.counters.values())
+
+    def merge(self, other, merge_payload=None):
+        """
+        Folds another summary in (mergeable Space-Saving: a key missing
+        from one side is charged that side's floor as count and error,
+        then the `capacity` largest counters are kept).
+        """
+        floor_self, floor_other = self._floor(), other._floor()
+        merged = {}
+        for key in self.counters.keys() | other.counters.keys():
+            mine = self.counters.get(key)
+            theirs = other.counters.get(key)
+            count = (mine[0] if mine else floor_self) + (theirs[0] if theirs else floor_other)
+            error = (mine[1] if mine else floor_self) + (theirs[1] if theirs else floor_other)
+            if mine and theirs and merge_payload is not None:
+                payload = merge_payload(mine[2], theirs[2])
+            else:
+                payload = mine[2] if mine else theirs[2]
+            merged[key] = [count, error, payload]
+
+        keep = heapq.nlargest(self.capacity, merged.items(), key=lambda kv: kv[1][0])
+        self.counters = dict(keep)
+        self.total_weight += other.total_weight
+        self._rebuild_heap()
+        return self
+
+
+# =====================================
+# Count-Min Sketch
+# =====================================
+class CountMinSketch:
+    """
+    Point estimates of per-key weight in fixed memory.
+    estimate(key) never underestimates and, with probability 1 - delta,
+    overestimates by at most epsilon * total_weight.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = [[0] * self.width for _ in range(self.depth)]
+        self.total_weight = 0
+
+    def _columns(self, key):
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        # Kirsch–Mitzenmacher: depth hash functions from two
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key, weight=1):
+        self.total_weight += weight
+        for row, col in zip(self.table, self._columns(key)):
+            row[col] += weight
+
+    def estimate(self, key):
+        return min(row[col] for row, col in zip(self.table, self._columns(key)))
+
+    @property
+    def max_error(self):
+        return self.epsilon * self.total_weight
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches must have the same dimensions to merge")
+        self.total_weight += other.total_weight
+        for mine, theirs in zip(self.table, other.table):
+            for i, value in enumerate(theirs):
+                mine[i] += value
+        return self
+
+
+# =====================================
+# HyperLogLog Distinct Counter
+# =====================================
+class HyperLogLog:
+    """
+    Approximate distinct counter with 2**precision registers; relative
+    standard error is about 1.04 / sqrt(2**precision) (1.6% at p=12).
+
+    Registers start sparse (a dict) so the many small per-customer sketches
+    stay tiny, and switch to a dense bytearray once that is smaller.
+    Quacks like the set it replaces: add(), len(), |= and copy().
+    """
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = {}
+
+    @property
+    def m(self):
+        return 1 << self.precision
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def _set(self, idx, rank):
+        registers = self.registers
+        if rank > registers[idx] if isinstance(registers, bytearray) else rank > registers.get(idx, 0):
+            registers[idx] = rank
+            if isinstance(registers, dict) and len(registers) > self.m // 32:
+                self._densify()
+
+    def _densify(self):
+        dense = bytearray(self.m)
+        for idx, rank in self.registers.items():
+            dense[idx] = rank
+        self.registers = dense
+
+    def add(self, item):
+        digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        bits = 64 - self.precision
+        rest = h & ((1 << bits) - 1)
+        self._set(h >> bits, bits - rest.bit_length() + 1)
+
+    def count(self):
+        m = self.m
+        registers = self.registers
+        if isinstance(registers, dict):
+            zeros = m - len(registers)
+            harmonic = zeros + sum(2.0 ** -rank for rank in registers.values())
+        else:
+            zeros = registers.count(0)
+            harmonic = sum(2.0 ** -rank for rank in registers)
+
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / harmonic
+        # Linear counting is far more accurate while many registers are empty
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+    def __len__(self):
+        return int(round(self.count()))
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLog sketches must have the same precision to merge")
+        theirs = other.registers
+        for idx, rank in (theirs.items() if isinstance(theirs, dict) else enumerate(theirs)):
+            if rank:
+                self._set(idx, rank)
+        return self
+
+    def __ior__(self, other):
+        return self.merge(other)
+
+    def copy(self):
+        clone = HyperLogLog(self.precision)
+        clone.registers = self.registers.copy()
+        return clone
@@ -0,0 +1,320 @@
+# utils/sqlite_store.py
+
+import os
+import sqlite3
+import time
+from itertools import islice
+
+from filehandler import expand_inputs
+from utils.data_processor import SalesAggregates
+from utils.dates import date_ordinal, ordinal_to_iso
+
+
+# ====================================
+# SQLite Transaction Store
+# ====================================
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS transactions ("
+    "transaction_id TEXT, date TEXT, day INTEGER, product_id TEXT, product_name TEXT, "
+    "quantity INTEGER, unit_price REAL, amount REAL, customer_id TEXT, region TEXT)"
+)
+_INDEXES = {
+    "idx_transactions_region": "region",
+    "idx_transactions_day": "day",
+    "idx_transactions_product_id": "product_id",
+    "idx_transactions_customer_id": "customer_id",
+}
+_COLUMNS = ("transaction_id", "date", "day", "product_id", "product_name",
+            "quantity", "unit_price", "amount", "customer_id", "region")
+
+
+class SalesStore:
+    """
+    Validated transactions in one SQLite table, indexed on region, day,
+    product_id and customer_id, so histories larger than RAM can be
+    analysed with GROUP BY queries and reused across runs without
+    re-parsing the text file.
+
+    `day` holds the date's day ordinal (see utils.dates; NULL when the date
+    does not parse) so date ranges and chronological order are integer
+    comparisons. Rows keep insertion order in rowid, which the query
+    functions below use to break ties the same way data_processor does.
+    """
+
+    def __init__(self, path="data/sales.sqlite"):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._create_indexes(conn)
+
+    def _connect(self):
+        # One connection per call, so stages on other threads can use the store
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _create_indexes(conn):
+        for name, column in _INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON transactions ({column})")
+
+    def load(self, transactions, batch_size=50000, replace=True, meta=None):
+        """
+        Bulk-loads transactions with executemany, batch_size rows per
+        call, all inside one transaction. Indexes are dropped during the
+        load and rebuilt once at the end, which is much faster than
+        updating them row by row. Accepts any iterable (e.g. a stream), so
+        the rows never need to fit in memory.
+
+        Returns: number of rows inserted
+        """
+        rows = (
+            (tx["TransactionID"], tx["Date"], date_ordinal(tx["Date"]), tx["ProductID"],
+             tx["ProductName"], tx["Quantity"], tx["UnitPrice"], tx["Amount"],
+             tx["CustomerID"], tx["Region"])
+            for tx in transactions
+        )
+        insert = f"INSERT INTO transactions ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+        conn = self._connect()
+        try:
+            # The store is reused across runs, so a crash mid-load must roll
+            # back cleanly: WAL with NORMAL sync is still fast for bulk loads
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            with conn:
+                if replace:
+                    conn.execute("DELETE FROM transactions")
+                    conn.execute("DELETE FROM meta")
+                for name in _INDEXES:
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+                count = 0
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    conn.executemany(insert, batch)
+                    count += len(batch)
+
+                self._create_indexes(conn)
+                values = {"loaded_at": repr(time.time()), **(meta or {})}
+                conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 [(key, str(value)) for key, value in values.items()])
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        return count
+
+    def meta(self):
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT key, value FROM meta"))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def execute(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+
+def source_meta(filename, filters=(None, None, None)):
+    """
+    What a store was loaded from, to decide whether it can be reused.
+    filename may be a directory or glob (see expand_inputs): the size is
+    then the total and the mtime the newest over its files.
+    """
+    files = expand_inputs(filename)
+    if not files:
+        raise FileNotFoundError(filename)
+    stats = [os.stat(path) for path in files]
+    return {
+        "source": os.path.abspath(filename),
+        "source_size": sum(stat.st_size for stat in stats),
+        "source_mtime_ns": max(stat.st_mtime_ns for stat in stats),
+        "filters": repr(tuple(filters)),
+    }
+
+
+def store_is_current(store, filename, filters=None):
+    """
+    True if the store was loaded from `filename` as it is now (same size
+    and mtime) and, when given, with the same filters.
+    """
+    meta = store.meta()
+    try:
+        expected = source_meta(filename, filters or ())
+    except FileNotFoundError:
+        return False
+    if filters is None:
+        del expected["filters"]
+    return all(meta.get(key) == str(value) for key, value in expected.items())
+
+
+# =====================================
+# Analytics As Indexed GROUP BY Queries
+# =====================================
+# Same formats as the data_processor functions. region / start / end
+# (YYYY-MM-DD, inclusive) filters use the region and day indexes.
+def _day(value):
+    ordinal = date_ordinal(value)
+    if ordinal is None:
+        raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+    return ordinal
+
+
+def _where(region=None, start=None, end=None, dated=False):
+    clauses, params = [], []
+    if region is not None:
+        clauses.append("region = ?")
+        params.append(region)
+    if start is not None:
+        clauses.append("day >= ?")
+        params.append(_day(start))
+    if end is not None:
+        clauses.append("day <= ?")
+        params.append(_day(end))
+    if dated:
+        clauses.append("day IS NOT NULL")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def calculate_total_revenue(store, region=None, start=None, end=None):
+    where, params = _where(region, start, end)
+    total = store.execute(f"SELECT TOTAL(amount) FROM transactions{where}", params)[0][0]
+    return float(total)
+
+
+def region_wise_sales(store, start=None, end=None):
+    where, params = _where(None, start, end)
+    rows = store.execute(
+        f"SELECT region, TOTAL(amount) AS total, COUNT(*) FROM transactions{where} "
+        "GROUP BY region ORDER BY total DESC, MIN(rowid)", params
+    )
+    global_total = sum(total for _, total, _ in rows)
+    return {
+        region: {
+            "total_sales": total,
+            "transaction_count": count,
+            "percentage": (total / global_total * 100) if global_total else 0
+        }
+        for region, total, count in rows
+    }
+
+
+def top_selling_products(store, n=5, region=None, start=None, end=None):
+    where, params = _where(region, start, end)
+    return store.execute(
+        f"SELECT product_name, SUM(quantity) AS qty, TOTAL(amount) FROM transactions{where} "
+        "GROUP BY product_name ORDER BY qty DESC, MIN(rowid) LIMIT ?", params + [n]
+    )
+
+
+def customer_analysis(store, top_n=None, region=None, start=None, end=None):
+    where, params = _where(region, start, end)
+    # Product names never contain commas (the parser strips them)
+    rows = store.execute(
+        f"SELECT customer_id, TOTAL(amount) AS spent, COUNT(*), GROUP_CONCAT(DISTINCT product_name) "
+        f"FROM transactions{where} GROUP BY customer_id ORDER BY spent DESC, MIN(rowid) LIMIT ?",
+        params + [-1 if top_n is None else top_n]
+    )
+    return {
+        cid: {
+            "total_spent": spent,
+            "purchase_count": count,
+            "avg_order_value": (spent / count) if count else 0,
+            "products_bought": products.split(",") if products else []
+        }
+        for cid, spent, count, products in rows
+    }
+
+
+def daily_sales_trend(store, region=None, start=None, end=None):
+    where, params = _where(region, start, end, dated=True)
+    rows = store.execute(
+        f"SELECT day, TOTAL(amount), COUNT(*), COUNT(DISTINCT customer_id) FROM transactions{where} "
+        "GROUP BY day ORDER BY day", params
+    )
+    return {
+        ordinal_to_iso(day): {
+            "revenue": revenue,
+            "transaction_count": count,
+            "unique_customers": customers
+        }
+        for day, revenue, count, customers in rows
+    }
+
+
+def find_peak_sales_day(store, region=None, start=None, end=None):
+    where, params = _where(region, start, end, dated=True)
+    rows = store.execute(
+        f"SELECT day, TOTAL(amount) AS revenue, COUNT(*) FROM transactions{where} "
+        "GROUP BY day ORDER BY revenue DESC, day LIMIT 1", params
+    )
+    if not rows:
+        return None
+    day, revenue, count = rows[0]
+    return (ordinal_to_iso(day), revenue, count)
+
+
+def low_performing_products(store, threshold=10, region=None, start=None, end=None):
+    where, params = _where(region, start, end)
+    return store.execute(
+        f"SELECT product_name, SUM(quantity) AS qty, TOTAL(amount) FROM transactions{where} "
+        "GROUP BY product_name HAVING qty < ? ORDER BY qty, MIN(rowid)", params + [threshold]
+    )
+
+
+def aggregates_from_store(store, region=None, start=None, end=None):
+    """
+    Builds an exact SalesAggregates from grouped queries only (memory
+    grows with the number of regions / products / customers / days, not
+    rows), so the report can be generated straight from the store.
+    """
+    where, params = _where(region, start, end)
+    agg = SalesAggregates()
+
+    total, count = store.execute(f"SELECT TOTAL(amount), COUNT(*) FROM transactions{where}", params)[0]
+    agg.total_revenue, agg.transaction_count = total, count
+
+    # ORDER BY MIN(rowid): dict order = first appearance, as in a single pass
+    for region_name, revenue, n in store.execute(
+            f"SELECT region, TOTAL(amount), COUNT(*) FROM transactions{where} "
+            "GROUP BY region ORDER BY MIN(rowid)", params):
+        agg.regions[region_name] = [revenue, n]
+
+    for pname, qty, revenue in store.execute(
+            f"SELECT product_name, SUM(quantity), TOTAL(amount) FROM transactions{where} "
+            "GROUP BY product_name ORDER BY MIN(rowid)", params):
+        agg.products[pname] = [qty, revenue]
+
+    for cid, spent, n in store.execute(
+            f"SELECT customer_id, TOTAL(amount), COUNT(*) FROM transactions{where} "
+            "GROUP BY customer_id ORDER BY MIN(rowid)", params):
+        agg.customers[cid] = [spent, n, set()]
+    for cid, pname in store.execute(
+            f"SELECT DISTINCT customer_id, product_name FROM transactions{where}", params):
+        agg.customers[cid][2].add(pname)
+
+    for pid, n in store.execute(
+            f"SELECT product_id, COUNT(*) FROM transactions{where} "
+            "GROUP BY product_id ORDER BY MIN(rowid)", params):
+        agg.product_ids[pid] = n
+
+    dated_where, dated_params = _where(region, start, end, dated=True)
+    for day, revenue, n in store.execute(
+            f"SELECT day, TOTAL(amount), COUNT(*) FROM transactions{dated_where} GROUP BY day", dated_params):
+        agg.days[day] = [revenue, n, set()]
+    for day, cid in store.execute(
+            f"SELECT DISTINCT day, customer_id FROM transactions{dated_where}", dated_params):
+        agg.days[day][2].add(cid)
+    agg.undated = count - sum(n for _, n, _ in agg.days.values())
+
+    return agg